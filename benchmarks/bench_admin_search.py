@@ -0,0 +1,96 @@
+"""
+Admin shipment search latency, full-text index vs icontains.
+
+Grows a search-indexed scratch table through each requested size and times
+what the admin changelist runs for a search: the first page (100 rows in
+created_at order) and the total count. Terms cover a tracking number
+prefix, a phone prefix, a full name and a four-letter family name prefix
+(which matches a few percent of all rows).
+With --compare-scan the old four-column icontains search is timed as well.
+
+    python benchmarks/bench_admin_search.py
+    python benchmarks/bench_admin_search.py --sizes 100000,1000000 --compare-scan
+"""
+import argparse
+import os
+import random
+
+from common import bench_name, bench_tracking_number, insert_shipments, setup_django
+
+SEARCH_FIELDS = ('shipment_number', 'shipper_name', 'receiver_name', 'carrier__name')
+
+
+def search_terms(size):
+    i = random.randrange(size)
+    return {
+        'tracking prefix': bench_tracking_number(i)[:12],
+        'phone prefix': f'+1 {(i * 7919) % 10**10:010d}'[:9],
+        'full name': bench_name(i),
+        'short prefix': bench_name(i).split()[1][:4],
+    }
+
+
+def icontains(queryset, term):
+    from django.db.models import Q
+
+    for word in term.split():
+        q = Q()
+        for field in SEARCH_FIELDS:
+            q |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(q)
+    return queryset
+
+
+def admin_search(search, term):
+    """First changelist page (the columns the admin loads) plus the paginator's count"""
+    from shipments.admin import ShipmentAdmin
+    from shipments.models import Shipment
+
+    queryset = search(Shipment.objects.order_by('-created_at', '-pk'), term)
+    list(queryset.select_related(*ShipmentAdmin.list_select_related).only(*ShipmentAdmin.list_only_fields)[:100])
+    return queryset.count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='Comma separated table sizes to measure')
+    parser.add_argument('--searches', type=int, default=50, help='Searches timed per term kind and size')
+    parser.add_argument('--compare-scan', action='store_true',
+                        help='Also time the icontains search the admin used before')
+    parser.add_argument('--db', help='Keep the scratch database at this path')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    from shipments.benchmarks import summarize, timed
+    from shipments.models import Shipment
+    from shipments.search import search_shipments
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    rows = Shipment.objects.count()
+    print(f"{'rows':>10}  {'term':>16}  {'index median':>13}  {'index p95':>10}  {'scan median':>12}")
+    try:
+        for size in sizes:
+            if rows < size:
+                insert_shipments(rows, size, index=True)
+                rows = size
+            for kind in search_terms(size):
+                terms = iter([search_terms(size)[kind] for _ in range(args.searches)])
+                indexed = summarize(timed(
+                    lambda: admin_search(search_shipments, next(terms)), args.searches))
+
+                scan = '-'
+                if args.compare_scan:
+                    terms = iter([search_terms(size)[kind] for _ in range(5)])
+                    scan_stats = summarize(timed(lambda: admin_search(icontains, next(terms)), 5))
+                    scan = f"{scan_stats['median_us'] / 1000:.1f}ms"
+
+                print(f"{size:>10}  {kind:>16}  {indexed['median_us'] / 1000:>11.1f}ms"
+                      f"  {indexed['p95_us'] / 1000:>8.1f}ms  {scan:>12}")
+    finally:
+        if args.db is None:
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
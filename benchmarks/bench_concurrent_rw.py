@@ -0,0 +1,143 @@
+"""
+Tracking lookup latency while staff save shipments, bare SQLite vs the tuned profile.
+
+Reader threads look up random tracking numbers as fast as they can while
+one writer thread saves shipments the way the admin does (Shipment.save()
+with its signals, in a transaction). "bare" is Django's default SQLite
+config in rollback-journal mode; "tuned" is tracking/databases.py's sqlite
+profile (WAL, synchronous=NORMAL, mmap, IMMEDIATE transactions). Each mode
+runs in a fresh process against the same scratch database.
+
+    python benchmarks/bench_concurrent_rw.py
+    python benchmarks/bench_concurrent_rw.py --seconds 10 --readers 8 --json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from common import BASE_DIR, bench_tracking_number, insert_shipments, setup_django
+
+MODES = ('bare', 'tuned')
+
+
+def child(db_path, mode, seconds, readers, rows):
+    """Run readers and a writer for `seconds`; print the stats as JSON"""
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    from django.conf import settings
+    if mode == 'bare':
+        settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_path}
+    else:
+        settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+    from django.db import OperationalError, connection, transaction
+    from shipments.models import Shipment
+
+    # The journal mode is stored in the database file, so set it either way
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode={'DELETE' if mode == 'bare' else 'WAL'}")
+    connection.close()
+
+    deadline = time.perf_counter() + seconds
+    latencies, errors, writes = [], [0], [0]
+    lock = threading.Lock()
+
+    def read():
+        rng, samples, failed = random.Random(), [], 0
+        while time.perf_counter() < deadline:
+            number = bench_tracking_number(rng.randrange(rows))
+            started = time.perf_counter()
+            try:
+                Shipment.objects.for_tracking_number(number).select_related('status', 'location').first()
+            except OperationalError:
+                failed += 1
+            samples.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(samples)
+            errors[0] += failed
+
+    def write():
+        rng = random.Random(0)
+        while time.perf_counter() < deadline:
+            try:
+                with transaction.atomic():
+                    shipment = Shipment.objects.get(tracking_key=bench_tracking_number(rng.randrange(rows)))
+                    shipment.remarks = f'Checked {time.time()}'
+                    shipment.receiver_address = f'{rng.randrange(1000)} Bench Road'
+                    shipment.save()
+                writes[0] += 1
+            except OperationalError:
+                errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=read) for _ in range(readers)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    print(json.dumps({
+        'mode': mode,
+        'reads_per_s': round(len(latencies) / seconds),
+        'read_p50_ms': round(statistics.median(latencies), 2),
+        'read_p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        'read_max_ms': round(latencies[-1], 2),
+        'writes_per_s': round(writes[0] / seconds, 1),
+        'errors': errors[0],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000, help='Shipments in the scratch table')
+    parser.add_argument('--seconds', type=float, default=5, help='Run time per mode')
+    parser.add_argument('--readers', type=int, default=4, help='Reader threads')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    parser.add_argument('--db', help='Keep the scratch database at this path')
+    parser.add_argument('--child', nargs=2, metavar=('DB', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child, args.seconds, args.readers, args.rows)
+
+    db_path = setup_django(args.db)
+    from django.db import connections
+    from shipments.models import Shipment
+    rows = Shipment.objects.count()
+    if rows < args.rows:
+        insert_shipments(rows, args.rows, index=True)
+    connections.close_all()
+
+    if not args.json:
+        print(f"{'mode':>6}  {'reads/s':>8}  {'read p50':>9}  {'read p99':>9}  {'read max':>9}  {'writes/s':>8}  {'errors':>6}")
+    try:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', db_path, mode, '--seconds', str(args.seconds),
+                 '--readers', str(args.readers), '--rows', str(args.rows)],
+                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'tracking.settings', 'WARMUP_ON_STARTUP': '0'},
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{mode:>6}  {result['reads_per_s']:>8}  {result['read_p50_ms']:>7.2f}ms  "
+                      f"{result['read_p99_ms']:>7.2f}ms  {result['read_max_ms']:>7.1f}ms  "
+                      f"{result['writes_per_s']:>8}  {result['errors']:>6}")
+    finally:
+        if args.db is None:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Worker cold start: time to load tracking/wsgi.py and serve the first requests, warmup on vs off.
+
+Each run is a fresh Python process, like a recycled worker: it imports the
+WSGI application (which runs shipments.warmup unless WARMUP_ON_STARTUP=0)
+and then calls it once for each page, in-process and without a server.
+Startup is what the worker spends before it can take traffic; the page
+columns are the latency the first visitors see.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+from common import BASE_DIR, bench_tracking_number, insert_shipments, setup_django
+
+PAGES = {
+    'home': ('/', ''),
+    'track': ('/track/', f'tracking_number={bench_tracking_number(0)}'),
+    'about': ('/about/', ''),
+    'admin_login': ('/admin/login/', ''),
+}
+MODES = {'no warmup': '0', 'warmup': '1'}
+
+
+def child(db_path):
+    """One cold worker: print {'startup_ms', page: ms, ...} as JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, str(BASE_DIR))
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+    from tracking.wsgi import application
+    timings = {'startup_ms': (time.perf_counter() - started) * 1000}
+
+    for name, (path, query) in PAGES.items():
+        environ = {'HTTP_HOST': 'localhost', 'PATH_INFO': path, 'QUERY_STRING': query}
+        setup_testing_defaults(environ)
+        statuses = []
+        started = time.perf_counter()
+        b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+        timings[name] = (time.perf_counter() - started) * 1000
+        assert statuses[0].startswith('200'), (path, statuses[0])
+    print(json.dumps(timings))
+
+
+def run(db_path, warmup):
+    env = {**os.environ, 'WARMUP_ON_STARTUP': warmup, 'DJANGO_SETTINGS_MODULE': 'tracking.settings'}
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', db_path], env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10, help='Cold starts per mode')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    parser.add_argument('--db', help='Keep the scratch database at this path')
+    parser.add_argument('--child', metavar='DB', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    db_path = setup_django(args.db)
+    insert_shipments(0, 1)
+    columns = ['startup_ms', *PAGES]
+    if not args.json:
+        print(f"{'mode':>10}  " + '  '.join(f'{column:>11}' for column in columns) + f"  {'first pages':>11}")
+    try:
+        for mode, warmup in MODES.items():
+            runs = [run(db_path, warmup) for _ in range(args.runs)]
+            medians = {column: round(statistics.median(r[column] for r in runs), 1) for column in columns}
+            pages = round(sum(medians[name] for name in PAGES), 1)
+            if args.json:
+                print(json.dumps({'mode': mode, **medians, 'first_pages_ms': pages}))
+            else:
+                print(f'{mode:>10}  ' + '  '.join(f'{medians[column]:>9.0f}ms' for column in columns)
+                      + f'  {pages:>9.0f}ms')
+    finally:
+        if args.db is None:
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Requests/sec of the home, about and blog pages, page cache on vs off.
+
+Sends requests through the full middleware stack in-process, one at a time,
+which is what a single sync worker does, so the numbers are the ceiling of
+one worker without network or server overhead. Use load_test_views.py
+against a running server for end-to-end figures.
+
+    python benchmarks/bench_static_pages.py
+    python benchmarks/bench_static_pages.py --requests 2000 --json
+"""
+import argparse
+import json
+import os
+import time
+
+from common import setup_django
+
+PAGES = {'home': '/', 'about': '/about/', 'blog': '/blog/'}
+
+
+def requests_per_second(client, path, count):
+    client.get(path, HTTP_HOST='localhost')
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get(path, HTTP_HOST='localhost')
+        assert response.status_code == 200, response.status_code
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500, help='Requests per page and mode')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    parser.add_argument('--db', help='Keep the scratch database at this path')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    if not args.json:
+        print(f"{'page':>6}  {'uncached req/s':>15}  {'cached req/s':>13}  {'speedup':>8}")
+    try:
+        for name, path in PAGES.items():
+            with override_settings(PAGE_CACHE_TIMEOUT=0):
+                uncached = requests_per_second(Client(), path, args.requests)
+            cached = requests_per_second(Client(), path, args.requests)
+            if args.json:
+                print(json.dumps({'page': name, 'uncached_rps': round(uncached, 1),
+                                  'cached_rps': round(cached, 1)}))
+            else:
+                print(f"{name:>6}  {uncached:>15.0f}  {cached:>13.0f}  {cached / uncached:>7.1f}x")
+    finally:
+        if args.db is None:
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
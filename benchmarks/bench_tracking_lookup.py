@@ -0,0 +1,61 @@
+"""
+Tracking number lookup latency as the Shipment table grows.
+
+Grows a scratch table through each requested size and times random public
+lookups through Shipment.objects.for_tracking_number(), which hits the
+unique tracking_key index. With --compare-scan the old unindexed
+shipment_number__exact lookup is timed as well (slow on large tables).
+
+    python benchmarks/bench_tracking_lookup.py
+    python benchmarks/bench_tracking_lookup.py --sizes 10000,100000 --compare-scan
+"""
+import argparse
+import os
+import random
+
+from common import bench_tracking_number, insert_shipments, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10000,100000,1000000,5000000',
+                        help='Comma separated table sizes to measure')
+    parser.add_argument('--lookups', type=int, default=500, help='Lookups timed per size')
+    parser.add_argument('--compare-scan', action='store_true',
+                        help='Also time the unindexed shipment_number lookup')
+    parser.add_argument('--db', help='Keep the scratch database at this path')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    from shipments.benchmarks import summarize, timed
+    from shipments.models import Shipment
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    rows = Shipment.objects.count()
+    print(f"{'rows':>10}  {'indexed median':>15}  {'indexed p95':>12}  {'scan median':>12}")
+    try:
+        for size in sizes:
+            if rows < size:
+                insert_shipments(rows, size)
+                rows = size
+            numbers = [bench_tracking_number(random.randrange(size)) for _ in range(args.lookups)]
+            pending = iter(numbers)
+
+            indexed = summarize(timed(
+                lambda: Shipment.objects.for_tracking_number(next(pending)).get(), len(numbers)))
+
+            scan = '-'
+            if args.compare_scan:
+                pending = iter(numbers[:20])
+                scan_stats = summarize(timed(
+                    lambda: Shipment.objects.get(shipment_number__exact=next(pending)), 20))
+                scan = f"{scan_stats['median_us']:.0f}us"
+
+            print(f"{size:>10}  {indexed['median_us']:>13.0f}us  {indexed['p95_us']:>10.0f}us  {scan:>12}")
+    finally:
+        if args.db is None:
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Tracking number generation throughput: the old per-digit random.randint
+generator against the table-driven, CSPRNG-backed bulk generator.
+
+    python benchmarks/bench_tracking_numbers.py --count 200000
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from datetime import datetime
+
+from common import BASE_DIR
+
+sys.path.insert(0, str(BASE_DIR))
+from shipments.utils import generate_tracking_number, generate_tracking_numbers  # noqa: E402
+
+CARRIERS = ('USPS', 'UPS', 'FedEx', 'DHL', 'Amazon', 'Nile Cargo Lines')
+
+
+def legacy_generate_tracking_number(carrier_name):
+    """The generator as it was before the format registry, kept for comparison"""
+    if not carrier_name:
+        return ""
+    carrier = str(carrier_name).upper().strip()
+    if 'USPS' in carrier or 'UNITED STATES POSTAL SERVICE' in carrier:
+        if random.choice([True, False]):
+            number = '94' + ''.join([str(random.randint(0, 9)) for _ in range(20)])
+            return ' '.join([number[i:i+4] for i in range(0, len(number), 4)])
+        prefix = random.choice(['EA', 'EC', 'CP', 'RA', 'RB', 'RC'])
+        middle = ''.join([str(random.randint(0, 9)) for _ in range(9)])
+        return f'{prefix}{middle}US'
+    elif 'UPS' in carrier or 'UNITED PARCEL SERVICE' in carrier:
+        middle = ''.join(random.choices(string.ascii_uppercase + string.digits, k=16))
+        return f'1Z{middle}'
+    elif 'FEDEX' in carrier or 'FEDERAL EXPRESS' in carrier:
+        length = random.choice([12, 15])
+        number = ''.join([str(random.randint(0, 9)) for _ in range(length)])
+        return ' '.join([number[i:i+4] for i in range(0, len(number), 4)])
+    elif 'DHL' in carrier:
+        number = ''.join([str(random.randint(0, 9)) for _ in range(10)])
+        return ' '.join([number[i:i+4] for i in range(0, len(number), 4)]).rstrip()
+    elif 'AMAZON' in carrier or 'AMZL' in carrier:
+        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+        return f'TBA{suffix}'
+    initials = ''.join([word[0] for word in carrier.split() if word])[:3].upper() or 'TRK'
+    timestamp = datetime.now().strftime('%y%m%d%H%M')
+    random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    return f'{initials}-{timestamp}-{random_part}'
+
+
+def rate(func, count):
+    started = time.perf_counter()
+    func(count)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=100000, help='Numbers generated per carrier')
+    args = parser.parse_args()
+
+    print(f"{'carrier':<18}{'legacy/s':>12}{'per call/s':>12}{'bulk/s':>12}{'speedup':>9}")
+    for carrier in CARRIERS:
+        legacy = rate(lambda n: [legacy_generate_tracking_number(carrier) for _ in range(n)], args.count)
+        single = rate(lambda n: [generate_tracking_number(carrier) for _ in range(n)], args.count)
+        bulk = rate(lambda n: generate_tracking_numbers(carrier, n), args.count)
+        print(f"{carrier:<18}{legacy:>12,.0f}{single:>12,.0f}{bulk:>12,.0f}{bulk / legacy:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Shared setup for the standalone benchmark scripts.
+
+Benchmarks never touch the project database: each run migrates a scratch
+SQLite file (a temporary one unless --db is given) and fills it with
+synthetic shipments. To time the hot paths against an existing database
+instead, use `manage.py generate_synthetic_data` and `manage.py run_benchmarks`.
+"""
+import os
+import sys
+import tempfile
+from datetime import date, time as dtime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None):
+    """Configure Django against a scratch database and migrate it"""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tracking.settings')
+
+    if db_path is None:
+        handle, db_path = tempfile.mkstemp(prefix='tracking-bench-', suffix='.sqlite3')
+        os.close(handle)
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def bench_tracking_number(i):
+    """Deterministic, well-spread tracking number for synthetic row i"""
+    return f"BN{(i * 2654435761) % 10**10:010d}{i:08d}"
+
+
+def bench_name(i):
+    """Deterministic pseudo-random given and family name for synthetic row i"""
+    from shipments.synthetic import SYLLABLES
+
+    n = (i * 2246822519) % 24**6
+    syllables = []
+    for _ in range(6):
+        n, index = divmod(n, 24)
+        syllables.append(SYLLABLES[index])
+    return f"{''.join(syllables[:2]).title()} {''.join(syllables[2:5]).title()}"
+
+
+def insert_shipments(start, stop, batch_size=5000, index=False):
+    """Bulk insert synthetic shipments numbered start..stop-1, optionally search-indexed"""
+    from shipments.models import Shipment
+    from shipments.search import index_shipments
+
+    common = dict(
+        shipper_address='1 Bench Road', shipper_email='shipper@example.com',
+        receiver_address='2 Bench Road', receiver_email='receiver@example.com',
+        weight_kg=1, packages=1, quantity=1, total_freight='0',
+        departure_time=dtime(9, 0), pickup_time=dtime(8, 0),
+        pickup_date=date(2025, 1, 1), expected_delivery_date=date(2025, 1, 5),
+        date=date(2025, 1, 2), time=dtime(12, 0),
+    )
+    for offset in range(start, stop, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, stop)):
+            number = bench_tracking_number(i)
+            batch.append(Shipment(
+                shipment_number=number, tracking_key=number,
+                shipper_name=bench_name(i), shipper_phone=f'+1{(i * 7919) % 10**10:010d}',
+                receiver_name=bench_name(i + 1), receiver_phone=f'+44{(i * 104729) % 10**10:010d}',
+                **common))
+        batch = Shipment.objects.bulk_create(batch)
+        if index:
+            index_shipments(batch)
+
@@ -0,0 +1,155 @@
+"""
+Requests/sec and latency of the public views, sync views vs their async variants.
+
+Drives already running servers with N concurrent keep-alive clients for a
+fixed time per concurrency level and reports throughput and p50/p99
+latency. The WSGI deployment serves the plain sync views and the ASGI one
+the async variants (settings.ASYNC_VIEWS, which tracking/asgi.py turns
+on). Start both against the same database (with the same worker count)
+first, for example:
+
+    gunicorn tracking.wsgi -w 4 -b 127.0.0.1:8000
+    uvicorn tracking.asgi:application --workers 4 --port 8001
+
+    python benchmarks/load_test_views.py --tracking-number 1Z999AA10123456784
+    python benchmarks/load_test_views.py --scenario api --concurrency 50,500 \\
+        --target sync=http://127.0.0.1:8000 --target async=http://127.0.0.1:8001
+
+To tell the server apart from the views, add the sync views under ASGI as
+a third target: `ASYNC_VIEWS=0 uvicorn tracking.asgi:application --port 8002`.
+
+The client is plain asyncio (no extra dependencies), so a single client
+process can hold 500 connections; run it on a different machine from the
+servers for numbers that are not skewed by sharing CPUs.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def build_request(host, scenario, tracking_numbers):
+    """Raw HTTP/1.1 request bytes for one scenario"""
+    if scenario == 'track':
+        path = '/track/?' + urlencode({'tracking_number': tracking_numbers[0]})
+        return (f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'
+                'Connection: keep-alive\r\n\r\n').encode()
+    body = json.dumps({'tracking_numbers': tracking_numbers}).encode()
+    return (f'POST /api/track/ HTTP/1.1\r\nHost: {host}\r\n'
+            'Connection: keep-alive\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+
+async def read_response(reader):
+    """Read one response; returns (status, keep the connection open)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(url, request, deadline, latencies, errors):
+    """One simulated client sending requests back to back until the deadline"""
+    parts = urlsplit(url)
+    writer = None
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append(time.perf_counter())
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+            continue
+        if status >= 500:
+            errors.append(started)
+        else:
+            latencies.append(time.perf_counter() - started)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(url, request, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        client(url, request, deadline, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def summarize(latencies, errors, duration):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'rps': 0.0, 'p50_ms': None, 'p99_ms': None, 'errors': len(errors)}
+    return {
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 1),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target', action='append', metavar='NAME=URL',
+                        help='Deployment to load (repeatable); defaults to sync (WSGI) on :8000 and async (ASGI) on :8001')
+    parser.add_argument('--scenario', choices=('track', 'api'), default='track',
+                        help='Tracking page GET or batch API POST')
+    parser.add_argument('--tracking-number', action='append', dest='tracking_numbers',
+                        help='Existing tracking number to look up (repeatable; the API sends all of them)')
+    parser.add_argument('--concurrency', default='50,100,250,500',
+                        help='Comma separated numbers of concurrent clients')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each target')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    args = parser.parse_args()
+
+    targets = dict(target.split('=', 1) for target in (
+        args.target or ['sync=http://127.0.0.1:8000', 'async=http://127.0.0.1:8001']))
+    tracking_numbers = args.tracking_numbers or ['1Z999AA10123456784']
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    if not args.json:
+        print(f"{'target':>8}  {'clients':>7}  {'req/s':>9}  {'p50':>9}  {'p99':>9}  {'errors':>6}")
+    for name, url in targets.items():
+        request = build_request(urlsplit(url).netloc, args.scenario, tracking_numbers)
+        asyncio.run(run_level(url, request, min(levels), args.warmup))
+        for level in levels:
+            stats = summarize(*asyncio.run(run_level(url, request, level, args.duration)), args.duration)
+            if args.json:
+                print(json.dumps({'target': name, 'scenario': args.scenario, 'clients': level, **stats}))
+            else:
+                p50 = '-' if stats['p50_ms'] is None else f"{stats['p50_ms']:.1f}ms"
+                p99 = '-' if stats['p99_ms'] is None else f"{stats['p99_ms']:.1f}ms"
+                print(f"{name:>8}  {level:>7}  {stats['rps']:>9.1f}  {p50:>9}  {p99:>9}  {stats['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,88 @@
 # shipments/admin.py - UPDATED WITH TABLE IMPROVEMENTS
+from datetime import timedelta
+
+from django import forms
 from django.contrib import admin
 from django.urls import path
 from django.http import JsonResponse
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.utils.html import format_html
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from django.urls import reverse
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.forms.models import ModelChoiceField, ModelChoiceIterator, ModelChoiceIteratorValue
 from .models import (
-    Shipment, Package,
+    Shipment, Package, ShipmentEvent,
     Courier, ShipmentType, Mode, Product, PaymentMode,
     Carrier, Country, StatusType, PieceType
 )
-from .utils import generate_tracking_number
+from .exports import EXPORT_FORMATS, streaming_export_response
+from .pagination import KEYSET_ORDERING, estimate_count, keyset_page
+from .refdata import REFERENCE_MODELS, reference_table
+from .reservations import reserve_tracking_numbers
+from .rollups import dashboard_summary
+from .search import search_shipments
+from .validators import is_plausible_tracking_number, validate_tracking_number
+
+
+# -----------------------------
+# CACHED DROPDOWNS
+# -----------------------------
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """Choices from the reference data cache instead of a query per form"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for pk, name in reference_table(self.queryset.model).names.items():
+            yield ModelChoiceIteratorValue(pk, None), name
+
+    def __len__(self):
+        return len(reference_table(self.queryset.model)) + (self.field.empty_label is not None)
+
+
+class ReferenceChoiceField(ModelChoiceField):
+    """FK form field for a dropdown model that renders and validates from the cache"""
+    iterator = ReferenceChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            pk = int(getattr(value, 'pk', value))
+        except (TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        table = reference_table(self.queryset.model)
+        if pk in table.names:
+            return table.instance(pk)
+        return super().to_python(value)
+
+
+class ReferenceFieldListFilter(admin.RelatedFieldListFilter):
+    """list_filter on a dropdown FK whose choices come from the cache"""
+
+    def field_choices(self, field, request, model_admin):
+        return list(reference_table(field.related_model).names.items())
+
+
+class ReferenceDataAdminMixin:
+    """Serve every dropdown FK on the form from the reference data cache"""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.related_model in REFERENCE_MODELS:
+            kwargs.setdefault('form_class', ReferenceChoiceField)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 # -----------------------------
 # PACKAGE INLINE
 # -----------------------------
-class PackageInline(admin.StackedInline):
+class PackageInline(ReferenceDataAdminMixin, admin.StackedInline):
     model = Package
     extra = 1
     fields = (
@@ -28,12 +93,114 @@ class PackageInline(admin.StackedInline):
     )
 
 
+# -----------------------------
+# STATUS HISTORY INLINE
+# -----------------------------
+class ShipmentEventInline(admin.TabularInline):
+    """Read-only view of the append-only status history"""
+    model = ShipmentEvent
+    extra = 0
+    can_delete = False
+    fields = readonly_fields = ('timestamp', 'date', 'time', 'location', 'status', 'remarks')
+    verbose_name_plural = "Status history"
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('location', 'status')
+
+
+# -----------------------------
+# SHIPMENT CHANGELIST
+# -----------------------------
+CURSOR_VAR = 'cursor'
+
+
+class ShipmentChangeList(ChangeList):
+    """
+    Changelist that only loads the columns the list_display renderers read,
+    and pages through the default newest-first ordering by keyset with a
+    capped count. Sorting by a column or "Show all" falls back to the
+    regular OFFSET paginator.
+    """
+    keyset = False
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, search and sort links start again from the newest page
+        return super().get_query_string(new_params, [CURSOR_VAR, *(remove or [])])
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.only(*self.model_admin.list_only_fields)
+
+    def get_results(self, request):
+        self.keyset = (
+            ORDER_VAR not in self.params and not self.show_all
+            and list(self.queryset.query.order_by) == KEYSET_ORDERING
+        )
+        if not self.keyset:
+            return super().get_results(request)
+
+        try:
+            page = keyset_page(self.queryset, self.list_per_page, request.GET.get(CURSOR_VAR))
+        except ValueError:
+            raise IncorrectLookupParameters
+        self.result_count, self.result_count_exact = estimate_count(
+            self.queryset, self.model_admin.estimated_count_above)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = page.object_list
+        self.can_show_all = self.result_count_exact and self.result_count <= self.list_max_show_all
+        self.multi_page = bool(page.older_cursor or page.newer_cursor)
+        self.paginator = None
+        self.newer_url = page.newer_cursor and self.get_query_string({CURSOR_VAR: page.newer_cursor})
+        self.older_url = page.older_cursor and self.get_query_string({CURSOR_VAR: page.older_cursor})
+        self.newest_url = page.newer_cursor and self.get_query_string()
+
+
+class ShipmentExportChangeList(ShipmentChangeList):
+    """
+    The changelist's filters and search for export_view, which streams the
+    whole queryset itself: no page is fetched and nothing is counted.
+    """
+
+    def get_results(self, request):
+        pass
+
+
+# -----------------------------
+# SHIPMENT FORM
+# -----------------------------
+class ShipmentAdminForm(forms.ModelForm):
+    class Meta:
+        model = Shipment
+        fields = '__all__'
+
+    def clean_shipment_number(self):
+        number = self.cleaned_data['shipment_number']
+        # Only new or edited numbers: older shipments keep the numbers they were issued
+        if 'shipment_number' in self.changed_data:
+            validate_tracking_number(number)
+        return number
+
+
 # -----------------------------
 # SHIPMENT ADMIN - UPDATED
 # -----------------------------
 @admin.register(Shipment)
-class ShipmentAdmin(admin.ModelAdmin):
-    inlines = [PackageInline]
+class ShipmentAdmin(ReferenceDataAdminMixin, admin.ModelAdmin):
+    form = ShipmentAdminForm
+    inlines = [PackageInline, ShipmentEventInline]
     readonly_fields = ('auto_generate_button', 'reference_example',)
     
     # ADD THIS: Better list display with more info
@@ -48,7 +215,11 @@ class ShipmentAdmin(admin.ModelAdmin):
     )
     
     # ADD THIS: Add filters
-    list_filter = ('carrier', 'status', 'shipment_type')
+    list_filter = (
+        ('carrier', ReferenceFieldListFilter),
+        ('status', ReferenceFieldListFilter),
+        ('shipment_type', ReferenceFieldListFilter),
+    )
     
     # ADD THIS: Add search
     search_fields = ('shipment_number', 'shipper_name', 'receiver_name', 'carrier__name')
@@ -56,6 +227,24 @@ class ShipmentAdmin(admin.ModelAdmin):
     # ADD THIS: Items per page
     list_per_page = 20
 
+    # The changelist counts matches exactly up to here and shows "more than" beyond
+    estimated_count_above = 10000
+    # Skip the second COUNT(*) over the unfiltered table
+    show_full_result_count = False
+
+    actions = ['export_selected_csv']
+
+    # Join the FKs read by carrier_info/status_info instead of one query per row
+    list_select_related = ('carrier', 'status')
+
+    # Columns read by the list_display renderers; everything else stays deferred
+    list_only_fields = (
+        'id', 'shipment_number',
+        'shipper_name', 'shipper_phone', 'receiver_name', 'receiver_phone',
+        'pickup_date', 'expected_delivery_date', 'created_at',
+        'carrier__name', 'status__name',
+    )
+
     fieldsets = (
         ("Shipper Details", {
             "fields": (
@@ -258,15 +447,82 @@ class ShipmentAdmin(admin.ModelAdmin):
             'Select carrier first, then click to generate</small>'
         )
     auto_generate_button.short_description = "Generate Tracking"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Append to the status history whenever the current status changes
+        if not change or set(ShipmentEvent.STATUS_FIELDS) & set(form.changed_data):
+            ShipmentEvent.from_shipment(obj).save()
+
+    def get_changelist(self, request, **kwargs):
+        if request.resolver_match and request.resolver_match.url_name == 'shipments_shipment_export':
+            return ShipmentExportChangeList
+        return ShipmentChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact tracking numbers first, then prefix search through the full-text
+        index; the icontains scan over search_fields is only the fallback.
+        """
+        if search_term and is_plausible_tracking_number(search_term):
+            exact = queryset.for_tracking_number(search_term)
+            if exact.exists():
+                return exact, False
+        if search_term:
+            matches = search_shipments(queryset, search_term)
+            if matches is not None:
+                return matches, False
+        return super().get_search_results(request, queryset, search_term)
     
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path('generate-tracking/', self.admin_site.admin_view(self.generate_tracking_view), 
                  name='generate_tracking'),
+            path('export/', self.admin_site.admin_view(self.export_view),
+                 name='shipments_shipment_export'),
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view),
+                 name='shipments_shipment_dashboard'),
         ]
         return custom_urls + urls
     
+    def export_view(self, request):
+        """Stream every shipment matching the current changelist filters and search"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        # The changelist rejects unknown query parameters, so take ours out first
+        request.GET = request.GET.copy()
+        fmt = request.GET.pop('format', ['csv'])[0]
+        if fmt not in EXPORT_FORMATS:
+            fmt = 'csv'
+        return streaming_export_response(self.get_changelist_instance(request).queryset, fmt)
+
+    def dashboard_view(self, request):
+        """Shipment counts for the last ?days= days, read from the rollup table only"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            days = min(max(int(request.GET.get('days', 30)), 1), 3660)
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+        summary = dashboard_summary(since)
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'days': days, 'since': since, **summary})
+        return TemplateResponse(request, 'admin/shipments/shipment/dashboard.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Shipment dashboard',
+            'days': days,
+            'since': since,
+            'day_choices': (7, 30, 90, 365),
+            'summary': summary,
+        })
+
+    @admin.action(description="Export selected shipments as CSV", permissions=['view'])
+    def export_selected_csv(self, request, queryset):
+        return streaming_export_response(queryset, 'csv')
+
     def generate_tracking_view(self, request):
         """Admin view to generate tracking number"""
         carrier_id = request.GET.get('carrier_id')
@@ -275,21 +531,16 @@ class ShipmentAdmin(admin.ModelAdmin):
         if not carrier_id and not carrier_name:
             return JsonResponse({'success': False, 'error': 'Carrier information is required'})
         
-        # Generate tracking number
+        # Reserve an unused tracking number
         if carrier_name:
-            tracking_number = generate_tracking_number(carrier_name)
+            tracking_number = reserve_tracking_numbers(carrier_name, 1)[0]
         else:
             try:
                 carrier = Carrier.objects.get(id=carrier_id)
-                tracking_number = generate_tracking_number(carrier.name)
+                tracking_number = reserve_tracking_numbers(carrier, 1)[0]
             except Carrier.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Carrier not found'})
         
-        # Check for uniqueness
-        from .models import Shipment
-        while Shipment.objects.filter(shipment_number=tracking_number).exists():
-            tracking_number = generate_tracking_number(carrier_name or carrier.name)
-        
         return JsonResponse({
             'success': True,
             'tracking_number': tracking_number
@@ -0,0 +1,98 @@
+# shipments/api.py
+"""
+Batch tracking lookups for the partner JSON API.
+
+All requested numbers are resolved with one IN query on tracking_key (with
+status, location and carrier joined in), and the response ETag is derived
+from the matched keys and their updated_at, so a poll whose shipments have
+not changed is answered before anything is serialized.
+"""
+import hashlib
+
+from django.utils.http import parse_etags
+
+from .models import Shipment
+from .validators import is_plausible_tracking_number
+from .utils import normalize_tracking_number
+
+# Columns a status record needs; everything else stays deferred
+RECORD_FIELDS = (
+    'shipment_number', 'tracking_key', 'date', 'time', 'remarks',
+    'expected_delivery_date', 'updated_at',
+    'status__name', 'location__name', 'carrier__name',
+)
+
+
+def requested_keys(tracking_numbers):
+    """
+    ({normalized key: number as sent}, [rejected numbers]); duplicates
+    collapse onto the first spelling, implausible numbers never reach the database.
+    """
+    keys, invalid = {}, []
+    for number in tracking_numbers:
+        if isinstance(number, str) and is_plausible_tracking_number(number):
+            keys.setdefault(normalize_tracking_number(number), number)
+        else:
+            invalid.append(number)
+    return keys, invalid
+
+
+def shipments_queryset(tracking_keys):
+    return (
+        Shipment.objects.filter(tracking_key__in=list(tracking_keys))
+        .select_related('status', 'location', 'carrier')
+        .only(*RECORD_FIELDS)
+        .order_by()
+    )
+
+
+def lookup_shipments(tracking_keys):
+    """{tracking_key: Shipment} for the keys that exist, in a single query"""
+    return {shipment.tracking_key: shipment for shipment in shipments_queryset(tracking_keys)}
+
+
+async def alookup_shipments(tracking_keys):
+    """lookup_shipments() for async views"""
+    return {shipment.tracking_key: shipment async for shipment in shipments_queryset(tracking_keys)}
+
+
+def batch_etag(requested, invalid, found):
+    """Strong ETag over the request and the updated_at of the shipments found"""
+    digest = hashlib.sha1(repr(invalid).encode())
+    for key in requested:
+        shipment = found.get(key)
+        stamp = shipment.updated_at.isoformat() if shipment else '-'
+        digest.update(f'{key}={stamp};'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(etag, if_none_match):
+    """Weak comparison as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags or f'W/{etag}' in etags
+
+
+def shipment_record(shipment):
+    """Compact status record for one shipment"""
+    return {
+        'tracking_number': shipment.shipment_number,
+        'status': shipment.status.name if shipment.status else None,
+        'location': shipment.location.name if shipment.location else None,
+        'carrier': shipment.carrier.name if shipment.carrier else None,
+        'date': shipment.date,
+        'time': shipment.time,
+        'remarks': shipment.remarks or '',
+        'expected_delivery_date': shipment.expected_delivery_date,
+        'updated_at': shipment.updated_at,
+    }
+
+
+def batch_payload(requested, invalid, found):
+    """Records in request order, plus the numbers that matched nothing"""
+    return {
+        'shipments': [shipment_record(found[key]) for key in requested if key in found],
+        'not_found': [number for key, number in requested.items() if key not in found],
+        'invalid': invalid,
+    }
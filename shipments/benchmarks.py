@@ -0,0 +1,171 @@
+# shipments/benchmarks.py
+"""
+Timings of the project's hot paths against the configured database.
+
+Each benchmark sets itself up once and returns the callable that is timed,
+so only the work a real request or job does is measured. Results are plain
+dicts (see summarize()) written as JSON by `manage.py run_benchmarks`, and
+compare() reports the change against an earlier run so regressions show up
+between commits. Fill the database with `manage.py generate_synthetic_data`
+first; nothing is left behind except cache entries (the import benchmark
+rolls its rows back).
+"""
+import random
+import statistics
+import time
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import RequestFactory
+
+from .cache import invalidate_track_result
+from .exports import iter_csv
+from .imports import ShipmentImporter
+from .models import Carrier, Shipment
+from .synthetic import synthetic_rows
+from .utils import generate_tracking_number
+from .views import track_shipment
+
+SAMPLE_SIZE = 200
+
+
+def timed(func, repeat):
+    """Run func repeat times and return the per-call timings in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'median_us': round(statistics.median(samples), 1),
+        'p95_us': round(samples[max(0, int(len(samples) * 0.95) - 1)], 1),
+        'max_us': round(samples[-1], 1),
+    }
+
+
+class BenchmarkContext:
+    """What the benchmarks share: sample tracking numbers, a request factory and a staff user"""
+
+    def __init__(self, seed=0, import_rows=500, export_rows=1000):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.import_rows = import_rows
+        self.export_rows = export_rows
+        self.tracking_keys = list(
+            Shipment.objects.order_by('?').values_list('tracking_key', flat=True)[:SAMPLE_SIZE])
+        self.factory = RequestFactory(HTTP_HOST='localhost')
+        # Never saved: admin views only check the flags
+        self.user = User(username='benchmark', is_active=True, is_staff=True, is_superuser=True)
+
+    def tracking_key(self):
+        return self.rng.choice(self.tracking_keys)
+
+    def admin_request(self, path, params=None):
+        request = self.factory.get(path, params or {})
+        request.user = self.user
+        return request
+
+
+def bench_track_page(context):
+    """Public tracking page for a random shipment, result fragment cached"""
+    def run():
+        request = context.factory.get('/track/', {'tracking_number': context.tracking_key()})
+        track_shipment(request)
+    return run
+
+
+def bench_track_page_uncached(context):
+    """Public tracking page with the cached result fragment dropped first"""
+    def run():
+        key = context.tracking_key()
+        invalidate_track_result(key)
+        track_shipment(context.factory.get('/track/', {'tracking_number': key}))
+    return run
+
+
+def bench_admin_changelist(context):
+    """First page of the admin shipment changelist"""
+    model_admin = site._registry[Shipment]
+
+    def run():
+        model_admin.changelist_view(context.admin_request('/admin/shipments/shipment/')).render()
+    return run
+
+
+def bench_admin_search(context):
+    """Admin changelist searching for a receiver name"""
+    model_admin = site._registry[Shipment]
+    names = list(Shipment.objects.filter(tracking_key__in=context.tracking_keys)
+                 .values_list('receiver_name', flat=True))
+
+    def run():
+        request = context.admin_request('/admin/shipments/shipment/', {'q': context.rng.choice(names)})
+        model_admin.changelist_view(request).render()
+    return run
+
+
+def bench_tracking_number(context):
+    """One generated tracking number for a random carrier"""
+    carriers = list(Carrier.objects.values_list('name', flat=True)) or ['UPS']
+    return lambda: generate_tracking_number(context.rng.choice(carriers))
+
+
+def bench_import(context):
+    """Importing `import_rows` synthetic manifest rows, rolled back afterwards"""
+    rows = list(synthetic_rows(context.import_rows, context.seed))
+
+    def run():
+        with transaction.atomic():
+            for _ in ShipmentImporter(batch_size=context.import_rows).run(rows):
+                pass
+            transaction.set_rollback(True)
+    return run
+
+
+def bench_export(context):
+    """CSV export of the first `export_rows` shipments"""
+    last_pk = Shipment.objects.order_by('pk').values_list('pk', flat=True)[
+        context.export_rows - 1:context.export_rows].first()
+    shipments = Shipment.objects.all() if last_pk is None else Shipment.objects.filter(pk__lte=last_pk)
+
+    def run():
+        for _ in iter_csv(shipments):
+            pass
+    return run
+
+
+BENCHMARKS = {
+    'track_page': bench_track_page,
+    'track_page_uncached': bench_track_page_uncached,
+    'admin_changelist': bench_admin_changelist,
+    'admin_search': bench_admin_search,
+    'tracking_number': bench_tracking_number,
+    'import': bench_import,
+    'export': bench_export,
+}
+
+
+def run_benchmarks(context, names, repeat):
+    """{name: summary} for the named benchmarks, each warmed up once before timing"""
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name](context)
+        func()
+        results[name] = {'runs': repeat, **summarize(timed(func, repeat))}
+    return results
+
+
+def compare(baseline, results):
+    """{name: median change in percent} for the benchmarks present in both runs"""
+    changes = {}
+    for name, summary in results.items():
+        before = baseline.get(name, {}).get('median_us')
+        if before:
+            changes[name] = round(100 * (summary['median_us'] - before) / before, 1)
+    return changes
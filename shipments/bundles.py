@@ -0,0 +1,65 @@
+# shipments/bundles.py
+"""
+Concatenated CSS and JS bundles of the stylesheets and scripts every page
+loads (STATIC_BUNDLES).
+
+collectstatic writes each bundle into STATIC_ROOT before hashing (see
+ResponsiveStaticFilesStorage.post_process), so a bundle is fingerprinted,
+precompressed and served with far-future cache headers like any other
+static file. CSS is minified and its relative url()s are rebased onto the
+bundle's location; JS sources are only joined, most of them already being
+minified. {% static_bundle %} links the bundle once it has been collected
+and the individual sources before that, e.g. under runserver.
+"""
+import posixpath
+import re
+
+from django.conf import settings
+
+CHARSET = '@charset "UTF-8";'
+
+_STRING = r'''"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*\''''
+_COMMENTS = re.compile(rf'({_STRING})|/\*(!?)[\s\S]*?\*/')
+_SPACES = re.compile(rf'({_STRING})|\s+')
+_PUNCTUATION = re.compile(rf'({_STRING})|\s*([{{}};,])\s*')
+_AFTER_COLON = re.compile(rf'({_STRING})|:\s+')
+_TRAILING_SEMICOLON = re.compile(rf'({_STRING})|;(?=}})')
+_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_CHARSET_RULE = re.compile(r'@charset\s+(?:"[^"]*"|\'[^\']*\')\s*;', re.IGNORECASE)
+_SOURCE_MAP = re.compile(r'^\s*//[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+
+def bundles():
+    return getattr(settings, 'STATIC_BUNDLES', {})
+
+
+def minify_css(css):
+    """Drop comments (except /*! licence */ ones) and insignificant whitespace"""
+    css = _COMMENTS.sub(lambda m: m.group(1) or (m.group(0) if m.group(2) else ' '), css)
+    css = _SPACES.sub(lambda m: m.group(1) or ' ', css)
+    css = _PUNCTUATION.sub(lambda m: m.group(1) or m.group(2), css)
+    # Only after a colon: the space in `a :hover` is a descendant combinator
+    css = _AFTER_COLON.sub(lambda m: m.group(1) or ':', css)
+    return _TRAILING_SEMICOLON.sub(lambda m: m.group(1) or '', css).strip()
+
+
+def rebase_css_urls(css, source, bundle):
+    """Point the relative url()s of `source`'s CSS at the same files from `bundle`'s directory"""
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(('/', '#', 'data:')) or '://' in url:
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        return f'url("{posixpath.relpath(target, posixpath.dirname(bundle) or ".")}{suffix}")'
+    return _URL.sub(rebase, css)
+
+
+def build_bundle(name, sources, read):
+    """Contents of bundle `name` from its source paths; read(path) returns a source's text"""
+    if name.endswith('.css'):
+        parts = [rebase_css_urls(_CHARSET_RULE.sub('', read(source)), source, name) for source in sources]
+        # @charset is only valid as the very first rule
+        return CHARSET + minify_css('\n'.join(parts))
+    # A script without a trailing semicolon must not run into the next one
+    return '\n;\n'.join(_SOURCE_MAP.sub('', read(source)).strip() for source in sources) + '\n'
@@ -0,0 +1,140 @@
+# shipments/cache.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import aprefetch_related_objects, prefetch_related_objects
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from .models import ShipmentEvent, packages_prefetch
+
+TRACK_RESULT_TEMPLATE = 'track_result.html'
+
+
+def track_result_cache_key(tracking_key):
+    return f'shipments:track_result:{tracking_key}'
+
+
+def render_track_result(shipment, reference_version):
+    """
+    Rendered tracking result fragment for a shipment loaded with_related().
+
+    Entries are stored per tracking number together with the shipment's
+    updated_at, so a save made in another worker process (whose signals
+    cannot reach this process's local cache) is never served stale, and
+    with the refdata.reference_data_version() they were rendered under,
+    so renaming a status, carrier or country shows up at once too.
+    Packages and the status timeline are only fetched when the fragment
+    has to be re-rendered.
+    """
+    key = track_result_cache_key(shipment.tracking_key)
+    cached = cache.get(key)
+    if cached is not None and cached[:2] == (shipment.updated_at, reference_version):
+        return mark_safe(cached[2])
+
+    prefetch_related_objects([shipment], packages_prefetch())
+    html = _render_track_result(shipment, ShipmentEvent.objects.timeline(shipment))
+    cache.set(key, (shipment.updated_at, reference_version, str(html)), settings.TRACK_RESULT_CACHE_TIMEOUT)
+    return html
+
+
+async def arender_track_result(shipment, reference_version):
+    """
+    render_track_result() for async views: packages and the timeline are
+    fully loaded before the template runs, so rendering never touches the
+    database from the event loop.
+    """
+    key = track_result_cache_key(shipment.tracking_key)
+    cached = await cache.aget(key)
+    if cached is not None and cached[:2] == (shipment.updated_at, reference_version):
+        return mark_safe(cached[2])
+
+    await aprefetch_related_objects([shipment], packages_prefetch())
+    events = [event async for event in ShipmentEvent.objects.timeline(shipment)]
+    html = _render_track_result(shipment, events)
+    await cache.aset(key, (shipment.updated_at, reference_version, str(html)), settings.TRACK_RESULT_CACHE_TIMEOUT)
+    return html
+
+
+def _render_track_result(shipment, events):
+    return render_to_string(TRACK_RESULT_TEMPLATE, {
+        'shipment': shipment,
+        'packages': shipment.packages_list.all(),
+        'events': events,
+    })
+
+
+def invalidate_track_result(tracking_key):
+    if tracking_key:
+        cache.delete(track_result_cache_key(tracking_key))
+
+
+def track_page_validators(request, updated_at, reference_version):
+    """
+    (ETag, Last-Modified) for a tracking page showing a shipment last
+    changed at `updated_at`. Package edits bump the shipment's updated_at
+    (see signals.package_changed), so it covers the packages too; the
+    dropdown names it shows are covered by `reference_version` in the ETag.
+    The page embeds a CSRF token, so the visitor's CSRF secret is part of
+    the ETag (CsrfViewMiddleware puts it in META, including on a first visit).
+    """
+    csrf_cookie = request.META.get('CSRF_COOKIE', '')
+    digest = hashlib.sha1(f'{updated_at.isoformat()}|{reference_version}|{csrf_cookie}'.encode()).hexdigest()
+    return f'"{digest}"', int(updated_at.timestamp())
+
+
+def patch_track_page_headers(response, etag=None, last_modified=None):
+    """
+    Browsers may keep the page but must revalidate it; shared caches (CDNs,
+    reverse proxies) must not store it because of the per-visitor CSRF token.
+    """
+    if etag:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True, max_age=0)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+# Stands in for the visitor's CSRF token in cached pages
+PAGE_CSRF_PLACEHOLDER = 'page-cache-csrf-token-placeholder'
+
+
+def page_cache_key(template_name):
+    return f'shipments:page:{settings.PAGE_CACHE_VERSION}:{get_language()}:{template_name}'
+
+
+def render_static_page(request, template_name, context=None):
+    """
+    render() for pages whose content never depends on the request.
+
+    The page is rendered once per PAGE_CACHE_VERSION and language, without
+    the request, and served from the cache after that. A {% csrf_token %}
+    renders as a placeholder that is swapped for the visitor's own token on
+    every response; only pages that have one touch the CSRF cookie and are
+    kept out of shared caches.
+    """
+    key = page_cache_key(template_name)
+    cached = cache.get(key)
+    if cached is None:
+        html = render_to_string(template_name, {**(context or {}), 'csrf_token': PAGE_CSRF_PLACEHOLDER})
+        cached = (html, PAGE_CSRF_PLACEHOLDER in html)
+        if settings.PAGE_CACHE_TIMEOUT:
+            cache.set(key, cached, settings.PAGE_CACHE_TIMEOUT)
+
+    html, has_csrf_token = cached
+    if has_csrf_token:
+        html = html.replace(PAGE_CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(html)
+    if has_csrf_token:
+        patch_cache_control(response, private=True, max_age=0)
+        patch_vary_headers(response, ('Cookie',))
+    else:
+        patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,56 @@
+# shipments/checkdigits.py
+"""
+Check digit algorithms for the tracking number formats we issue.
+
+Each function takes the normalized number up to (not including) its check
+character and returns that character. UPS, USPS, FedEx and DHL use the
+carriers' published schemes, so real numbers from those carriers validate
+too; Amazon-style and default numbers use Luhn mod 36.
+"""
+import string
+
+ALPHANUMERIC = string.digits + string.ascii_uppercase
+
+
+def mod10_check_digit(body):
+    """USPS IMpb / FedEx Ground: weights 3,1,3,... from the rightmost digit"""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+
+def ups_check_digit(body):
+    """UPS 1Z numbers: letters map to (ord - 63) % 10, even positions count double"""
+    values = [int(c) if c.isdigit() else (ord(c) - 63) % 10 for c in body[2:]]
+    total = sum(values[0::2]) + 2 * sum(values[1::2])
+    return str((10 - total % 10) % 10)
+
+
+def s10_check_digit(body):
+    """UPU S10 (EC123456785US): weights 8,6,4,2,3,5,9,7 over the 8-digit serial"""
+    total = sum(int(d) * w for d, w in zip(body[-8:], (8, 6, 4, 2, 3, 5, 9, 7)))
+    check = 11 - total % 11
+    return str({10: 0, 11: 5}.get(check, check))
+
+
+def fedex_check_digit(body):
+    """FedEx Express 12-digit: weights 1,3,7,... from the right, mod 11"""
+    weights = (1, 3, 7)
+    total = sum(int(d) * weights[i % 3] for i, d in enumerate(reversed(body)))
+    return str(total % 11 % 10)
+
+
+def dhl_check_digit(body):
+    """DHL Express waybill: the 9-digit number mod 7"""
+    return str(int(body) % 7)
+
+
+def mod36_check_digit(body):
+    """Luhn mod 36 over letters and digits; other characters are ignored"""
+    n = len(ALPHANUMERIC)
+    factor = 2
+    total = 0
+    for char in reversed([c for c in body if c in ALPHANUMERIC]):
+        addend = factor * ALPHANUMERIC.index(char)
+        total += addend // n + addend % n
+        factor = 1 if factor == 2 else 2
+    return ALPHANUMERIC[(n - total % n) % n]
@@ -0,0 +1,91 @@
+# shipments/exports.py
+"""
+Streaming CSV/JSONL export of shipments.
+
+Rows are read with values_list(...).iterator() and written straight into a
+StreamingHttpResponse, so exporting the whole table never holds more than
+one chunk of rows in memory. Column names match what import_shipments
+expects, so an export can be re-imported as is.
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# (column name, ORM lookup); dropdowns are exported by name
+EXPORT_COLUMNS = (
+    ('shipment_number', 'shipment_number'),
+    ('shipper_name', 'shipper_name'),
+    ('shipper_phone', 'shipper_phone'),
+    ('shipper_address', 'shipper_address'),
+    ('shipper_email', 'shipper_email'),
+    ('receiver_name', 'receiver_name'),
+    ('receiver_phone', 'receiver_phone'),
+    ('receiver_address', 'receiver_address'),
+    ('receiver_email', 'receiver_email'),
+    ('shipment_type', 'shipment_type__name'),
+    ('courier', 'courier__name'),
+    ('weight_kg', 'weight_kg'),
+    ('packages', 'packages'),
+    ('mode', 'mode__name'),
+    ('product', 'product__name'),
+    ('quantity', 'quantity'),
+    ('total_freight', 'total_freight'),
+    ('payment_mode', 'payment_mode__name'),
+    ('carrier', 'carrier__name'),
+    ('carrier_reference_no', 'carrier_reference_no'),
+    ('origin', 'origin__name'),
+    ('destination', 'destination__name'),
+    ('departure_time', 'departure_time'),
+    ('pickup_time', 'pickup_time'),
+    ('pickup_date', 'pickup_date'),
+    ('expected_delivery_date', 'expected_delivery_date'),
+    ('comments', 'comments'),
+    ('date', 'date'),
+    ('time', 'time'),
+    ('location', 'location__name'),
+    ('status', 'status__name'),
+    ('remarks', 'remarks'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the generator"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Flat tuples for EXPORT_COLUMNS, fetched chunk by chunk in primary key order"""
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+def iter_jsonl(queryset):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for row in export_rows(queryset):
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def streaming_export_response(queryset, fmt='csv'):
+    rows = iter_csv(queryset) if fmt == 'csv' else iter_jsonl(queryset)
+    response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[fmt])
+    filename = f"shipments-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
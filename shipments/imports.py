@@ -0,0 +1,233 @@
+# shipments/imports.py
+"""
+Streaming import of partner manifests into Shipment and Package.
+
+Rows flow through generators (read -> parse -> batch -> insert), so memory
+use depends on the batch size, not on the size of the file.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import (
+    Shipment, Package, ShipmentEvent,
+    Courier, ShipmentType, Mode, Product, PaymentMode,
+    Carrier, Country, StatusType, PieceType
+)
+from .refdata import reference_table
+from .reservations import ReservationError, release_tracking_numbers, reserve_tracking_numbers
+from .rollups import record_shipments
+from .search import index_shipments
+from .utils import normalize_tracking_number
+from .validators import is_plausible_tracking_number
+
+# Dropdown FKs are given by name in manifests
+SHIPMENT_LOOKUPS = {
+    'shipment_type': ShipmentType,
+    'courier': Courier,
+    'mode': Mode,
+    'product': Product,
+    'payment_mode': PaymentMode,
+    'carrier': Carrier,
+    'origin': Country,
+    'destination': Country,
+    'location': Country,
+    'status': StatusType,
+}
+PACKAGE_LOOKUPS = {
+    'piece_type': PieceType,
+}
+SKIPPED_FIELDS = {'id', 'shipment_number', 'tracking_key', 'created_at', 'updated_at'}
+
+
+class RowError(Exception):
+    """A manifest row that cannot be imported"""
+
+
+def read_rows(path, fmt):
+    """Yield (line number, row dict) from a CSV or JSONL manifest"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    yield line_no, RowError(f"Invalid JSON: {exc}")
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, RowError("Expected a JSON object")
+                    continue
+                yield line_no, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ReferenceTable:
+    """Case-insensitive name -> id lookups for the dropdown models, from the reference data cache"""
+
+    def __init__(self, models):
+        self._tables = {model: reference_table(model) for model in set(models)}
+
+    def resolve(self, model, name):
+        pk = self._tables[model].id_for(name)
+        if pk is None:
+            raise RowError(f"Unknown {model._meta.verbose_name} '{name}'")
+        return pk
+
+
+def _parse_fields(model, row, lookups, references):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.name in SKIPPED_FIELDS or field.name == 'shipment':
+            continue
+        raw = row.get(field.name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, ''):
+            if not (field.null or field.blank):
+                raise RowError(f"Missing {field.name}")
+            values[field.attname] = None if field.null else ''
+        elif field.name in lookups:
+            values[field.attname] = references.resolve(lookups[field.name], raw)
+        else:
+            try:
+                values[field.attname] = field.to_python(raw)
+            except ValidationError as exc:
+                raise RowError(f"Invalid {field.name}: {'; '.join(exc.messages)}")
+    return values
+
+
+def parse_row(row, references):
+    """Build an unsaved Shipment and its unsaved Packages from a manifest row"""
+    if isinstance(row, RowError):
+        raise row
+
+    shipment = Shipment(**_parse_fields(Shipment, row, SHIPMENT_LOOKUPS, references))
+    # Rows without a number get one reserved when their batch is inserted
+    shipment.shipment_number = str(row.get('shipment_number') or '').strip()
+    shipment.tracking_key = normalize_tracking_number(shipment.shipment_number)
+    if shipment.tracking_key and not is_plausible_tracking_number(shipment.tracking_key):
+        raise RowError(f"Invalid shipment_number: {shipment.shipment_number}")
+
+    packages = row.get('packages_list') or []
+    if isinstance(packages, str):
+        try:
+            packages = json.loads(packages)
+        except ValueError as exc:
+            raise RowError(f"Invalid packages_list JSON: {exc}")
+    if not isinstance(packages, list):
+        raise RowError("packages_list must be a list")
+    shipment_packages = [
+        Package(**_parse_fields(Package, package, PACKAGE_LOOKUPS, references))
+        for package in packages
+    ]
+    return shipment, shipment_packages
+
+
+class ShipmentImporter:
+    """
+    Insert manifest rows with bulk_create.
+
+    Each batch costs a bounded number of queries (number reservation per
+    carrier, duplicate check, one insert per table, search indexing, one
+    upsert per 100 dashboard rollup buckets), and every `batches_per_transaction`
+    batches are committed together.
+    """
+
+    def __init__(self, batch_size=1000, batches_per_transaction=10, on_reject=None):
+        self.batch_size = batch_size
+        self.batches_per_transaction = batches_per_transaction
+        self.on_reject = on_reject or (lambda line_no, row, error: None)
+        self.imported = 0
+        self.rejected = 0
+
+    def reject(self, line_no, row, error):
+        self.rejected += 1
+        self.on_reject(line_no, row, str(error))
+
+    def run(self, rows):
+        references = ReferenceTable([*SHIPMENT_LOOKUPS.values(), *PACKAGE_LOOKUPS.values()])
+        parsed = self._parse(rows, references)
+        for chunk in batched(batched(parsed, self.batch_size), self.batches_per_transaction):
+            with transaction.atomic():
+                for batch in chunk:
+                    self._insert(batch)
+            yield self.imported, self.rejected
+
+    def _parse(self, rows, references):
+        for line_no, row in rows:
+            try:
+                yield line_no, row, *parse_row(row, references)
+            except RowError as exc:
+                self.reject(line_no, row, exc)
+
+    def _assign_numbers(self, batch):
+        """Reserve numbers for unnumbered rows, one reservation call per carrier"""
+        by_carrier = {}
+        for item in batch:
+            if not item[2].tracking_key:
+                by_carrier.setdefault(str(item[1].get('carrier') or '').strip(), []).append(item)
+
+        numbered = [item for item in batch if item[2].tracking_key]
+        for carrier_name, items in by_carrier.items():
+            try:
+                numbers = reserve_tracking_numbers(carrier_name, len(items))
+            except ReservationError as exc:
+                for line_no, row, _, _ in items:
+                    self.reject(line_no, row, exc)
+                continue
+            for item, number in zip(items, numbers):
+                item[2].shipment_number = number
+                item[2].tracking_key = normalize_tracking_number(number)
+                numbered.append(item)
+        return numbered
+
+    def _insert(self, batch):
+        batch = self._assign_numbers(batch)
+        existing = set(Shipment.objects.filter(
+            tracking_key__in=[item[2].tracking_key for item in batch]
+        ).values_list('tracking_key', flat=True))
+
+        accepted = []
+        for line_no, row, shipment, packages in batch:
+            if shipment.tracking_key in existing:
+                self.reject(line_no, row, f"Duplicate tracking number {shipment.shipment_number}")
+                continue
+            existing.add(shipment.tracking_key)
+            accepted.append((line_no, row, shipment, packages))
+        if not accepted:
+            return
+
+        try:
+            with transaction.atomic():
+                shipments = Shipment.objects.bulk_create([item[2] for item in accepted])
+                package_rows = []
+                for shipment, (_, _, _, packages) in zip(shipments, accepted):
+                    for package in packages:
+                        package.shipment = shipment
+                        package_rows.append(package)
+                Package.objects.bulk_create(package_rows)
+                ShipmentEvent.objects.bulk_create(
+                    [ShipmentEvent.from_shipment(shipment) for shipment in shipments])
+                # bulk_create sends no post_save, so index and count the batch here
+                index_shipments(shipments)
+                record_shipments(shipments)
+                release_tracking_numbers(shipment.tracking_key for shipment in shipments)
+        except IntegrityError as exc:
+            for line_no, row, _, _ in accepted:
+                self.reject(line_no, row, f"Database error: {exc}")
+            return
+        self.imported += len(accepted)
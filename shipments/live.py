@@ -0,0 +1,116 @@
+# shipments/live.py
+"""
+Live status feed for open tracking pages (Server-Sent Events).
+
+Each worker process keeps one StatusBroker. Watchers subscribe to a
+tracking key and get an asyncio.Queue; when a ShipmentEvent is recorded
+(status, location or remarks changed in the admin) the signal publishes
+one message and the broker fans it out to every queue for that key, so a
+change costs the same whatever the number of watchers and nobody polls
+the database.
+
+The broker is in-process: a change saved by one worker only reaches
+watchers connected to that same worker. Run the admin and the live feed
+in one ASGI process, or put a shared broker behind publish().
+
+The feed is only offered to requests served over ASGI. Under WSGI each
+open stream would hold a worker for good (Django even reads an async
+response to the end before sending any of it), so there the tracking page
+leaves the feed out and the feed itself answers 204 No Content, which
+tells EventSource clients to stop reconnecting.
+"""
+import asyncio
+import json
+import threading
+
+from django.core.handlers.asgi import ASGIRequest
+
+from .models import Shipment
+
+# Messages waiting for a slow client; older ones are dropped first
+QUEUE_SIZE = 16
+
+
+class StatusBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers = {}
+
+    def subscribe(self, tracking_key):
+        """Queue receiving messages for `tracking_key`; call from the watcher's event loop"""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._watchers.setdefault(tracking_key, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, tracking_key, queue):
+        with self._lock:
+            watchers = self._watchers.get(tracking_key, {})
+            watchers.pop(queue, None)
+            if not watchers:
+                self._watchers.pop(tracking_key, None)
+
+    def watcher_count(self, tracking_key):
+        with self._lock:
+            return len(self._watchers.get(tracking_key, ()))
+
+    def publish(self, tracking_key, message):
+        """Deliver `message` to every watcher of `tracking_key`; safe from any thread"""
+        with self._lock:
+            watchers = list(self._watchers.get(tracking_key, {}).items())
+        for queue, loop in watchers:
+            if loop.is_closed():
+                continue
+            loop.call_soon_threadsafe(_deliver, queue, message)
+
+
+def _deliver(queue, message):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+broker = StatusBroker()
+
+
+def live_status_available(request):
+    """Whether `request` came in over ASGI, where an open feed costs a coroutine and not a worker"""
+    return isinstance(request, ASGIRequest)
+
+
+def status_message(record, timestamp):
+    """Small JSON-ready payload from a Shipment or ShipmentEvent"""
+    return {
+        'status': record.status.name if record.status_id else None,
+        'location': record.location.name if record.location_id else None,
+        'remarks': record.remarks or '',
+        'date': record.date,
+        'time': record.time,
+        'timestamp': timestamp,
+    }
+
+
+def sse_message(data, event='status'):
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+async def status_stream(shipment_id, tracking_key, keepalive):
+    """
+    SSE lines for one watcher: the current status first, then one message
+    per change and a comment every `keepalive` seconds to hold the
+    connection open through proxies.
+    """
+    # Subscribe before reading the current status so no change falls in between
+    queue = broker.subscribe(tracking_key)
+    try:
+        shipment = await Shipment.objects.select_related('status', 'location').aget(pk=shipment_id)
+        yield 'retry: 5000\n' + sse_message(status_message(shipment, shipment.updated_at))
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield sse_message(message)
+    finally:
+        broker.unsubscribe(tracking_key, queue)
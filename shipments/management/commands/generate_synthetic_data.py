@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipments.synthetic import create_synthetic_shipments
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic shipments for benchmarking: packages, "
+        "every dropdown filled in and tracking numbers in each carrier's format. "
+        "Missing dropdown rows are created."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shipments', type=int, default=10000,
+                            help='Number of shipments to create (default: 10000)')
+        parser.add_argument('--max-packages', type=int, default=3,
+                            help='Packages per shipment, chosen from 1 to this (default: 3)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, for reproducible datasets (default: 0)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk insert (default: 1000)')
+
+    def handle(self, *args, **options):
+        if options['shipments'] < 1 or options['max_packages'] < 1 or options['batch_size'] < 1:
+            raise CommandError("Counts and sizes must be positive")
+
+        started = time.perf_counter()
+        imported = rejected = 0
+        for imported, rejected in create_synthetic_shipments(
+                options['shipments'], seed=options['seed'],
+                max_packages=options['max_packages'], batch_size=options['batch_size']):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{imported} created ({imported / elapsed:,.0f} rows/sec)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {imported} synthetic shipments in {time.perf_counter() - started:.1f}s"))
+        if rejected:
+            self.stdout.write(self.style.WARNING(
+                f"{rejected} rows skipped because their generated tracking number already existed"))
@@ -0,0 +1,61 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipments.imports import ShipmentImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import shipments (and their packages) from a CSV or JSONL manifest. "
+        "Dropdown columns such as carrier, status or origin are given by name; "
+        "packages are a JSON list in the 'packages_list' key/column."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL manifest to import')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Manifest format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per bulk insert (default: 1000)')
+        parser.add_argument('--batches-per-transaction', type=int, default=10,
+                            help='Bulk inserts committed together (default: 10)')
+        parser.add_argument('--rejects',
+                            help='Where to write rejected rows as JSONL (default: <path>.rejects.jsonl)')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        if options['batch_size'] < 1 or options['batches_per_transaction'] < 1:
+            raise CommandError("Batch sizes must be positive")
+        rejects_path = Path(options['rejects'] or f"{path}.rejects.jsonl")
+
+        with open(rejects_path, 'w', encoding='utf-8') as rejects:
+            def on_reject(line_no, row, error):
+                record = {'line': line_no, 'error': error, 'row': row if isinstance(row, dict) else None}
+                rejects.write(json.dumps(record, default=str) + '\n')
+
+            importer = ShipmentImporter(
+                batch_size=options['batch_size'],
+                batches_per_transaction=options['batches_per_transaction'],
+                on_reject=on_reject,
+            )
+            started = time.perf_counter()
+            for imported, rejected in importer.run(read_rows(path, fmt)):
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{imported} imported, {rejected} rejected ({imported / elapsed:,.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} shipments in {elapsed:.1f}s "
+            f"({importer.imported / elapsed if elapsed else 0:,.0f} rows/sec)"))
+        if importer.rejected:
+            self.stdout.write(self.style.WARNING(
+                f"{importer.rejected} rows rejected, see {rejects_path}"))
+        else:
+            rejects_path.unlink()
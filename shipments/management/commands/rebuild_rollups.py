@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipments.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the dashboard rollups from the shipments table. Run it after "
+        "bulk changes that bypass signals (QuerySet.update(), raw SQL, renaming "
+        "the DELIVERED status); saves made meanwhile may be counted twice or lost."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        buckets = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {buckets} rollup buckets in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,86 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from shipments.benchmarks import BENCHMARKS, BenchmarkContext, compare, run_benchmarks
+from shipments.models import Shipment
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the tracking page, admin changelist and search, tracking number "
+        "generation, import and export against the current database and write "
+        "the results as JSON. Create data with generate_synthetic_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', help=f"Comma separated benchmarks (default: all of {', '.join(BENCHMARKS)})")
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per benchmark (default: 50)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--import-rows', type=int, default=500,
+                            help='Rows per import run (default: 500)')
+        parser.add_argument('--export-rows', type=int, default=1000,
+                            help='Shipments per export run (default: 1000)')
+        parser.add_argument('--output', help='Write the JSON here instead of to stdout')
+        parser.add_argument('--compare', help='Earlier JSON output to report median changes against')
+        parser.add_argument('--fail-above', type=float,
+                            help='With --compare, fail if any median got slower by more than this percentage')
+
+    def handle(self, *args, **options):
+        names = options['only'].split(',') if options['only'] else list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+        if min(options['repeat'], options['import_rows'], options['export_rows']) < 1:
+            raise CommandError("Counts must be positive")
+        shipments = Shipment.objects.count()
+        if not shipments:
+            raise CommandError("No shipments to benchmark; run generate_synthetic_data first")
+
+        context = BenchmarkContext(options['seed'], options['import_rows'], options['export_rows'])
+        report = {
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'shipments': shipments,
+            'results': run_benchmarks(context, names, options['repeat']),
+        }
+
+        changes = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as handle:
+                changes = compare(json.load(handle)['results'], report['results'])
+            report['changes_percent'] = changes
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output + '\n')
+            for name, summary in report['results'].items():
+                change = f" ({changes[name]:+.1f}%)" if name in changes else ''
+                self.stdout.write(f"{name:>20}  median {summary['median_us'] / 1000:9.2f}ms{change}")
+        else:
+            self.stdout.write(output)
+
+        if options['fail_above'] is not None:
+            slower = [name for name, change in changes.items() if change > options['fail_above']]
+            if slower:
+                raise CommandError(f"Slower than the baseline: {', '.join(slower)}")
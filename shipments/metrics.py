@@ -0,0 +1,278 @@
+# shipments/metrics.py
+"""
+Per-view request metrics, aggregated in-process.
+
+RequestMetricsMiddleware samples requests (REQUEST_METRICS_SAMPLE_RATE) and
+records, per resolved view name: wall time, number of database queries,
+time spent in the database, template render time and response size. Each
+is a fixed-bucket histogram, so memory does not grow with traffic and
+p50/p95/p99 are estimated from the buckets the way Prometheus'
+histogram_quantile() does.
+
+Query and template timings reach the sampled request through a context
+variable, which asgiref copies into sync_to_async threads, so async views
+are measured like sync ones:
+
+* a database execute wrapper is installed on every new connection
+  (signals.request_metrics_connection);
+* TimedDjangoTemplates, the template backend, times top-level renders.
+
+With the rate at 0 the middleware removes itself and nothing is installed.
+Numbers are per worker process; the Prometheus endpoint reports the worker
+that answered the scrape.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+# name: (help text, buckets)
+METRICS = {
+    'duration_seconds': ('Request wall time', TIME_BUCKETS),
+    'db_queries': ('Database queries per request', QUERY_BUCKETS),
+    'db_seconds': ('Time spent in database queries', TIME_BUCKETS),
+    'template_seconds': ('Time spent rendering templates', TIME_BUCKETS),
+    'response_bytes': ('Response body size (not measured for streaming responses)', SIZE_BUCKETS),
+}
+
+UNRESOLVED = '<unresolved>'
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    """Counters for the request being measured"""
+    __slots__ = ('db_queries', 'db_seconds', 'template_seconds', 'rendering')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimated q-quantile, interpolating linearly inside the bucket it falls in"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, values):
+        with self._lock:
+            histograms = self._views.get(view_name)
+            if histograms is None:
+                histograms = self._views[view_name] = {
+                    name: Histogram(buckets) for name, (_, buckets) in METRICS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        """{view name: {metric: Histogram}}, copied so it can be read without the lock"""
+        with self._lock:
+            return {
+                view_name: {name: histogram.copy() for name, histogram in histograms.items()}
+                for view_name, histograms in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def sampling_enabled():
+    return bool(getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0))
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: time the query if the current request is sampled"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.db_queries += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        # Nested renders (render_to_string inside a tag) are already being timed
+        if stats is None or stats.rendering:
+            return super().render(context, request)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+            stats.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time counted for sampled requests"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not sampling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        values = {
+            'duration_seconds': duration,
+            'db_queries': stats.db_queries,
+            'db_seconds': stats.db_seconds,
+            'template_seconds': stats.template_seconds,
+        }
+        if not response.streaming:
+            values['response_bytes'] = len(response.content)
+        registry.observe((match.view_name or match._func_path) if match else UNRESOLVED, values)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(snapshot, prefix='tracking_request_'):
+    """Histograms in the Prometheus text exposition format"""
+    lines = []
+    for name, (help_text, buckets) in METRICS.items():
+        metric = prefix + name
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for view_name, histograms in snapshot.items():
+            histogram = histograms[name]
+            view = _label(view_name)
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{view="{view}"}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def summary_rows(snapshot):
+    """One row per view for the stats page, times in milliseconds"""
+    rows = []
+    for view_name, histograms in snapshot.items():
+        duration = histograms['duration_seconds']
+        size = histograms['response_bytes']
+        rows.append({
+            'view': view_name,
+            'requests': duration.count,
+            'p50_ms': _ms(duration.quantile(0.5)),
+            'p95_ms': _ms(duration.quantile(0.95)),
+            'p99_ms': _ms(duration.quantile(0.99)),
+            'avg_queries': round(histograms['db_queries'].sum / duration.count, 1),
+            'p95_queries': histograms['db_queries'].quantile(0.95),
+            'avg_db_ms': _ms(histograms['db_seconds'].sum / duration.count),
+            'avg_template_ms': _ms(histograms['template_seconds'].sum / duration.count),
+            'avg_bytes': round(size.sum / size.count) if size.count else None,
+        })
+    return rows
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+from shipments.utils import normalize_tracking_number
+
+
+def populate_tracking_keys(apps, schema_editor):
+    Shipment = apps.get_model('shipments', 'Shipment')
+
+    seen = set()
+    batch = []
+    rows = Shipment.objects.order_by('pk').values_list('pk', 'shipment_number')
+    for pk, shipment_number in rows.iterator(chunk_size=2000):
+        tracking_key = normalize_tracking_number(shipment_number)
+        # Older rows may collide once normalized; the oldest one keeps the key
+        if not tracking_key or tracking_key in seen:
+            continue
+        seen.add(tracking_key)
+        batch.append(Shipment(pk=pk, tracking_key=tracking_key))
+        if len(batch) >= 2000:
+            Shipment.objects.bulk_update(batch, ['tracking_key'])
+            batch = []
+    if batch:
+        Shipment.objects.bulk_update(batch, ['tracking_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0004_alter_shipment_options_shipment_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='tracking_key',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(populate_tracking_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shipment',
+            name='tracking_key',
+            field=models.CharField(editable=False, max_length=200, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_current_status(apps, schema_editor):
+    """Start every existing shipment's timeline with its current status"""
+    Shipment = apps.get_model('shipments', 'Shipment')
+    ShipmentEvent = apps.get_model('shipments', 'ShipmentEvent')
+
+    batch = []
+    rows = Shipment.objects.order_by('pk').values_list(
+        'pk', 'updated_at', 'date', 'time', 'location_id', 'status_id', 'remarks')
+    for pk, updated_at, date, time, location_id, status_id, remarks in rows.iterator(chunk_size=2000):
+        batch.append(ShipmentEvent(
+            shipment_id=pk, timestamp=updated_at, date=date, time=time,
+            location_id=location_id, status_id=status_id, remarks=remarks,
+        ))
+        if len(batch) >= 2000:
+            ShipmentEvent.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ShipmentEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0005_shipment_tracking_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shipments.country')),
+                ('shipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='shipments.shipment')),
+                ('status', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shipments.statustype')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['shipment', 'timestamp'], name='shipment_event_timeline_idx')],
+            },
+        ),
+        migrations.RunPython(seed_current_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0006_shipmentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingNumberReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tracking_key', models.CharField(max_length=200, unique=True)),
+                ('batch', models.UUIDField(db_index=True)),
+                ('reserved_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
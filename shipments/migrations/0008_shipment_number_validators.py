@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:37
+
+import shipments.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0007_trackingnumberreservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='shipment_number',
+            field=models.CharField(max_length=200, validators=[shipments.validators.validate_tracking_number]),
+        ),
+    ]
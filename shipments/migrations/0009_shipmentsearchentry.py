@@ -0,0 +1,87 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from shipments.search import FTS_TABLE, search_document
+
+ENTRY_TABLE = 'shipments_shipmentsearchentry'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        document, content='{ENTRY_TABLE}', content_rowid='shipment_id',
+        prefix='2 3 4', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shipment_id, new.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shipment_id, old.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shipment_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shipment_id, new.document);
+    END""",
+]
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRESQL_FORWARD = [
+    f"CREATE INDEX shipment_search_document_idx ON {ENTRY_TABLE} "
+    "USING gin (to_tsvector('simple', document))",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS shipment_search_document_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD})
+
+
+def index_existing_shipments(apps, schema_editor):
+    Shipment = apps.get_model('shipments', 'Shipment')
+    ShipmentSearchEntry = apps.get_model('shipments', 'ShipmentSearchEntry')
+
+    batch = []
+    rows = Shipment.objects.select_related('carrier').order_by('pk')
+    for shipment in rows.iterator(chunk_size=2000):
+        carrier_name = shipment.carrier.name if shipment.carrier else ''
+        batch.append(ShipmentSearchEntry(
+            shipment_id=shipment.pk, document=search_document(shipment, carrier_name)))
+        if len(batch) >= 2000:
+            ShipmentSearchEntry.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ShipmentSearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0008_shipment_number_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipmentSearchEntry',
+            fields=[
+                ('shipment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='shipments.shipment')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_shipments, migrations.RunPython.noop),
+    ]
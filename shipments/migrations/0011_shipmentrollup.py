@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0010_shipment_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('carrier_id', models.PositiveIntegerField(default=0)),
+                ('status_id', models.PositiveIntegerField(default=0)),
+                ('origin_id', models.PositiveIntegerField(default=0)),
+                ('destination_id', models.PositiveIntegerField(default=0)),
+                ('delivery', models.CharField(choices=[('on_time', 'On time'), ('late', 'Late'), ('open', 'Not delivered')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'carrier_id', 'status_id', 'origin_id', 'destination_id', 'delivery'), name='shipment_rollup_bucket')],
+            },
+        ),
+    ]
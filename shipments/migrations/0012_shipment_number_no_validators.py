@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0011_shipmentrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='shipment_number',
+            field=models.CharField(max_length=200),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+from shipments.rollups import DELIVERED, rollup_rows
+
+
+def count_existing_shipments(apps, schema_editor):
+    Shipment = apps.get_model('shipments', 'Shipment')
+    ShipmentRollup = apps.get_model('shipments', 'ShipmentRollup')
+    StatusType = apps.get_model('shipments', 'StatusType')
+
+    delivered = [status.pk for status in StatusType.objects.all()
+                 if status.name.strip().casefold() == DELIVERED]
+    ShipmentRollup.objects.bulk_create(
+        [ShipmentRollup(**row) for row in rollup_rows(Shipment.objects.all(), delivered)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0012_shipment_number_no_validators'),
+    ]
+
+    operations = [
+        # One bucket per (day, carrier, status, origin, destination) was nearly
+        # one row per shipment; the counts are recomputed below anyway
+        migrations.DeleteModel(
+            name='ShipmentRollup',
+        ),
+        migrations.CreateModel(
+            name='ShipmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('carrier', 'Carrier'), ('status', 'Status'), ('origin', 'Origin'), ('destination', 'Destination')], max_length=12)),
+                ('value_id', models.PositiveIntegerField(default=0)),
+                ('delivery', models.CharField(choices=[('on_time', 'On time'), ('late', 'Late'), ('open', 'Not delivered')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'dimension', 'value_id', 'delivery'), name='shipment_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(count_existing_shipments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:45
+
+import re
+
+from django.db import migrations, models
+
+TRACKING_KEY_PATTERN = '^[-A-Z0-9#+./:_]+$'
+
+
+def check_existing_keys(apps, schema_editor):
+    """Refuse to migrate while a stored number has characters lookups would now turn away"""
+    Shipment = apps.get_model('shipments', 'Shipment')
+    pattern = re.compile(TRACKING_KEY_PATTERN)
+    keys = Shipment.objects.exclude(tracking_key=None).values_list('tracking_key', flat=True)
+    offending = [key for key in keys.iterator() if not pattern.match(key)]
+    if offending:
+        raise RuntimeError(
+            f"{len(offending)} shipment numbers contain characters other than letters, digits "
+            f"and - . / _ # + : (e.g. {', '.join(map(repr, offending[:5]))}); "
+            "correct them before migrating."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipments', '0013_shipmentrollup_by_dimension'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_existing_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shipment',
+            constraint=models.CheckConstraint(condition=models.Q(('tracking_key__isnull', True), ('tracking_key__regex', TRACKING_KEY_PATTERN), _connector='OR'), name='shipment_tracking_key_characters', violation_error_message='Tracking numbers may only contain letters, digits and - . / _ # + :'),
+        ),
+    ]
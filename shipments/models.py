@@ -1,4 +1,9 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import DEFERRED
+from django.utils import timezone
+
+from .utils import TRACKING_KEY_PATTERN, normalize_tracking_number
 
 
 # -----------------------------
@@ -70,9 +75,29 @@ class PieceType(models.Model):
 # -----------------------------
 # MAIN SHIPMENT MODEL
 # -----------------------------
+def packages_prefetch():
+    """Prefetch for a shipment's packages together with their piece types"""
+    return models.Prefetch('packages_list', queryset=Package.objects.select_related('piece_type'))
+
+
+class ShipmentQuerySet(models.QuerySet):
+    def for_tracking_number(self, tracking_number):
+        """Shipments matching a tracking number, resolved through the unique index"""
+        return self.filter(tracking_key=normalize_tracking_number(tracking_number))
+
+    def with_related(self):
+        """The dropdown FKs the public tracking page reads, joined into one query"""
+        return self.select_related(
+            'shipment_type', 'courier', 'mode', 'product', 'payment_mode',
+            'carrier', 'origin', 'destination', 'location', 'status',
+        )
+
+
 class Shipment(models.Model):
-    # Manual number for now
+    # Manual number for now; new numbers are validated by ShipmentAdminForm
     shipment_number = models.CharField(max_length=200)
+    # Normalized shipment_number, kept in sync by save() and used for lookups
+    tracking_key = models.CharField(max_length=200, unique=True, null=True, editable=False)
 
     # Shipper
     shipper_name = models.CharField(max_length=200)
@@ -117,13 +142,58 @@ class Shipment(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
-    
+
+    objects = ShipmentQuerySet.as_manager()
+
+    # Fields (attnames) that decide a shipment's dashboard rollup bucket
+    ROLLUP_FIELDS = (
+        'created_at', 'carrier_id', 'status_id', 'origin_id', 'destination_id',
+        'date', 'expected_delivery_date',
+    )
+    _rollup_values = None
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the newest-first ordering and keyset pagination (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='shipment_created_id_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(tracking_key__isnull=True) | models.Q(tracking_key__regex=TRACKING_KEY_PATTERN),
+                name='shipment_tracking_key_characters',
+                violation_error_message="Tracking numbers may only contain letters, digits and - . / _ # + :",
+            ),
+        ]
 
     def __str__(self):
         return f"Shipment {self.shipment_number}"
 
+    def clean(self):
+        super().clean()
+        tracking_key = normalize_tracking_number(self.shipment_number)
+        if tracking_key and Shipment.objects.filter(tracking_key=tracking_key).exclude(pk=self.pk).exists():
+            raise ValidationError({
+                'shipment_number': "A shipment with this tracking number already exists."
+            })
+
+    def save(self, *args, **kwargs):
+        self.tracking_key = normalize_tracking_number(self.shipment_number) or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'shipment_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'tracking_key'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the dashboard rollups counted this row under, so
+        # post_save can move it to its new bucket (see shipments/rollups.py)
+        loaded = dict(zip(field_names, values))
+        if all(loaded.get(name, DEFERRED) is not DEFERRED for name in cls.ROLLUP_FIELDS):
+            instance._rollup_values = {name: loaded[name] for name in cls.ROLLUP_FIELDS}
+        return instance
+
 
 # -----------------------------
 # PACKAGE INLINE MODEL
@@ -140,3 +210,128 @@ class Package(models.Model):
 
     def __str__(self):
         return f"Package {self.qty}x {self.piece_type}"
+
+
+# -----------------------------
+# STATUS HISTORY
+# -----------------------------
+class ShipmentEventQuerySet(models.QuerySet):
+    def timeline(self, shipment):
+        """A shipment's scan history, newest first, read from the (shipment, timestamp) index"""
+        return self.filter(shipment=shipment).select_related('location', 'status').order_by('-timestamp')
+
+
+class ShipmentEvent(models.Model):
+    """Append-only log of a shipment's status updates"""
+    STATUS_FIELDS = ('date', 'time', 'location', 'status', 'remarks')
+
+    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name="events")
+    timestamp = models.DateTimeField(default=timezone.now)
+    date = models.DateField()
+    time = models.TimeField()
+    location = models.ForeignKey(Country, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.ForeignKey(StatusType, on_delete=models.SET_NULL, null=True, related_name="+")
+    remarks = models.TextField(blank=True, null=True)
+
+    objects = ShipmentEventQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['shipment', 'timestamp'], name='shipment_event_timeline_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shipment_id} {self.status} @ {self.timestamp:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def from_shipment(cls, shipment, timestamp=None):
+        """Unsaved event snapshotting the shipment's current status fields"""
+        return cls(
+            shipment=shipment,
+            timestamp=timestamp or timezone.now(),
+            date=shipment.date,
+            time=shipment.time,
+            location_id=shipment.location_id,
+            status_id=shipment.status_id,
+            remarks=shipment.remarks,
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Shipment events are append-only and cannot be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Shipment events are append-only and cannot be deleted.")
+
+
+# -----------------------------
+# TRACKING NUMBER RESERVATIONS
+# -----------------------------
+class TrackingNumberReservation(models.Model):
+    """A generated tracking number held for a shipment that is not saved yet"""
+    tracking_key = models.CharField(max_length=200, unique=True)
+    batch = models.UUIDField(db_index=True)
+    reserved_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.tracking_key
+
+
+# -----------------------------
+# SEARCH INDEX
+# -----------------------------
+class ShipmentSearchEntry(models.Model):
+    """Normalized search document for one shipment, see shipments/search.py"""
+    shipment = models.OneToOneField(
+        Shipment, on_delete=models.CASCADE, primary_key=True, related_name='search_entry'
+    )
+    document = models.TextField()
+
+    def __str__(self):
+        return self.document
+
+
+# -----------------------------
+# DASHBOARD ROLLUPS
+# -----------------------------
+class ShipmentRollup(models.Model):
+    """
+    Shipment counts per creation day and delivery outcome, broken down by one
+    dimension at a time (carrier, status, origin or destination) and kept
+    current by signals (see shipments/rollups.py). Every shipment is counted
+    once in each dimension, so the table grows with days times dropdown
+    values, never with shipments. value_id is the dimension's FK id with 0
+    for "none", so every bucket is covered by the unique constraint; names
+    come from the reference data cache.
+    """
+    ON_TIME = 'on_time'
+    LATE = 'late'
+    OPEN = 'open'
+    DELIVERY_CHOICES = [(ON_TIME, 'On time'), (LATE, 'Late'), (OPEN, 'Not delivered')]
+
+    CARRIER = 'carrier'
+    STATUS = 'status'
+    ORIGIN = 'origin'
+    DESTINATION = 'destination'
+    DIMENSION_CHOICES = [
+        (CARRIER, 'Carrier'), (STATUS, 'Status'), (ORIGIN, 'Origin'), (DESTINATION, 'Destination'),
+    ]
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=12, choices=DIMENSION_CHOICES)
+    value_id = models.PositiveIntegerField(default=0)
+    delivery = models.CharField(max_length=10, choices=DELIVERY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'dimension', 'value_id', 'delivery'],
+                name='shipment_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.value_id} x{self.count}"
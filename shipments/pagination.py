@@ -0,0 +1,101 @@
+# shipments/pagination.py
+"""
+Keyset (seek) pagination for the shipment changelist.
+
+Pages are addressed by a cursor naming the (created_at, id) of the row
+they start after, so every page is one index range scan on
+shipment_created_id_idx however deep staff page, instead of an OFFSET
+that reads and throws away every earlier row. Counts stop at a cap, so the
+changelist never runs COUNT(*) over millions of rows either.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db import connections
+from django.db.models import Q
+
+# Newest first; the ordering the composite index serves
+KEYSET_ORDERING = ['-created_at', '-pk']
+
+OLDER = 'o'
+NEWER = 'n'
+
+
+def encode_cursor(direction, shipment):
+    return f'{direction}_{shipment.created_at.isoformat()}_{shipment.pk}'
+
+
+def decode_cursor(cursor):
+    """(direction, created_at, pk); raises ValueError for anything malformed"""
+    direction, rest = cursor.split('_', 1)
+    created_at, pk = rest.rsplit('_', 1)
+    if direction not in (OLDER, NEWER):
+        raise ValueError(f"Unknown cursor direction {direction!r}")
+    return direction, datetime.fromisoformat(created_at), int(pk)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    older_cursor: str = None
+    newer_cursor: str = None
+
+
+def keyset_page(queryset, per_page, cursor=None):
+    """
+    One page of `queryset` (ordered by KEYSET_ORDERING) starting after
+    `cursor`, newest first, with cursors for the neighbouring pages.
+    Costs one query of per_page + 1 rows.
+    """
+    if not cursor:
+        rows = list(queryset[:per_page + 1])
+        return KeysetPage(rows[:per_page], older_cursor=_cursor(OLDER, rows, per_page))
+
+    direction, created_at, pk = decode_cursor(cursor)
+    if direction == OLDER:
+        rows = list(queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )[:per_page + 1])
+        page = rows[:per_page]
+        return KeysetPage(
+            page,
+            older_cursor=_cursor(OLDER, rows, per_page),
+            newer_cursor=encode_cursor(NEWER, page[0]) if page else None,
+        )
+
+    rows = list(queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+    ).reverse()[:per_page + 1])
+    page = rows[:per_page][::-1]
+    return KeysetPage(
+        page,
+        older_cursor=encode_cursor(OLDER, page[-1]) if page else None,
+        newer_cursor=encode_cursor(NEWER, page[0]) if len(rows) > per_page else None,
+    )
+
+
+def _cursor(direction, rows, per_page):
+    """Cursor past the last row shown, if a row beyond the page was fetched"""
+    return encode_cursor(direction, rows[per_page - 1]) if len(rows) > per_page else None
+
+
+def estimate_count(queryset, cap):
+    """
+    (count, exact). Counts exactly up to `cap` rows, which is bounded work;
+    past that an unfiltered PostgreSQL table reports its planner estimate,
+    anything else just reports `cap`.
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    if count <= cap:
+        return count, True
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > cap:
+            return row[0], False
+    return cap, False
@@ -0,0 +1,137 @@
+# shipments/refdata.py
+"""
+Process-wide cache of the nine dropdown (reference data) tables.
+
+Each table is loaded once per process into an immutable id -> name map and
+served to admin widgets and filters, the importer and anything else that
+only needs names. Edits made through the ORM bump a per-table version key
+in the Django cache (see signals.reference_data_changed); every process
+compares its snapshot's version against that key before using it, so with
+a shared cache backend an admin edit in one worker is picked up by all the
+others at once. The default LocMemCache keeps the key per process, so
+snapshots are also reloaded once they are REFERENCE_DATA_MAX_AGE seconds
+old: other workers catch up within that time whatever the cache backend.
+
+reference_data_version() combines the version keys for caches of pages
+that show dropdown names next to other data (the tracking result), so a
+renamed status or carrier is never served from them.
+"""
+import hashlib
+import threading
+import uuid
+from time import monotonic
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import (
+    Carrier, Country, Courier, Mode, PaymentMode, PieceType, Product, ShipmentType, StatusType,
+)
+
+REFERENCE_MODELS = (
+    ShipmentType, Courier, Mode, Product, PaymentMode, Carrier, Country, StatusType, PieceType,
+)
+
+_lock = threading.Lock()
+_snapshots = {}
+
+
+class ReferenceSnapshot:
+    """Immutable snapshot of one dropdown table"""
+
+    def __init__(self, model, version, rows):
+        self.model = model
+        self.version = version
+        self.loaded_at = monotonic()
+        self.names = MappingProxyType(dict(rows))
+        ids = {}
+        # The oldest row wins when names collide once case-folded
+        for pk, name in reversed(rows):
+            ids[name.strip().casefold()] = pk
+        self.ids = MappingProxyType(ids)
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_for(self, name):
+        """Primary key for a name, ignoring case and surrounding spaces, or None"""
+        return self.ids.get(str(name).strip().casefold())
+
+    def instance(self, pk):
+        """Model instance carrying just id and name, built without a query"""
+        return self.model.from_db(self.model.objects.db, ['id', 'name'], [pk, self.names[pk]])
+
+
+def _version_key(model):
+    return f'shipments:refdata:{model._meta.label_lower}:version'
+
+
+def reference_table(model):
+    """Current snapshot of a dropdown table, reloading it if another process changed it or it is too old"""
+    version = cache.get(_version_key(model))
+    snapshot = _snapshots.get(model)
+    if (snapshot is not None and version is not None and snapshot.version == version
+            and monotonic() - snapshot.loaded_at < settings.REFERENCE_DATA_MAX_AGE):
+        return snapshot
+
+    if version is None:
+        # First use, or the version key was evicted: start a new version
+        version = uuid.uuid4().hex
+        cache.add(_version_key(model), version, None)
+        version = cache.get(_version_key(model), version)
+    rows = list(model.objects.order_by('pk').values_list('pk', 'name'))
+    snapshot = ReferenceSnapshot(model, version, rows)
+    with _lock:
+        _snapshots[model] = snapshot
+    return snapshot
+
+
+REFERENCE_VERSION_KEYS = tuple(_version_key(model) for model in REFERENCE_MODELS)
+
+
+def reference_data_version():
+    """A digest that changes whenever any dropdown table is edited; one cache round trip"""
+    versions = cache.get_many(REFERENCE_VERSION_KEYS)
+    for key in REFERENCE_VERSION_KEYS:
+        if key not in versions:
+            version = uuid.uuid4().hex
+            cache.add(key, version, None)
+            versions[key] = cache.get(key, version)
+    return _digest(versions)
+
+
+async def areference_data_version():
+    """reference_data_version() for async views"""
+    versions = await cache.aget_many(REFERENCE_VERSION_KEYS)
+    for key in REFERENCE_VERSION_KEYS:
+        if key not in versions:
+            version = uuid.uuid4().hex
+            await cache.aadd(key, version, None)
+            versions[key] = await cache.aget(key, version)
+    return _digest(versions)
+
+
+def _digest(versions):
+    return hashlib.sha1('|'.join(versions[key] for key in REFERENCE_VERSION_KEYS).encode()).hexdigest()[:16]
+
+
+def invalidate(model):
+    """
+    Make every process reload `model` on its next use. Call it once the
+    change is committed, or another process could cache the old rows under
+    the new version.
+    """
+    cache.set(_version_key(model), uuid.uuid4().hex, None)
+    forget(model)
+
+
+def forget(model):
+    """Drop this process's snapshot only"""
+    with _lock:
+        _snapshots.pop(model, None)
+
+
+def invalidate_all():
+    for model in REFERENCE_MODELS:
+        invalidate(model)
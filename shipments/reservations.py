@@ -0,0 +1,95 @@
+# shipments/reservations.py
+"""
+Collision-free tracking number allocation.
+
+Candidates are generated in bulk, checked against existing shipments and
+reservations with one IN query and claimed through the unique TrackingNumberReservation
+table, so two admins (or an admin and an import) can never be handed the
+same number. Each call costs a bounded number of queries whatever `n` is.
+"""
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Shipment, TrackingNumberReservation
+from .utils import generate_tracking_numbers, normalize_tracking_number
+
+# Generation rounds before giving up; each round is three queries
+MAX_ROUNDS = 3
+
+
+class ReservationError(Exception):
+    """Could not find enough free tracking numbers"""
+
+
+def _candidates(carrier_name, count):
+    numbers = {}
+    for number in generate_tracking_numbers(carrier_name, count):
+        numbers.setdefault(normalize_tracking_number(number), number)
+    return numbers
+
+
+def reserve_tracking_numbers(carrier, n):
+    """
+    Reserve `n` unused tracking numbers in the carrier's format.
+
+    `carrier` is a Carrier or a carrier name. Reservations expire after
+    TRACKING_RESERVATION_TTL seconds, or when a shipment is saved with the
+    number.
+    """
+    if n < 1:
+        return []
+    carrier_name = getattr(carrier, 'name', carrier) or ''
+    batch = uuid.uuid4()
+    reserved = {}
+
+    with transaction.atomic():
+        expired = timezone.now() - timedelta(seconds=settings.TRACKING_RESERVATION_TTL)
+        TrackingNumberReservation.objects.filter(reserved_at__lt=expired).delete()
+
+        for _ in range(MAX_ROUNDS):
+            missing = n - len(reserved)
+            # Over-generate a little so one round is almost always enough
+            candidates = _candidates(carrier_name, missing + max(2, missing // 10))
+            for key in reserved:
+                candidates.pop(key, None)
+
+            keys = list(candidates)
+            taken = set(Shipment.objects.filter(tracking_key__in=keys).order_by().values_list(
+                'tracking_key', flat=True
+            ).union(TrackingNumberReservation.objects.filter(tracking_key__in=keys).values_list(
+                'tracking_key', flat=True
+            )))
+            free = [key for key in candidates if key not in taken][:missing]
+
+            TrackingNumberReservation.objects.bulk_create(
+                [TrackingNumberReservation(tracking_key=key, batch=batch) for key in free],
+                ignore_conflicts=True,
+            )
+            # Keys another caller reserved first are silently skipped above
+            won = TrackingNumberReservation.objects.filter(
+                batch=batch, tracking_key__in=free
+            ).values_list('tracking_key', flat=True)
+            for key in won:
+                reserved[key] = candidates[key]
+
+            if len(reserved) >= n:
+                return list(reserved.values())
+
+        # Raising inside the transaction also rolls back the partial reservation
+        raise ReservationError(
+            f"Could only reserve {len(reserved)} of {n} tracking numbers for '{carrier_name}'")
+
+
+# transaction.atomic() has no async form, so async views run the whole
+# reservation in a worker thread
+areserve_tracking_numbers = sync_to_async(reserve_tracking_numbers)
+
+
+def release_tracking_numbers(tracking_keys):
+    """Drop reservations once shipments carrying those numbers are saved"""
+    TrackingNumberReservation.objects.filter(tracking_key__in=list(tracking_keys)).delete()
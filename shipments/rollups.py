@@ -0,0 +1,210 @@
+# shipments/rollups.py
+"""
+Materialized shipment counts behind the admin dashboard.
+
+ShipmentRollup holds, for each dimension (carrier, status, origin and
+destination), one row per (creation day, dimension value, delivery
+outcome) with the number of shipments in it. A shipment is counted once per
+dimension, so the table stays at days times dropdown values however many
+shipments there are. Signals move a shipment between buckets as it is saved
+or deleted, and the importer records its batches directly, so the dashboard
+only ever aggregates this small table and never scans shipments.
+
+Changes that bypass the ORM signals (QuerySet.update(), SET_NULL when a
+dropdown row is deleted, renaming a status to or from DELIVERED) leave the
+counts stale until `manage.py rebuild_rollups` recomputes them.
+"""
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import refdata
+from .models import Carrier, Country, Shipment, ShipmentRollup, StatusType
+
+# Dimension: the Shipment attname it counts by
+DIMENSIONS = {
+    ShipmentRollup.CARRIER: 'carrier_id',
+    ShipmentRollup.STATUS: 'status_id',
+    ShipmentRollup.ORIGIN: 'origin_id',
+    ShipmentRollup.DESTINATION: 'destination_id',
+}
+# Any one dimension's rows add up to every shipment; status has the fewest values
+TOTALS_DIMENSION = ShipmentRollup.STATUS
+
+DELIVERED = 'delivered'
+
+
+def delivered_status_ids():
+    return [pk for pk, name in refdata.reference_table(StatusType).names.items()
+            if name.strip().casefold() == DELIVERED]
+
+
+def delivery_outcome(status_id, date, expected_delivery_date, delivered):
+    """On time or late for delivered shipments (by the status date), open otherwise"""
+    if status_id not in delivered:
+        return ShipmentRollup.OPEN
+    if date and expected_delivery_date and date > expected_delivery_date:
+        return ShipmentRollup.LATE
+    return ShipmentRollup.ON_TIME
+
+
+def rollup_values(shipment):
+    return {name: getattr(shipment, name) for name in Shipment.ROLLUP_FIELDS}
+
+
+def rollup_keys(values, delivered):
+    """A shipment's bucket in each dimension, from a mapping of its Shipment.ROLLUP_FIELDS"""
+    day = timezone.localdate(values['created_at'])
+    delivery = delivery_outcome(values['status_id'], values['date'], values['expected_delivery_date'], delivered)
+    return [(day, dimension, values[field] or 0, delivery) for dimension, field in DIMENSIONS.items()]
+
+
+def shipment_moved(old_values, new_values):
+    """Deltas moving one shipment from its old buckets (None if new) to its new ones"""
+    delivered = delivered_status_ids()
+    deltas = Counter()
+    if new_values is not None:
+        deltas.update(rollup_keys(new_values, delivered))
+    if old_values is not None:
+        deltas.subtract(rollup_keys(old_values, delivered))
+    return deltas
+
+
+def record_shipments(shipments, sign=1):
+    """Count (or with sign=-1 uncount) shipments saved without signals, e.g. by bulk_create"""
+    delivered = delivered_status_ids()
+    deltas = Counter()
+    for shipment in shipments:
+        for key in rollup_keys(rollup_values(shipment), delivered):
+            deltas[key] += sign
+    apply_deltas(deltas)
+
+
+BUCKET_FIELDS = ('day', 'dimension', 'value_id', 'delivery')
+UPSERT_BATCH_SIZE = 100
+
+
+def _upsert(connection, deltas):
+    """INSERT ... ON CONFLICT DO UPDATE adding each delta, one statement per 100 buckets"""
+    meta = ShipmentRollup._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    keys = [quote(meta.get_field(name).column) for name in BUCKET_FIELDS]
+    count = quote(meta.get_field('count').column)
+    day = meta.get_field('day')
+    row_sql = f"({', '.join(['%s'] * (len(keys) + 1))})"
+
+    items = list(deltas.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            batch = items[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for key, delta in batch:
+                params.extend([day.get_db_prep_value(key[0], connection), *key[1:], delta])
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(keys)}, {count}) "
+                f"VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}",
+                params,
+            )
+
+
+def apply_deltas(deltas):
+    """Add each delta to its bucket, creating missing buckets"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    connection = connections[router.db_for_write(ShipmentRollup)]
+    if connection.vendor in ('sqlite', 'postgresql'):
+        _upsert(connection, deltas)
+        return
+    ShipmentRollup.objects.bulk_create(
+        [ShipmentRollup(count=0, **dict(zip(BUCKET_FIELDS, key))) for key in deltas],
+        ignore_conflicts=True,
+    )
+    for key, delta in deltas.items():
+        ShipmentRollup.objects.filter(**dict(zip(BUCKET_FIELDS, key))).update(count=F('count') + delta)
+
+
+def rollup_rows(shipments, delivered):
+    """Bucket counts of a Shipment queryset, one GROUP BY per dimension, as dicts of ShipmentRollup fields"""
+    delivered = Q(status_id__in=delivered)
+    rows = (
+        shipments.order_by()
+        .annotate(
+            day=TruncDate('created_at'),
+            delivery=Case(
+                When(delivered & Q(date__gt=F('expected_delivery_date')), then=Value(ShipmentRollup.LATE)),
+                When(delivered, then=Value(ShipmentRollup.ON_TIME)),
+                default=Value(ShipmentRollup.OPEN),
+            ),
+        )
+    )
+    for dimension, field in DIMENSIONS.items():
+        for row in rows.values('day', field, 'delivery').annotate(count=Count('pk')):
+            yield {
+                'day': row['day'], 'dimension': dimension, 'value_id': row[field] or 0,
+                'delivery': row['delivery'], 'count': row['count'],
+            }
+
+
+def rebuild():
+    """Recompute every bucket from the shipments table; returns the number of buckets"""
+    rollups = [ShipmentRollup(**row) for row in rollup_rows(Shipment.objects.all(), delivered_status_ids())]
+    with transaction.atomic():
+        ShipmentRollup.objects.all().delete()
+        ShipmentRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _totals(rollups, field):
+    return {
+        row[field]: row['total']
+        for row in rollups.values(field).annotate(total=Sum('count')).order_by(field)
+        if row['total']
+    }
+
+
+def _dimension_totals(rollups):
+    """{dimension: {value_id: count}} in one query"""
+    totals = {dimension: {} for dimension in DIMENSIONS}
+    for row in rollups.values('dimension', 'value_id').annotate(total=Sum('count')).order_by():
+        if row['total']:
+            totals[row['dimension']][row['value_id']] = row['total']
+    return totals
+
+
+def _named(totals, model):
+    names = refdata.reference_table(model).names
+    return sorted(
+        ({'name': names.get(pk, '(none)' if not pk else f'#{pk}'), 'count': count}
+         for pk, count in totals.items()),
+        key=lambda row: -row['count'],
+    )
+
+
+def dashboard_summary(since=None):
+    """Dashboard figures from the rollup table only, for shipments created on or after `since`"""
+    rollups = ShipmentRollup.objects.all()
+    if since is not None:
+        rollups = rollups.filter(day__gte=since)
+    totals = rollups.filter(dimension=TOTALS_DIMENSION)
+    delivery = _totals(totals, 'delivery')
+    by_dimension = _dimension_totals(rollups)
+    on_time = delivery.get(ShipmentRollup.ON_TIME, 0)
+    late = delivery.get(ShipmentRollup.LATE, 0)
+    return {
+        'total': sum(delivery.values()),
+        'on_time': on_time,
+        'late': late,
+        'open': delivery.get(ShipmentRollup.OPEN, 0),
+        'on_time_rate': round(100 * on_time / (on_time + late), 1) if on_time + late else None,
+        'by_day': [{'day': day, 'count': count} for day, count in _totals(totals, 'day').items()],
+        'by_status': _named(by_dimension[ShipmentRollup.STATUS], StatusType),
+        'by_carrier': _named(by_dimension[ShipmentRollup.CARRIER], Carrier),
+        'by_origin': _named(by_dimension[ShipmentRollup.ORIGIN], Country),
+        'by_destination': _named(by_dimension[ShipmentRollup.DESTINATION], Country),
+    }
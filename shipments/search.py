@@ -0,0 +1,128 @@
+# shipments/search.py
+"""
+Full-text search index behind the admin shipment search.
+
+Every shipment has a ShipmentSearchEntry holding one normalized document:
+the tracking number and phone numbers compacted to a single token each,
+plus the words of the shipper, receiver and carrier names. Signals keep
+the entries current, and the database indexes them for prefix matching:
+
+* SQLite: an external-content FTS5 table fed by triggers on the entry table
+  (migration 0009), with prefix indexes for 2-4 characters.
+* PostgreSQL: a GIN index on to_tsvector('simple', document), queried with
+  prefix tsqueries.
+
+On any other database search_shipments() returns None and the admin falls
+back to its icontains search.
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .models import Carrier, Shipment, ShipmentSearchEntry
+
+FTS_TABLE = 'shipments_shipment_fts'
+
+# Shipment fields that end up in the document
+SEARCH_FIELDS = (
+    'shipment_number', 'shipper_name', 'shipper_phone',
+    'receiver_name', 'receiver_phone', 'carrier',
+)
+
+NON_WORD = re.compile(r'[\W_]+')
+NON_DIGIT = re.compile(r'\D+')
+
+
+def _compact(value):
+    return NON_WORD.sub('', value or '').casefold()
+
+
+def search_document(shipment, carrier_name=''):
+    """Space-separated search tokens for a shipment"""
+    tokens = [_compact(shipment.tracking_key or shipment.shipment_number)]
+    for phone in (shipment.shipper_phone, shipment.receiver_phone):
+        tokens.append(NON_DIGIT.sub('', phone or ''))
+    for name in (shipment.shipper_name, shipment.receiver_name, carrier_name):
+        tokens.extend(_compact(word) for word in (name or '').split())
+    return ' '.join(token for token in tokens if token)
+
+
+def search_terms(search_term):
+    """
+    (words, compacted): every word must prefix-match a token, or the whole
+    term with separators removed must (for numbers typed with spaces or
+    dashes, such as '+1 555-0100' or '1Z 999 AA1').
+    """
+    words = [word for word in (_compact(word) for word in search_term.split()) if word]
+    compacted = _compact(search_term)
+    if compacted.isdigit():
+        # Digit groups of a phone or tracking number are only matched together;
+        # a lone '1*' would match half the index
+        return [compacted], None
+    return words, compacted if len(words) > 1 else None
+
+
+def _sqlite_match(search_term):
+    words, compacted = search_terms(search_term)
+    query = ' AND '.join(f'"{word}"*' for word in words)
+    if compacted:
+        query = f'({query}) OR "{compacted}"*'
+    return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query]
+
+
+def _postgresql_match(search_term):
+    words, compacted = search_terms(search_term)
+    query = ' & '.join(f'{word}:*' for word in words)
+    if compacted:
+        query = f'({query}) | {compacted}:*'
+    return (
+        f'SELECT shipment_id FROM {ShipmentSearchEntry._meta.db_table} '
+        "WHERE to_tsvector('simple', document) @@ to_tsquery('simple', %s)"
+    ), [query]
+
+
+MATCHERS = {
+    'sqlite': _sqlite_match,
+    'postgresql': _postgresql_match,
+}
+
+
+def search_shipments(queryset, search_term):
+    """
+    `queryset` narrowed to shipments matching every word of `search_term`
+    by prefix, or None if the term has no searchable words or the database
+    has no search index.
+    """
+    matcher = MATCHERS.get(connections[queryset.db].vendor)
+    if matcher is None or not search_terms(search_term)[0]:
+        return None
+    return queryset.filter(pk__in=RawSQL(*matcher(search_term)))
+
+
+def index_shipments(shipments):
+    """Create or refresh the search entries of saved shipments in one upsert"""
+    shipments = [shipment for shipment in shipments if shipment.pk]
+    if not shipments:
+        return
+    carrier_names = {
+        shipment.carrier_id: shipment.carrier.name
+        for shipment in shipments
+        if shipment.carrier_id and Shipment.carrier.is_cached(shipment)
+    }
+    missing = {shipment.carrier_id for shipment in shipments} - carrier_names.keys() - {None}
+    if missing:
+        carrier_names.update(Carrier.objects.filter(pk__in=missing).values_list('pk', 'name'))
+
+    ShipmentSearchEntry.objects.bulk_create(
+        [
+            ShipmentSearchEntry(
+                shipment_id=shipment.pk,
+                document=search_document(shipment, carrier_names.get(shipment.carrier_id, '')),
+            )
+            for shipment in shipments
+        ],
+        update_conflicts=True,
+        unique_fields=['shipment'],
+        update_fields=['document'],
+    )
@@ -0,0 +1,133 @@
+# shipments/signals.py
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import refdata
+from .cache import invalidate_track_result
+from .imports import batched
+from .live import broker, status_message
+from .metrics import record_query, sampling_enabled
+from .models import Carrier, Package, Shipment, ShipmentEvent
+from .reservations import release_tracking_numbers
+from .rollups import apply_deltas, rollup_values, shipment_moved
+from .search import SEARCH_FIELDS, index_shipments
+
+
+@receiver(post_save, sender=Shipment)
+@receiver(post_delete, sender=Shipment)
+def shipment_changed(sender, instance, **kwargs):
+    invalidate_track_result(instance.tracking_key)
+
+
+@receiver(post_save, sender=Shipment)
+def shipment_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.tracking_key:
+        release_tracking_numbers([instance.tracking_key])
+
+
+@receiver(post_save, sender=Shipment)
+def shipment_indexed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refresh the search entry unless the save left every searched field alone"""
+    if raw or (update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS)):
+        return
+    index_shipments([instance])
+
+
+def _moves_rollup(update_fields):
+    if update_fields is None:
+        return True
+    # update_fields may name a foreign key by field name or attname
+    rollup_fields = {name.removesuffix('_id') for name in Shipment.ROLLUP_FIELDS}
+    return any(name.removesuffix('_id') in rollup_fields for name in update_fields)
+
+
+@receiver(pre_save, sender=Shipment)
+def shipment_rollup_loaded(sender, instance, raw=False, update_fields=None, **kwargs):
+    """An update of an instance not loaded from the database: read the bucket it is counted in"""
+    if raw or instance.pk is None or instance._rollup_values is not None or not _moves_rollup(update_fields):
+        return
+    instance._rollup_values = Shipment.objects.filter(pk=instance.pk).values(
+        *Shipment.ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Shipment)
+def shipment_rollup_moved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Move the shipment's dashboard count to its new bucket"""
+    if raw or not _moves_rollup(update_fields):
+        return
+    values = rollup_values(instance)
+    apply_deltas(shipment_moved(None if created else instance._rollup_values, values))
+    instance._rollup_values = values
+
+
+@receiver(post_delete, sender=Shipment)
+def shipment_rollup_removed(sender, instance, **kwargs):
+    apply_deltas(shipment_moved(instance._rollup_values or rollup_values(instance), None))
+
+
+@receiver(post_save, sender=Carrier)
+def carrier_renamed(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    shipments = Shipment.objects.filter(carrier=instance).only(
+        'tracking_key', *SEARCH_FIELDS).order_by().iterator(chunk_size=2000)
+    for batch in batched(shipments, 2000):
+        for shipment in batch:
+            shipment.carrier = instance
+        index_shipments(batch)
+
+
+@receiver(post_save, sender=Package)
+@receiver(post_delete, sender=Package)
+def package_changed(sender, instance, raw=False, **kwargs):
+    """Bump the parent shipment's updated_at so its cached page and ETag change too"""
+    if raw:
+        return
+    Shipment.objects.filter(pk=instance.shipment_id).update(updated_at=timezone.now())
+    if Package.shipment.is_cached(instance):
+        invalidate_track_result(instance.shipment.tracking_key)
+
+
+@receiver(post_save, sender=ShipmentEvent)
+def shipment_event_recorded(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and ShipmentEvent.shipment.is_cached(instance):
+        invalidate_track_result(instance.shipment.tracking_key)
+
+
+@receiver(post_save, sender=ShipmentEvent)
+def shipment_event_published(sender, instance, created, raw=False, **kwargs):
+    """Push the new status to live tracking pages once it is committed"""
+    if not created or raw:
+        return
+    tracking_key = instance.shipment.tracking_key
+    if not broker.watcher_count(tracking_key):
+        return
+    message = status_message(instance, instance.timestamp)
+    transaction.on_commit(lambda: broker.publish(tracking_key, message))
+
+
+def reference_data_changed(sender, **kwargs):
+    """A dropdown row was edited: reload it here now and in every process after commit"""
+    refdata.forget(sender)
+    transaction.on_commit(lambda: refdata.invalidate(sender))
+
+
+for model in refdata.REFERENCE_MODELS:
+    post_save.connect(reference_data_changed, sender=model)
+    post_delete.connect(reference_data_changed, sender=model)
+
+
+@receiver(post_migrate)
+def reference_data_migrated(sender, **kwargs):
+    if sender.name == 'shipments':
+        refdata.invalidate_all()
+
+
+@receiver(connection_created)
+def request_metrics_connection(sender, connection, **kwargs):
+    """Count and time the queries of sampled requests on every connection"""
+    if sampling_enabled() and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
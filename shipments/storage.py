@@ -0,0 +1,228 @@
+# shipments/storage.py
+"""
+Static files storage: hashed names, precompressed text assets, CSS/JS
+bundles and resized modern-format copies of the site's images.
+
+collectstatic first writes the STATIC_BUNDLES (shipments.bundles), runs
+WhiteNoise's manifest storage over them and everything else (content hash
+in every name, gzip and Brotli siblings for CSS/JS/SVG/fonts), then
+writes WebP (and AVIF where Pillow can encode it) copies of every JPEG
+and PNG under RESPONSIVE_IMAGE_DIRS at each of RESPONSIVE_IMAGE_WIDTHS
+no wider than the original. Compression and resizing run across
+STATIC_BUILD_WORKERS processes, and both are incremental: a compressed
+copy newer than its file is kept, and image variants carry the content hash
+of the file they come from, so one already on disk is current and not
+encoded again.
+
+The variants are added to staticfiles.json, with the hash last in the
+name as for every other file, so WhiteNoise serves them as immutable
+too, and listed in RESPONSIVE_IMAGE_MANIFEST, which the
+{% responsive_image %} tag reads to build srcset attributes.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from PIL import Image
+from whitenoise.compress import Compressor
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .bundles import build_bundle, bundles
+
+RESPONSIVE_IMAGE_MANIFEST = 'responsive-images.json'
+RESPONSIVE_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# format: (MIME type, Pillow save options)
+IMAGE_FORMATS = {
+    'avif': ('image/avif', {'quality': 60}),
+    'webp': ('image/webp', {'quality': 80}),
+}
+
+
+def available_formats():
+    """The IMAGE_FORMATS this Pillow build can write, best first"""
+    extensions = Image.registered_extensions()
+    return [name for name in IMAGE_FORMATS if f'.{name}' in extensions and extensions[f'.{name}'] in Image.SAVE]
+
+
+def variant_name(name, width, image_format):
+    """The unhashed name of a variant: img/logo.png -> img/logo.320w.webp"""
+    return f'{os.path.splitext(name)[0]}.{width}w.{image_format}'
+
+
+def hashed_variant_name(hashed_name, width, image_format):
+    """img/logo.<hash>.png -> img/logo.320w.<hash>.webp, the hash last where WhiteNoise looks for it"""
+    stem, content_hash = os.path.splitext(os.path.splitext(hashed_name)[0])
+    return f'{stem}.{width}w{content_hash}.{image_format}'
+
+
+def resize_image(path, widths, formats):
+    """
+    Write the variants of one image next to it; runs in a worker process.
+    Returns ((width, height), [(width, format, path), ...]), every variant
+    included whether it was written now or by an earlier run.
+    """
+    with Image.open(path) as image:
+        size = image.size
+        targets = [width for width in sorted(widths) if width < size[0]]
+        if size[0] <= max(widths):
+            targets.append(size[0])
+        variants = []
+        loaded = None
+        for width in targets:
+            for image_format in formats:
+                output = hashed_variant_name(path, width, image_format)
+                variants.append((width, image_format, output))
+                if os.path.exists(output):
+                    continue
+                if loaded is None:
+                    image.load()
+                    loaded = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+                resized = loaded if width == size[0] else loaded.resize(
+                    (width, max(1, round(size[1] * width / size[0]))), Image.Resampling.LANCZOS)
+                # Written under a temporary name so an interrupted run never leaves a truncated variant
+                resized.save(output + '.tmp', image_format.upper(), **IMAGE_FORMATS[image_format][1])
+                os.replace(output + '.tmp', output)
+    return size, variants
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def compress_file(path, extensions):
+    """WhiteNoise's gzip/Brotli compression of one file; runs in a worker process"""
+    return Compressor(extensions=extensions, quiet=True).compress(path)
+
+
+def _pool_map(func, *iterables):
+    """map() across STATIC_BUILD_WORKERS processes (None: one per core), in-process for one worker"""
+    workers = getattr(settings, 'STATIC_BUILD_WORKERS', None) or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(func, *iterables)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, *iterables, chunksize=4)
+
+
+class ResponsiveStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    # Development and the test suite run without collectstatic, so a file
+    # missing from the manifest is served under its plain name instead of
+    # raising inside {% static %}.
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.responsive_images = self.load_responsive_images()
+
+    def load_responsive_images(self):
+        """{image name: {'width', 'height', 'variants': {format: [[width, name], ...]}}}"""
+        try:
+            with self.open(RESPONSIVE_IMAGE_MANIFEST) as manifest:
+                return json.load(manifest)
+        except (OSError, ValueError):
+            return {}
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # A reference to a file that is not there: the theme's CSS points
+            # at a few it never shipped (source maps), and nothing is there
+            # at all before collectstatic. Leave it unhashed rather than fail.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.write_bundles(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if not dry_run:
+            yield from self.post_process_images()
+
+    def write_bundles(self, paths):
+        """Write the STATIC_BUNDLES into STATIC_ROOT and add them to the files about to be hashed"""
+        def read(source):
+            storage, path = paths[source]
+            with storage.open(path) as handle:
+                return handle.read().decode('utf-8')
+
+        for name, sources in bundles().items():
+            missing = [source for source in sources if source not in paths]
+            if missing:
+                raise ImproperlyConfigured(f"STATIC_BUNDLES[{name!r}] lists missing static files: {', '.join(missing)}")
+            content = build_bundle(name, sources, read).encode()
+            if self.exists(name):
+                with self.open(name) as existing:
+                    # Left alone when unchanged, so its compressed copies stay current
+                    if existing.read() == content:
+                        paths[name] = (self, name)
+                        continue
+                self.delete(name)
+            self._save(name, ContentFile(content))
+            paths[name] = (self, name)
+
+    def compress_files(self, paths):
+        extensions = getattr(settings, 'WHITENOISE_SKIP_COMPRESS_EXTENSIONS', None)
+        compressor = self.create_compressor(extensions=extensions, quiet=True)
+        paths = [
+            path for path in sorted(paths)
+            if compressor.should_compress(path) and not self.compressed_current(path)
+        ]
+        full_paths = [self.path(path) for path in paths]
+        for path, full_path, compressed in zip(
+                paths, full_paths, _pool_map(compress_file, full_paths, [extensions] * len(paths))):
+            prefix_len = len(full_path) - len(path)
+            for compressed_path in compressed:
+                yield path, compressed_path[prefix_len:]
+
+    def compressed_current(self, path):
+        """Whether an earlier run left a .br or .gz of the file at least as new as it"""
+        full_path = self.path(path)
+        modified = os.path.getmtime(full_path)
+        for suffix in ('.br', '.gz'):
+            try:
+                if os.path.getmtime(full_path + suffix) >= modified:
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def post_process_images(self):
+        """
+        Write the resized variants, add them to staticfiles.json and write
+        their manifest; yields collectstatic's (name, variant, True).
+        """
+        directories = tuple(directory.rstrip('/') + '/' for directory in settings.RESPONSIVE_IMAGE_DIRS)
+        formats = available_formats()
+        images = sorted(
+            (name, hashed_name) for name, hashed_name in self.hashed_files.items()
+            if name.startswith(directories) and name.lower().endswith(RESPONSIVE_IMAGE_EXTENSIONS)
+        )
+        if not formats or not images:
+            return
+        full_paths = [self.path(hashed_name) for _, hashed_name in images]
+        widths = tuple(settings.RESPONSIVE_IMAGE_WIDTHS)
+        responsive_images = {}
+        for (name, hashed_name), full_path, ((width, height), variants) in zip(
+                images, full_paths, _pool_map(resize_image, full_paths, [widths] * len(images), [formats] * len(images))):
+            prefix_len = len(full_path) - len(hashed_name)
+            entry = responsive_images[name] = {'width': width, 'height': height, 'variants': {}}
+            for variant_width, image_format, variant_path in variants:
+                variant = variant_path[prefix_len:]
+                self.hashed_files[self.hash_key(variant_name(name, variant_width, image_format))] = variant
+                entry['variants'].setdefault(image_format, []).append([variant_width, variant])
+                yield name, variant, True
+        # ManifestFilesMixin.post_process saved the manifest before the variants existed
+        self.save_manifest()
+        self.save_responsive_images(responsive_images)
+
+    def save_responsive_images(self, responsive_images):
+        if self.exists(RESPONSIVE_IMAGE_MANIFEST):
+            self.delete(RESPONSIVE_IMAGE_MANIFEST)
+        self._save(RESPONSIVE_IMAGE_MANIFEST, ContentFile(json.dumps(responsive_images, sort_keys=True).encode()))
+        self.responsive_images = responsive_images
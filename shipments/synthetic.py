@@ -0,0 +1,133 @@
+# shipments/synthetic.py
+"""
+Synthetic shipments for benchmarks and local testing.
+
+Rows are built as manifest rows (dropdowns by name, packages as a list) and
+inserted through the regular ShipmentImporter, so synthetic data gets the
+same packages, status history, search entries and dashboard rollups as an
+imported manifest. Every dropdown table is filled from the names below,
+tracking numbers come from generate_tracking_number() for each row's
+carrier, and a seed makes the dataset reproducible (apart from the
+timestamps inside default-format tracking numbers).
+"""
+import random
+from datetime import date, time, timedelta
+
+from .imports import ShipmentImporter
+from .models import (
+    Carrier, Country, Courier, Mode, PaymentMode, PieceType, Product, ShipmentType, StatusType,
+)
+from .utils import generate_tracking_number
+
+REFERENCE_NAMES = {
+    ShipmentType: ('Parcel', 'Document', 'Pallet', 'Freight'),
+    Courier: ('Express', 'Standard', 'Economy'),
+    Mode: ('Air', 'Sea', 'Road', 'Rail'),
+    Product: ('Electronics', 'Clothing', 'Books', 'Machinery', 'Food', 'Medical'),
+    PaymentMode: ('Prepaid', 'Cash on delivery', 'Invoice'),
+    Carrier: ('UPS', 'FedEx', 'DHL Express', 'USPS', 'Aramex', 'Nile Logistics'),
+    Country: (
+        'United States', 'United Kingdom', 'Germany', 'France', 'Kenya', 'Nigeria',
+        'India', 'China', 'Japan', 'Brazil', 'Canada', 'Australia',
+    ),
+    StatusType: ('PENDING', 'PICKED_UP', 'IN_TRANSIT', 'OUT_FOR_DELIVERY', 'ON_HOLD', 'DELIVERED'),
+    PieceType: ('Box', 'Envelope', 'Crate', 'Tube'),
+}
+
+SYLLABLES = (
+    'ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ya', 'ze', 'bel', 'dor',
+    'fan', 'gil', 'har', 'jun', 'kor', 'lin', 'mar', 'nov', 'pel', 'quin', 'ros', 'tal',
+)
+STREETS = ('High Street', 'Station Road', 'Harbour Way', 'Market Lane', 'Airport Road')
+
+
+def ensure_reference_data():
+    """Create the dropdown rows synthetic shipments refer to, if missing"""
+    # One save per row, so the reference data cache hears about new rows
+    for model, names in REFERENCE_NAMES.items():
+        for name in names:
+            model.objects.get_or_create(name=name)
+
+
+def _name(rng):
+    return ' '.join(
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).title() for _ in range(2))
+
+
+def _phone(rng):
+    return f'+{rng.randint(1, 99)} {rng.randint(100, 999)} {rng.randint(1000000, 9999999)}'
+
+
+def synthetic_row(rng, max_packages=3, today=None):
+    """One manifest row with every dropdown filled in and 1..max_packages packages"""
+    today = today or date.today()
+    carrier = rng.choice(REFERENCE_NAMES[Carrier])
+    status = rng.choice(REFERENCE_NAMES[StatusType])
+    origin, destination = rng.sample(REFERENCE_NAMES[Country], 2)
+    shipper, receiver = _name(rng), _name(rng)
+    pickup_date = today - timedelta(days=rng.randint(0, 90))
+    expected = pickup_date + timedelta(days=rng.randint(2, 7))
+    status_date = min(pickup_date + timedelta(days=rng.randint(0, 9)), today)
+    packages = [
+        {
+            'qty': rng.randint(1, 5),
+            'piece_type': rng.choice(REFERENCE_NAMES[PieceType]),
+            'description': rng.choice(REFERENCE_NAMES[Product]),
+            'length_cm': rng.randint(5, 120),
+            'width_cm': rng.randint(5, 80),
+            'height_cm': rng.randint(2, 80),
+            'weight_kg': round(rng.uniform(0.1, 40), 2),
+        }
+        for _ in range(rng.randint(1, max_packages))
+    ]
+    return {
+        'shipment_number': generate_tracking_number(carrier),
+        'shipper_name': shipper,
+        'shipper_phone': _phone(rng),
+        'shipper_address': f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+        'shipper_email': f"{shipper.split()[0].lower()}@example.com",
+        'receiver_name': receiver,
+        'receiver_phone': _phone(rng),
+        'receiver_address': f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+        'receiver_email': f"{receiver.split()[0].lower()}@example.com",
+        'shipment_type': rng.choice(REFERENCE_NAMES[ShipmentType]),
+        'courier': rng.choice(REFERENCE_NAMES[Courier]),
+        'mode': rng.choice(REFERENCE_NAMES[Mode]),
+        'product': rng.choice(REFERENCE_NAMES[Product]),
+        'payment_mode': rng.choice(REFERENCE_NAMES[PaymentMode]),
+        'carrier': carrier,
+        'origin': origin,
+        'destination': destination,
+        'location': destination if status == 'DELIVERED' else rng.choice((origin, destination)),
+        'status': status,
+        'weight_kg': round(sum(package['weight_kg'] for package in packages), 2),
+        'packages': len(packages),
+        'quantity': sum(package['qty'] for package in packages),
+        'total_freight': f'{rng.randint(10, 2000)}.00',
+        'departure_time': time(rng.randint(6, 20), rng.choice((0, 15, 30, 45))),
+        'pickup_time': time(rng.randint(6, 20), rng.choice((0, 15, 30, 45))),
+        'pickup_date': pickup_date,
+        'expected_delivery_date': expected,
+        'date': status_date,
+        'time': time(rng.randint(0, 23), rng.randint(0, 59)),
+        'packages_list': packages,
+    }
+
+
+def synthetic_rows(count, seed=0, max_packages=3):
+    """(line number, row) pairs in the shape ShipmentImporter.run() takes"""
+    rng = random.Random(seed)
+    today = date.today()
+    for line_no in range(1, count + 1):
+        yield line_no, synthetic_row(rng, max_packages, today)
+
+
+def create_synthetic_shipments(count, seed=0, max_packages=3, batch_size=1000, batches_per_transaction=10):
+    """
+    Insert `count` synthetic shipments; yields (imported, rejected) after
+    every transaction. Rows only get rejected when a generated tracking
+    number collides with an existing one.
+    """
+    ensure_reference_data()
+    importer = ShipmentImporter(batch_size=batch_size, batches_per_transaction=batches_per_transaction)
+    yield from importer.run(synthetic_rows(count, seed, max_packages))
@@ -0,0 +1,44 @@
+# shipments/templatetags/responsive_images.py
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.utils.encoding import filepath_to_uri
+from django.utils.html import format_html, format_html_join
+
+from ..storage import IMAGE_FORMATS
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(path, sizes='100vw', lazy=True, **attrs):
+    """
+    <img> for a static image, wrapped in a <picture> offering the resized
+    AVIF/WebP variants collectstatic wrote for it (shipments.storage).
+    Images without variants, e.g. before collectstatic, get a plain <img>.
+    Other keyword arguments become attributes of the <img>:
+
+        {% responsive_image 'img/team-7.jpg' alt='CEO' sizes='(min-width: 992px) 25vw, 100vw' %}
+    """
+    if lazy:
+        attrs.setdefault('loading', 'lazy')
+        attrs.setdefault('decoding', 'async')
+    img = format_html('<img src="{}"{}>', staticfiles_storage.url(path), flatatt(attrs))
+    entry = getattr(staticfiles_storage, 'responsive_images', {}).get(path)
+    if not entry:
+        return img
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (IMAGE_FORMATS[image_format][0],
+             ', '.join(f'{staticfiles_storage.base_url}{filepath_to_uri(name)} {width}w' for width, name in variants),
+             sizes)
+            for image_format, variants in sorted(entry['variants'].items(), key=_format_order)
+        ),
+    )
+    return format_html('<picture>{}{}</picture>', sources, img)
+
+
+def _format_order(item):
+    """Best format first, since browsers take the first <source> they support"""
+    return list(IMAGE_FORMATS).index(item[0])
@@ -0,0 +1,56 @@
+# shipments/templatetags/static_bundles.py
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..bundles import bundles, minify_css
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_bundle(name):
+    """
+    <link>/<script> tag for a STATIC_BUNDLES bundle, or one per source
+    file when collectstatic has not built the bundle:
+
+        {% static_bundle 'bundles/site.css' %}
+    """
+    collected = name in getattr(staticfiles_storage, 'hashed_files', {})
+    paths = [name] if collected else bundles()[name]
+    tag = '<link rel="stylesheet" href="{}">' if name.endswith('.css') else '<script src="{}"></script>'
+    return format_html_join('\n    ', tag, ((staticfiles_storage.url(path),) for path in paths))
+
+
+@register.simple_tag
+def inline_css(path):
+    """
+    A static CSS file minified into a <style> element, for the few rules
+    the first paint needs:
+
+        {% inline_css 'css/track-critical.css' %}
+    """
+    css = _read_css(path) if settings.DEBUG else _cached_css(path)
+    return format_html('<style>{}</style>', mark_safe(css))
+
+
+def _read_css(path):
+    try:
+        with staticfiles_storage.open(path) as handle:
+            css = handle.read().decode('utf-8')
+    except OSError:
+        # Not collected yet: read it where the finders find it
+        source = finders.find(path)
+        if source is None:
+            raise template.TemplateSyntaxError(f'inline_css: no static file {path!r}')
+        with open(source, encoding='utf-8') as handle:
+            css = handle.read()
+    return minify_css(css)
+
+
+_cached_css = lru_cache(maxsize=None)(_read_css)
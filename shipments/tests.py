@@ -1,3 +1,1324 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import itertools
+import json
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+from datetime import date, time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed, ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.template import Context, Template, engines
+from django.test import AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .admin import ShipmentAdmin, ShipmentAdminForm
+
+from .models import (
+    Shipment, Package, ShipmentEvent,
+    Courier, ShipmentType, Mode, Product, PaymentMode,
+    Carrier, Country, StatusType, PieceType, ShipmentRollup, ShipmentSearchEntry,
+    TrackingNumberReservation,
+)
+from .bundles import build_bundle
+from .cache import PAGE_CSRF_PLACEHOLDER
+from .live import broker
+from . import metrics, refdata
+from .pagination import estimate_count, keyset_page
+from .reservations import ReservationError, reserve_tracking_numbers
+from . import rollups
+from .search import FTS_TABLE, search_shipments
+from .storage import RESPONSIVE_IMAGE_MANIFEST, ResponsiveStaticFilesStorage, resize_image
+from .utils import generate_tracking_number, generate_tracking_numbers, normalize_tracking_number
+from .validators import (
+    BAD_CHECK_DIGIT, INVALID, UNCHECKED, VALID,
+    classify_tracking_number, is_plausible_tracking_number, suggest_tracking_number, validate_tracking_number,
+)
+from . import urls
+from .views import (
+    agenerate_tracking_number_view, atrack_batch_api, atrack_shipment, track_batch_api, track_shipment,
+)
+from .warmup import template_names, warm_up
+from tracking.databases import database_config
+
+
+def make_shipment(shipment_number, **overrides):
+    """Create a shipment with the required fields filled in"""
+    fields = dict(
+        shipment_number=shipment_number,
+        shipper_name='Ada Shipper', shipper_phone='+15550000001',
+        shipper_address='1 Origin Street', shipper_email='shipper@example.com',
+        receiver_name='Bob Receiver', receiver_phone='+15550000002',
+        receiver_address='2 Destination Road', receiver_email='receiver@example.com',
+        weight_kg=2, packages=1, quantity=1, total_freight='100',
+        departure_time=time(9, 0), pickup_time=time(8, 0),
+        pickup_date=date(2025, 1, 1), expected_delivery_date=date(2025, 1, 5),
+        date=date(2025, 1, 2), time=time(12, 30),
+    )
+    fields.update(overrides)
+    return Shipment.objects.create(**fields)
+
+
+def make_detailed_shipment(shipment_number, package_count=2):
+    """Create a shipment with every dropdown FK and some packages filled in"""
+    usa = Country.objects.create(name='United States')
+    shipment = make_shipment(
+        shipment_number,
+        shipment_type=ShipmentType.objects.create(name='Parcel'),
+        courier=Courier.objects.create(name='Express'),
+        mode=Mode.objects.create(name='Air'),
+        product=Product.objects.create(name='Electronics'),
+        payment_mode=PaymentMode.objects.create(name='Prepaid'),
+        carrier=Carrier.objects.create(name='UPS'),
+        origin=Country.objects.create(name='Germany'),
+        destination=usa,
+        location=usa,
+        status=StatusType.objects.create(name='IN_TRANSIT'),
+    )
+    box = PieceType.objects.create(name='Box')
+    for i in range(package_count):
+        Package.objects.create(
+            shipment=shipment, qty=i + 1, piece_type=box, description=f'Item {i}',
+            length_cm=10, width_cm=20, height_cm=30, weight_kg=1,
+        )
+    return shipment
+
+
+class TrackingLookupTests(TestCase):
+    def test_normalize_tracking_number(self):
+        self.assertEqual(normalize_tracking_number(' 9400 1000 0000 '), '940010000000')
+        self.assertEqual(normalize_tracking_number('1z999aa1'), '1Z999AA1')
+        self.assertEqual(normalize_tracking_number(None), '')
+
+    def test_save_keeps_tracking_key_in_sync(self):
+        shipment = make_shipment('1z 999 aa1')
+        self.assertEqual(shipment.tracking_key, '1Z999AA1')
+
+        shipment.shipment_number = 'TBA123'
+        shipment.save(update_fields=['shipment_number'])
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.tracking_key, 'TBA123')
+
+    def test_for_tracking_number_ignores_spacing_and_case(self):
+        shipment = make_shipment('9400 1000 0000')
+        self.assertEqual(Shipment.objects.for_tracking_number('940010000000').get(), shipment)
+        self.assertEqual(Shipment.objects.for_tracking_number(' 9400 1000 0000 ').get(), shipment)
+
+    def test_clean_rejects_duplicate_normalized_number(self):
+        make_shipment('1Z999AA1')
+        duplicate = Shipment(shipment_number='1z 999 aa1')
+        with self.assertRaises(ValidationError) as ctx:
+            duplicate.clean()
+        self.assertIn('shipment_number', ctx.exception.message_dict)
+
+    def test_track_page_finds_shipment(self):
+        make_shipment('EC123456785US')
+        response = self.client.get('/track/', {'tracking_number': 'ec123456785us'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['shipment'].shipment_number, 'EC123456785US')
+
+
+class TrackPageQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_track_page_query_count(self):
+        make_detailed_shipment('1Z999AA10123456784', package_count=5)
+        # Shipment with its FKs, packages, status timeline
+        with self.assertNumQueries(3):
+            response = self.client.get('/track/', {'tracking_number': '1Z999AA10123456784'})
+        for name in ('Parcel', 'Express', 'Air', 'Electronics', 'Prepaid', 'UPS', 'Germany', 'United States'):
+            self.assertContains(response, name)
+        self.assertContains(response, 'Item 4')
+        self.assertContains(response, '<td>Box</td>', count=5)
+
+    async def test_async_variants_render_the_same(self):
+        await sync_to_async(make_detailed_shipment)('1Z999AA10123456784', package_count=2)
+        factory = AsyncRequestFactory()
+        response = await atrack_shipment(factory.get('/track/', {'tracking_number': '1Z999AA10123456784'}))
+        self.assertContains(response, 'Item 1')
+        response = await atrack_batch_api(factory.post(
+            '/api/track/', {'tracking_numbers': ['1Z999AA10123456784']}, content_type='application/json'))
+        self.assertEqual(json.loads(response.content)['shipments'][0]['carrier'], 'UPS')
+        response = await agenerate_tracking_number_view(factory.post(
+            '/admin/generate-tracking/', {'carrier_name': 'DHL'}, content_type='application/json'))
+        self.assertTrue(json.loads(response.content)['success'])
+
+    def test_async_views_are_only_routed_under_asgi(self):
+        routes = {pattern.name: pattern.callback for pattern in urls.urlpatterns}
+        self.assertIs(routes['track_shipment'], track_shipment)
+        self.assertIs(routes['track_batch_api'], track_batch_api)
+        try:
+            with override_settings(ASYNC_VIEWS=True):
+                routes = {pattern.name: pattern.callback for pattern in importlib.reload(urls).urlpatterns}
+        finally:
+            importlib.reload(urls)
+        self.assertIs(routes['track_shipment'], atrack_shipment)
+        self.assertIs(routes['track_batch_api'], atrack_batch_api)
+        self.assertIs(routes['generate_tracking'], agenerate_tracking_number_view)
+
+
+class ShipmentChangelistQueryBudgetTests(TestCase):
+    # Session, user, counts, filter choices and the page itself; never per row
+    QUERY_BUDGET = 9
+
+    @classmethod
+    def setUpTestData(cls):
+        carriers = [Carrier.objects.create(name=name) for name in ('UPS', 'DHL', 'FedEx')]
+        statuses = [StatusType.objects.create(name=name) for name in ('PENDING', 'DELIVERED')]
+        for i in range(120):
+            make_shipment(f'TRK{i:06d}', carrier=carriers[i % 3], status=statuses[i % 2])
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def changelist_queries(self, page_size, **params):
+        with mock.patch.object(ShipmentAdmin, 'list_per_page', page_size):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/admin/shipments/shipment/', params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_stays_within_budget_at_any_page_size(self):
+        counts = {size: self.changelist_queries(size) for size in (10, 20, 50, 100)}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+        self.assertLessEqual(counts[100], self.QUERY_BUDGET)
+
+    def test_filtered_and_searched_changelist_stays_within_budget(self):
+        carrier = Carrier.objects.get(name='DHL')
+        self.assertLessEqual(self.changelist_queries(100, carrier__id__exact=carrier.pk), self.QUERY_BUDGET)
+        self.assertLessEqual(self.changelist_queries(100, q='Ada'), self.QUERY_BUDGET)
+
+    def test_changelist_defers_unused_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/admin/shipments/shipment/')
+        page_query = next(q['sql'] for q in ctx.captured_queries if 'shipments_carrier' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertIn('"shipments_carrier"."name"', page_query)
+        self.assertNotIn('receiver_address', page_query)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(25):
+            make_shipment(f'KEYSET-{i:02d}')
+        # Ties on created_at are broken by id
+        Shipment.objects.filter(shipment_number__in=['KEYSET-10', 'KEYSET-11', 'KEYSET-12']).update(
+            created_at=Shipment.objects.get(shipment_number='KEYSET-10').created_at)
+        cls.newest_first = list(Shipment.objects.order_by('-created_at', '-pk'))
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_walk_older_and_back_newer(self):
+        queryset = Shipment.objects.order_by('-created_at', '-pk')
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(queryset, 10, cursor)
+            pages.append(page)
+            cursor = page.older_cursor
+            if not cursor:
+                break
+        self.assertEqual([len(page.object_list) for page in pages], [10, 10, 5])
+        self.assertEqual(sum((page.object_list for page in pages), []), self.newest_first)
+
+        back = keyset_page(queryset, 10, pages[2].newer_cursor)
+        self.assertEqual(back.object_list, pages[1].object_list)
+        top = keyset_page(queryset, 10, back.newer_cursor)
+        self.assertEqual(top.object_list, pages[0].object_list)
+        self.assertIsNone(top.newer_cursor)
+
+    def test_estimated_count_is_capped(self):
+        self.assertEqual(estimate_count(Shipment.objects.all(), 100), (25, True))
+        self.assertEqual(estimate_count(Shipment.objects.all(), 10), (10, False))
+
+    def test_admin_pages_by_cursor_at_constant_cost(self):
+        counts, url, seen = [], '/admin/shipments/shipment/', []
+        with mock.patch.object(ShipmentAdmin, 'list_per_page', 5), \
+                mock.patch.object(ShipmentAdmin, 'estimated_count_above', 10):
+            while url:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                counts.append(len(ctx.captured_queries))
+                cl = response.context['cl']
+                seen.extend(cl.result_list)
+                url = cl.older_url and '/admin/shipments/shipment/' + cl.older_url
+            self.assertContains(response, 'More than 10 shipments')
+        self.assertEqual(seen, self.newest_first)
+        self.assertEqual(len(set(counts[1:])), 1)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in ctx.captured_queries))
+
+    def test_sorting_falls_back_to_offset_pages(self):
+        response = self.client.get('/admin/shipments/shipment/', {'o': '-1'})
+        self.assertFalse(response.context['cl'].keyset)
+        response = self.client.get('/admin/shipments/shipment/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 302)
+
+
+class ShipmentSearchIndexTests(TestCase):
+    def setUp(self):
+        self.dhl = Carrier.objects.create(name='DHL Express')
+        self.first = make_shipment(
+            'TRK-20250101-ABC12X', shipper_name="Mary O'Brien", shipper_phone='+1 (555) 010-0200',
+            receiver_name='José Álvarez', carrier=self.dhl)
+        self.second = make_shipment('1Z999AA10123456784', shipper_name='Marvin Gaye')
+
+    def search(self, term):
+        return set(search_shipments(Shipment.objects.all(), term))
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search('mar'), {self.first, self.second})
+        self.assertEqual(self.search('mar obri'), {self.first})
+        self.assertEqual(self.search('1z999'), {self.second})
+        self.assertEqual(self.search('trk-2025'), {self.first})
+        self.assertEqual(self.search('+1 555-010'), {self.first})
+        self.assertEqual(self.search('5550100'), set())
+        self.assertEqual(self.search('jose alv'), {self.first})
+        self.assertEqual(self.search('dhl exp'), {self.first})
+        self.assertIsNone(search_shipments(Shipment.objects.all(), '-- ?'))
+
+    def test_index_follows_changes(self):
+        self.first.receiver_name = 'Grace Hopper'
+        self.first.save()
+        self.assertEqual(self.search('hopper'), {self.first})
+        self.assertEqual(self.search('alvarez'), set())
+
+        self.dhl.name = 'Swift Couriers'
+        self.dhl.save()
+        self.assertEqual(self.search('swift'), {self.first})
+
+        self.first.delete()
+        self.assertEqual(self.search('hopper'), set())
+        self.assertFalse(ShipmentSearchEntry.objects.filter(document__contains='hopper').exists())
+
+    def test_admin_search_uses_the_index(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/shipments/shipment/', {'q': 'marv'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.second])
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertIn(FTS_TABLE, sql)
+        self.assertNotIn('LIKE', sql)
+
+
+class ReferenceDataCacheTests(TestCase):
+    def setUp(self):
+        refdata.invalidate_all()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def add_form_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/shipments/shipment/add/')
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries
+
+    def test_admin_form_dropdowns_are_served_from_memory(self):
+        tables = [f'FROM "{model._meta.db_table}"' for model in refdata.REFERENCE_MODELS]
+        dropdown_queries = lambda queries: [q for q in queries if any(t in q['sql'] for t in tables)]
+        self.assertEqual(len(dropdown_queries(self.add_form_queries())), len(tables))
+        self.assertEqual(dropdown_queries(self.add_form_queries()), [])
+        self.assertContains(self.client.get('/admin/shipments/shipment/add/'), '>Kenya</option>')
+
+    def test_form_field_validates_without_a_query(self):
+        carrier = Carrier.objects.create(name='DHL')
+        request = SimpleNamespace(user=None)
+        field = site._registry[Shipment].formfield_for_foreignkey(Shipment._meta.get_field('carrier'), request)
+        refdata.reference_table(Carrier)
+        with self.assertNumQueries(0):
+            value = field.clean(str(carrier.pk))
+        self.assertEqual((value.pk, value.name), (carrier.pk, 'DHL'))
+        with self.assertRaises(ValidationError):
+            field.clean('999999')
+
+    def test_edits_reload_every_process(self):
+        self.assertIsNone(refdata.reference_table(StatusType).id_for('delivered'))
+        with self.captureOnCommitCallbacks(execute=True):
+            StatusType.objects.create(name='DELIVERED')
+        self.assertIsNotNone(refdata.reference_table(StatusType).id_for(' Delivered '))
+
+        # Another process bumped the shared version key after a raw SQL edit
+        StatusType.objects.update(name='RETURNED')
+        self.assertIsNone(refdata.reference_table(StatusType).id_for('returned'))
+        cache.set(refdata._version_key(StatusType), 'from-another-process', None)
+        self.assertIsNotNone(refdata.reference_table(StatusType).id_for('returned'))
+
+    def test_workers_with_separate_caches_catch_up_within_max_age(self):
+        workers = [(LocMemCache(f'worker-{n}', {}), {}) for n in range(2)]
+
+        def in_worker(n, func, *args):
+            worker_cache, snapshots = workers[n]
+            with mock.patch.object(refdata, 'cache', worker_cache), \
+                    mock.patch.object(refdata, '_snapshots', snapshots):
+                return func(*args)
+
+        for n in range(2):
+            self.assertIsNone(in_worker(n, refdata.reference_table, StatusType).id_for('delivered'))
+        # Saved in the admin of worker 0; its signal only reaches worker 0's cache
+        StatusType.objects.create(name='DELIVERED')
+        in_worker(0, refdata.invalidate, StatusType)
+        self.assertIsNotNone(in_worker(0, refdata.reference_table, StatusType).id_for('delivered'))
+        self.assertIsNone(in_worker(1, refdata.reference_table, StatusType).id_for('delivered'))
+
+        later = refdata.monotonic() + settings.REFERENCE_DATA_MAX_AGE
+        with mock.patch.object(refdata, 'monotonic', return_value=later):
+            self.assertIsNotNone(in_worker(1, refdata.reference_table, StatusType).id_for('delivered'))
+
+    def test_snapshots_are_immutable(self):
+        with self.assertRaises(TypeError):
+            refdata.reference_table(Country).names[1] = 'Atlantis'
+
+
+class TrackResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shipment = make_detailed_shipment('1Z999AA10123456784')
+
+    def track(self):
+        return self.client.get('/track/', {'tracking_number': '1Z999AA10123456784'})
+
+    def test_repeat_lookup_is_served_from_cache(self):
+        self.track()
+        with self.assertNumQueries(1):
+            response = self.track()
+        self.assertContains(response, 'Electronics')
+
+    def test_shipment_save_invalidates(self):
+        self.track()
+        self.shipment.status = StatusType.objects.create(name='DELIVERED')
+        self.shipment.save()
+        self.assertContains(self.track(), 'DELIVERED')
+
+    def test_package_changes_invalidate(self):
+        self.track()
+        package = Package.objects.create(
+            shipment=self.shipment, qty=1, description='Late addition',
+            length_cm=1, width_cm=1, height_cm=1, weight_kg=1,
+        )
+        self.assertContains(self.track(), 'Late addition')
+        Package.objects.get(pk=package.pk).delete()
+        self.assertNotContains(self.track(), 'Late addition')
+
+    def test_stale_entry_from_another_process_is_not_served(self):
+        self.track()
+        # A save whose signals only reached another worker's cache
+        Shipment.objects.filter(pk=self.shipment.pk).update(
+            remarks='Held at customs', updated_at=self.shipment.updated_at.replace(year=2030))
+        self.assertContains(self.track(), 'Held at customs')
+
+    def test_renamed_dropdown_is_shown_at_once(self):
+        response = self.track()
+        status = self.shipment.status
+        with self.captureOnCommitCallbacks(execute=True):
+            status.name = 'Cleared customs'
+            status.save()
+        renamed = self.track()
+        self.assertContains(renamed, 'Cleared customs')
+        self.assertNotEqual(renamed['ETag'], response['ETag'])
+        revalidated = self.client.get(
+            '/track/', {'tracking_number': '1Z999AA10123456784'}, headers={'if_none_match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_file_based_cache_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': backend}):
+                self.track()
+                with self.assertNumQueries(1):
+                    response = self.track()
+        self.assertContains(response, 'Electronics')
+
+
+class StaticPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_home_is_rendered_once_with_a_token_per_visitor(self):
+        client = Client(enforce_csrf_checks=True)
+        with self.assertTemplateUsed('home.html'):
+            client.get('/')
+        with self.assertTemplateNotUsed('home.html'):
+            response = client.get('/')
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode())[1]
+        self.assertNotEqual(token, PAGE_CSRF_PLACEHOLDER)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        # The cached page's form still posts
+        response = client.post('/track/', {'tracking_number': 'NOPE', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 200)
+
+    def test_pages_without_a_form_are_public(self):
+        self.client.get('/about/')
+        with self.assertTemplateNotUsed('about.html'):
+            response = self.client.get('/about/')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        self.assertNotIn('csrftoken', response.cookies)
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_new_version_renders_again(self):
+        self.client.get('/blog/')
+        with self.settings(PAGE_CACHE_VERSION='2'), self.assertTemplateUsed('blog.html'):
+            self.client.get('/blog/')
+
+
+class ResponsiveImageTests(TestCase):
+    def test_variants_are_written_once(self):
+        with tempfile.TemporaryDirectory() as location:
+            path = Path(location) / 'logo.abc123.png'
+            Image.new('RGBA', (800, 400), (255, 0, 0, 128)).save(path)
+
+            size, variants = resize_image(str(path), (320, 640, 1920), ['webp'])
+            self.assertEqual(size, (800, 400))
+            self.assertEqual([(width, name.rsplit('/', 1)[1]) for width, _, name in variants], [
+                (320, 'logo.320w.abc123.webp'), (640, 'logo.640w.abc123.webp'), (800, 'logo.800w.abc123.webp'),
+            ])
+            with Image.open(variants[0][2]) as variant:
+                self.assertEqual((variant.format, variant.size, variant.mode), ('WEBP', (320, 160), 'RGBA'))
+
+            # Outputs are named after the hashed source, so a second run encodes nothing
+            with mock.patch.object(Image.Image, 'save') as save:
+                self.assertEqual(resize_image(str(path), (320, 640, 1920), ['webp'])[1], variants)
+            save.assert_not_called()
+
+    @override_settings(RESPONSIVE_IMAGE_DIRS=['img'], RESPONSIVE_IMAGE_WIDTHS=[320], STATIC_BUILD_WORKERS=1)
+    def test_variants_are_served_as_immutable(self):
+        with tempfile.TemporaryDirectory() as location:
+            Path(location, 'img').mkdir()
+            Image.new('RGB', (640, 320)).save(Path(location, 'img', 'logo.abc123def456.png'))
+            storage = ResponsiveStaticFilesStorage(location=location)
+            storage.hashed_files = {'img/logo.png': 'img/logo.abc123def456.png'}
+            variants = [variant for _, variant, _ in storage.post_process_images()]
+            self.assertIn('img/logo.320w.abc123def456.webp', variants)
+
+            with override_settings(STATIC_ROOT=location):
+                self.assertEqual(staticfiles_storage.url('img/logo.320w.webp'), '/static/img/logo.320w.abc123def456.webp')
+                middleware = WhiteNoiseMiddleware(lambda request: HttpResponse(status=404))
+                response = middleware(RequestFactory().get('/static/img/logo.320w.abc123def456.webp'))
+                response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'max-age=315360000, public, immutable')
+
+    def test_tag_offers_collected_variants(self):
+        template = Template(
+            "{% load responsive_images %}"
+            "{% responsive_image 'img/team-7.jpg' alt='CEO' sizes='50vw' %}"
+            "{% responsive_image 'img/team-8.jpg' alt='COO' %}"
+        )
+        with tempfile.TemporaryDirectory() as location:
+            Path(location, RESPONSIVE_IMAGE_MANIFEST).write_text(json.dumps({'img/team-7.jpg': {
+                'width': 350, 'height': 350,
+                'variants': {'webp': [[320, 'img/team-7.320w.abc.webp'], [350, 'img/team-7.350w.abc.webp']]},
+            }}))
+            with override_settings(STATIC_ROOT=location):
+                html = template.render(Context())
+        self.assertInHTML(
+            '<picture><source type="image/webp" sizes="50vw"'
+            ' srcset="/static/img/team-7.320w.abc.webp 320w, /static/img/team-7.350w.abc.webp 350w">'
+            '<img src="/static/img/team-7.jpg" alt="CEO" loading="lazy" decoding="async"></picture>',
+            html,
+        )
+        # Nothing collected for this one: a plain <img>
+        self.assertInHTML('<img src="/static/img/team-8.jpg" alt="COO" loading="lazy" decoding="async">', html)
+        self.assertEqual(html.count('<picture>'), 1)
+
+
+class StaticBundleTests(TestCase):
+    BUNDLES = {'bundles/site.js': ['js/jquery-3.2.1.min.js', 'js/custom.js']}
+
+    def test_css_bundle_is_minified_with_urls_rebased(self):
+        sources = {
+            'css/style.css': '@charset "UTF-8";\n/*! keep */\n.a  {\n  background: url(../img/bg.png);\n}\n/* drop */',
+            'fonts/font-awesome/css/fa.css': ".b { content: '  x  '; src: url('../fonts/fa.eot?#iefix') }",
+        }
+        css = build_bundle('bundles/site.css', list(sources), sources.get)
+        self.assertEqual(
+            css,
+            '@charset "UTF-8";/*! keep */ .a{background:url("../img/bg.png")}'
+            ".b{content:'  x  ';src:url(\"../fonts/font-awesome/fonts/fa.eot?#iefix\")}",
+        )
+
+    def test_js_bundle_keeps_scripts_apart(self):
+        sources = {'a.js': 'var a = 1 // no semicolon\n//# sourceMappingURL=a.js.map', 'b.js': '(function () {})()'}
+        self.assertEqual(build_bundle('bundles/site.js', ['a.js', 'b.js'], sources.get),
+                         'var a = 1 // no semicolon\n;\n(function () {})()\n')
+
+    def test_tag_links_sources_until_the_bundle_is_collected(self):
+        template = Template("{% load static_bundles %}{% static_bundle 'bundles/site.js' %}")
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(STATIC_ROOT=location, STATIC_BUNDLES=self.BUNDLES):
+                self.assertEqual(template.render(Context()).split('\n    '), [
+                    '<script src="/static/js/jquery-3.2.1.min.js"></script>',
+                    '<script src="/static/js/custom.js"></script>',
+                ])
+            Path(location, 'staticfiles.json').write_text(json.dumps(
+                {'version': '1.1', 'paths': {'bundles/site.js': 'bundles/site.0123456789ab.js'}}))
+            with override_settings(STATIC_ROOT=location, STATIC_BUNDLES=self.BUNDLES):
+                self.assertEqual(template.render(Context()),
+                                 '<script src="/static/bundles/site.0123456789ab.js"></script>')
+
+    def test_track_page_script_reads_the_shipment_from_the_page(self):
+        make_shipment('EC123456785US', location=Country.objects.create(name='<b>Kenya</b>'))
+        response = self.client.get('/track/', {'tracking_number': 'EC123456785US'})
+        self.assertContains(response, '<script src="/static/js/track.js"></script>', html=True)
+        self.assertContains(response, 'data-tracking-number="EC123456785US"')
+        self.assertContains(response, 'data-location="&lt;b&gt;Kenya&lt;/b&gt;"')
+        self.assertNotContains(response, 'JsBarcode("#barcode"')
+        # The result is styled by the first paint, so track.css is not deferred
+        self.assertContains(response, '<link rel="stylesheet" href="/static/css/track.css">', html=True)
+        self.assertNotContains(response, 'rel="preload"')
+
+    def test_track_page_inlines_only_the_minified_search_box_styles(self):
+        response = self.client.get('/track/')
+        style = re.search(r'<style>(.*?)</style>', response.content.decode(), re.S).group(1)
+        self.assertTrue(style.startswith('.search-container{width:100%;max-width:700px;margin:0 auto}'))
+        self.assertNotIn('\n', style)
+        self.assertNotIn('/*', style)
+        self.assertNotIn('body{', style)
+        self.assertContains(response, 'rel="preload" href="/static/css/track.css" as="style"')
+
+
+class TrackPageConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shipment = make_detailed_shipment('1Z999AA10123456784', package_count=1)
+
+    def track(self, **headers):
+        return self.client.get('/track/', {'tracking_number': '1Z999AA10123456784'}, headers=headers)
+
+    def test_revalidation_is_answered_from_one_column(self):
+        response = self.track()
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        with CaptureQueriesContext(connection) as ctx:
+            not_modified = self.track(if_none_match=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('shipments_carrier', ctx.captured_queries[0]['sql'])
+        self.assertEqual(self.track(if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_package_change_revalidates(self):
+        etag = self.track()['ETag']
+        self.shipment.packages_list.update(description='Ignored: update() sends no signal')
+        self.assertEqual(self.track(if_none_match=etag).status_code, 304)
+        self.shipment.packages_list.first().delete()
+        self.assertEqual(self.track(if_none_match=etag).status_code, 200)
+
+    def test_etag_depends_on_csrf_cookie(self):
+        etag = self.track()['ETag']
+        self.client.cookies['csrftoken'] = 'x' * 32
+        self.assertEqual(self.track(if_none_match=etag).status_code, 200)
+
+    def test_not_found_and_post_are_not_cached(self):
+        response = self.client.get('/track/', {'tracking_number': 'EC123456785US'})
+        self.assertFalse(response.has_header('ETag'))
+        response = self.client.post('/track/', {'tracking_number': '1Z999AA10123456784'})
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+class ShipmentEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.model_admin = ShipmentAdmin(Shipment, site)
+        self.request = SimpleNamespace(user=None)
+
+    def save_in_admin(self, shipment, changed_data, change=True):
+        self.model_admin.save_model(self.request, shipment, SimpleNamespace(changed_data=changed_data), change)
+
+    def test_admin_records_event_on_add_and_status_change_only(self):
+        shipment = make_shipment('TBA00000000000B')
+        self.save_in_admin(shipment, ['shipment_number', 'status'], change=False)
+        self.assertEqual(shipment.events.count(), 1)
+
+        shipment.receiver_phone = '+15550000003'
+        self.save_in_admin(shipment, ['receiver_phone'])
+        self.assertEqual(shipment.events.count(), 1)
+
+        shipment.remarks = 'Arrived at hub'
+        shipment.location = Country.objects.create(name='France')
+        self.save_in_admin(shipment, ['remarks', 'location'])
+        latest = ShipmentEvent.objects.timeline(shipment).first()
+        self.assertEqual(shipment.events.count(), 2)
+        self.assertEqual((latest.remarks, latest.location.name), ('Arrived at hub', 'France'))
+
+    def test_events_are_append_only(self):
+        shipment = make_shipment('TBA00000000000B')
+        event = ShipmentEvent.from_shipment(shipment)
+        event.save()
+        event.remarks = 'Rewritten history'
+        with self.assertRaises(ValueError):
+            event.save()
+        with self.assertRaises(ValueError):
+            event.delete()
+
+    def test_timeline_query_uses_composite_index(self):
+        shipment = make_shipment('TBA00000000000B')
+        plan = ShipmentEvent.objects.timeline(shipment).explain()
+        self.assertIn('shipment_event_timeline_idx', plan)
+
+    def test_track_page_renders_full_history(self):
+        shipment = make_shipment('TBA00000000000B', remarks='Picked up')
+        ShipmentEvent.from_shipment(shipment).save()
+        shipment.remarks = 'Out for delivery'
+        shipment.save()
+        ShipmentEvent.from_shipment(shipment).save()
+
+        response = self.client.get('/track/', {'tracking_number': 'TBA00000000000B'})
+        content = response.content.decode()
+        self.assertLess(content.index('Out for delivery'), content.index('Picked up'))
+
+
+class LiveStatusFeedTests(TestCase):
+    NUMBER = '1Z999AA10123456784'
+
+    def setUp(self):
+        self.shipment = make_detailed_shipment(self.NUMBER, package_count=0)
+        self.delivered = StatusType.objects.create(name='DELIVERED')
+
+    async def open_feed(self):
+        response = await self.async_client.get('/track/live/', {'tracking_number': self.NUMBER.lower()})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def next_message(self, stream):
+        return (await asyncio.wait_for(anext(stream), 5)).decode()
+
+    def change_status_in_admin(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shipment.status = self.delivered
+            self.shipment.remarks = 'Left at front door'
+            self.shipment.save()
+            ShipmentEvent.from_shipment(self.shipment).save()
+
+    async def test_change_is_pushed_to_every_watcher(self):
+        streams = [await self.open_feed() for _ in range(3)]
+        for stream in streams:
+            self.assertIn('"status": "IN_TRANSIT"', await self.next_message(stream))
+        self.assertEqual(broker.watcher_count(self.NUMBER), 3)
+
+        await sync_to_async(self.change_status_in_admin)()
+        for stream in streams:
+            message = await self.next_message(stream)
+            self.assertTrue(message.startswith('event: status\n'))
+            self.assertIn('"status": "DELIVERED"', message)
+            self.assertIn('Left at front door', message)
+
+        # A disconnecting client cancels its stream, which unsubscribes it
+        for stream in streams:
+            pending = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0)
+            pending.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+        self.assertEqual(broker.watcher_count(self.NUMBER), 0)
+
+    @override_settings(LIVE_STATUS_KEEPALIVE=0.01)
+    async def test_idle_feed_sends_keepalives(self):
+        stream = await self.open_feed()
+        await self.next_message(stream)
+        self.assertEqual(await self.next_message(stream), ': keepalive\n\n')
+
+    async def test_unknown_shipment_is_404(self):
+        response = await self.async_client.get('/track/live/', {'tracking_number': 'EC123456785US'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_page_links_the_feed_only_under_asgi(self):
+        response = await self.async_client.get('/track/', {'tracking_number': self.NUMBER})
+        self.assertContains(response, 'data-feed-url=')
+        response = await sync_to_async(self.client.get)('/track/', {'tracking_number': self.NUMBER})
+        self.assertNotContains(response, 'data-feed-url=')
+
+    def test_wsgi_feed_does_not_stream(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/track/live/', {'tracking_number': self.NUMBER})
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    def test_no_watchers_no_work(self):
+        # Just the insert: nothing is looked up for a shipment nobody is watching
+        with self.assertNumQueries(1):
+            ShipmentEvent.from_shipment(self.shipment).save()
+
+
+class ShipmentRollupTests(TestCase):
+    def setUp(self):
+        refdata.invalidate_all()
+        self.ups = Carrier.objects.create(name='UPS')
+        self.pending = StatusType.objects.create(name='PENDING')
+        self.delivered = StatusType.objects.create(name='DELIVERED')
+
+    def buckets(self, dimension=None):
+        rows = ShipmentRollup.objects.filter(count__gt=0)
+        if dimension is None:
+            return sorted((row.dimension, row.value_id, row.delivery, row.count) for row in rows)
+        return sorted((row.value_id, row.delivery, row.count) for row in rows.filter(dimension=dimension))
+
+    def assert_matches_rebuild(self):
+        incremental = self.buckets()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.buckets())
+
+    def test_saves_move_shipments_between_buckets(self):
+        make_shipment('R1', carrier=self.ups, status=self.pending)
+        late = make_shipment('R2', carrier=self.ups, status=self.pending)
+        self.assertEqual(self.buckets('carrier'), [(self.ups.pk, 'open', 2)])
+        self.assertEqual(self.buckets('status'), [(self.pending.pk, 'open', 2)])
+
+        # Delivered after the expected date (2025-01-05), loaded fresh as the admin does
+        late = Shipment.objects.get(pk=late.pk)
+        late.status = self.delivered
+        late.date = date(2025, 1, 9)
+        late.save()
+        on_time = Shipment(pk=Shipment.objects.get(shipment_number='R1').pk)
+        on_time.refresh_from_db()
+        on_time.status = self.delivered
+        on_time.save(update_fields=['status'])
+        self.assertEqual(self.buckets('status'), [
+            (self.delivered.pk, 'late', 1),
+            (self.delivered.pk, 'on_time', 1),
+        ])
+        self.assertEqual(self.buckets('carrier'), [(self.ups.pk, 'late', 1), (self.ups.pk, 'on_time', 1)])
+        self.assert_matches_rebuild()
+
+        late.delete()
+        self.assertEqual(self.buckets('status'), [(self.delivered.pk, 'on_time', 1)])
+        self.assert_matches_rebuild()
+
+    def test_rows_grow_with_dimension_values_not_shipments(self):
+        carriers = [Carrier.objects.create(name=f'Carrier {n}') for n in range(5)]
+        countries = [Country.objects.create(name=f'Country {n}') for n in range(5)]
+        for n, (carrier, country) in enumerate(itertools.product(carriers, countries)):
+            make_shipment(f'R{n:02}', carrier=carrier, destination=country, status=self.pending)
+        # 5 carriers + 1 status + no origin + 5 destinations, for 25 shipments
+        self.assertEqual(ShipmentRollup.objects.count(), 12)
+        self.assert_matches_rebuild()
+
+    def test_unrelated_updates_do_not_touch_rollups(self):
+        shipment = make_shipment('R3', carrier=self.ups)
+        shipment = Shipment.objects.get(pk=shipment.pk)
+        shipment.receiver_name = 'Carol'
+        with CaptureQueriesContext(connection) as ctx:
+            shipment.save(update_fields=['receiver_name'])
+        self.assertFalse([q for q in ctx.captured_queries if ShipmentRollup._meta.db_table in q['sql']])
+
+    def test_rebuild_command(self):
+        make_shipment('R4', status=self.delivered)
+        ShipmentRollup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertIn('Rebuilt 4 rollup buckets', out.getvalue())
+        self.assertEqual(self.buckets('carrier'), [(0, 'on_time', 1)])
+        self.assertEqual(self.buckets('status'), [(self.delivered.pk, 'on_time', 1)])
+
+    def test_dashboard_reads_only_rollups(self):
+        make_shipment('R5', carrier=self.ups, status=self.delivered, date=date(2025, 1, 9))
+        make_shipment('R6', carrier=self.ups, status=self.pending)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/shipments/shipment/dashboard/?days=7&format=json')
+        self.assertFalse([q for q in ctx.captured_queries if 'shipments_shipment"' in q['sql']])
+        data = response.json()
+        self.assertEqual((data['total'], data['late'], data['open'], data['on_time_rate']), (2, 1, 1, 0.0))
+        self.assertEqual(data['by_carrier'], [{'name': 'UPS', 'count': 2}])
+        self.assertContains(self.client.get('/admin/shipments/shipment/dashboard/'), 'Delivered late')
+
+
+class ImportShipmentsCommandTests(TestCase):
+    CSV_HEADER = (
+        'shipment_number,shipper_name,shipper_phone,shipper_address,shipper_email,'
+        'receiver_name,receiver_phone,receiver_address,receiver_email,weight_kg,packages,'
+        'quantity,total_freight,carrier,status,origin,destination,departure_time,pickup_time,'
+        'pickup_date,expected_delivery_date,date,time\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        Carrier.objects.create(name='UPS')
+        StatusType.objects.create(name='PENDING')
+        Country.objects.create(name='Kenya')
+        PieceType.objects.create(name='Box')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def csv_row(self, number, carrier='ups', pickup_date='2025-03-01'):
+        return (
+            f'{number},Ada,+1555,1 Road,ada@example.com,Bob,+1556,2 Road,bob@example.com,'
+            f'2.5,1,1,100,{carrier},Pending,kenya,Kenya,09:00,08:00,{pickup_date},2025-03-05,'
+            f'2025-03-02,12:00\n'
+        )
+
+    def run_import(self, filename, content, *args):
+        path = Path(self.tmp.name) / filename
+        path.write_text(content)
+        out = StringIO()
+        call_command('import_shipments', str(path), *args, stdout=out)
+        return path, out.getvalue()
+
+    def test_csv_import_with_rejects(self):
+        make_shipment('EXISTING1')
+        content = self.CSV_HEADER + ''.join([
+            self.csv_row('NEW1'),
+            self.csv_row('existing1'),
+            self.csv_row('NEW2', carrier='Pigeon'),
+            self.csv_row('NEW3', pickup_date='not-a-date'),
+            self.csv_row('NEW4'),
+            self.csv_row('NEW<5>'),
+        ])
+        path, out = self.run_import('manifest.csv', content, '--batch-size', '2')
+
+        self.assertIn('Imported 2 shipments', out)
+        imported = Shipment.objects.for_tracking_number('new1').select_related('carrier', 'origin').get()
+        self.assertEqual((imported.carrier.name, imported.origin.name), ('UPS', 'Kenya'))
+        self.assertEqual(imported.events.count(), 1)
+        self.assertEqual(list(search_shipments(Shipment.objects.all(), 'new1 bob')), [imported])
+        self.assertEqual(ShipmentRollup.objects.get(dimension='carrier', value_id=imported.carrier_id).count, 2)
+
+        rejects = [json.loads(line) for line in Path(f'{path}.rejects.jsonl').read_text().splitlines()]
+        rejects.sort(key=lambda r: r['line'])
+        self.assertEqual([r['line'] for r in rejects], [3, 4, 5, 7])
+        self.assertIn('Duplicate', rejects[0]['error'])
+        self.assertIn("Unknown carrier 'Pigeon'", rejects[1]['error'])
+        self.assertIn('pickup_date', rejects[2]['error'])
+        self.assertIn('Invalid shipment_number: NEW<5>', rejects[3]['error'])
+
+    def test_jsonl_import_with_packages(self):
+        row = {
+            'shipment_number': 'TBA123', 'shipper_name': 'Ada', 'shipper_phone': '+1555',
+            'shipper_address': '1 Road', 'shipper_email': 'ada@example.com',
+            'receiver_name': 'Bob', 'receiver_phone': '+1556', 'receiver_address': '2 Road',
+            'receiver_email': 'bob@example.com', 'weight_kg': 3, 'packages': 1, 'quantity': 2,
+            'total_freight': '50', 'carrier': 'UPS', 'departure_time': '09:00',
+            'pickup_time': '08:00', 'pickup_date': '2025-03-01',
+            'expected_delivery_date': '2025-03-05', 'date': '2025-03-02', 'time': '12:00',
+            'packages_list': [
+                {'qty': 2, 'piece_type': 'box', 'description': 'Books', 'length_cm': 10,
+                 'width_cm': 10, 'height_cm': 10, 'weight_kg': 1.5},
+            ],
+        }
+        path, out = self.run_import('manifest.jsonl', json.dumps(row) + '\n{broken\n')
+        self.assertIn('1 rows rejected', out)
+        package = Package.objects.select_related('piece_type', 'shipment').get()
+        self.assertEqual((package.shipment.shipment_number, package.piece_type.name), ('TBA123', 'Box'))
+
+    def test_rows_without_numbers_get_reserved_ones(self):
+        rows = self.csv_row('') * 3
+        self.run_import('manifest.csv', self.CSV_HEADER + rows)
+        numbers = list(Shipment.objects.values_list('shipment_number', flat=True))
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertTrue(all(number.startswith('1Z') for number in numbers))
+        self.assertFalse(TrackingNumberReservation.objects.exists())
+
+    def test_queries_per_batch_are_constant(self):
+        counts = {}
+        # Both sizes fit in one SQLite insert statement
+        for size in (5, 20):
+            rows = ''.join(self.csv_row(f'Q{size}-{i}') for i in range(size))
+            with CaptureQueriesContext(connection) as ctx:
+                self.run_import(f'manifest{size}.csv', self.CSV_HEADER + rows, '--batch-size', '100')
+            counts[size] = len(ctx.captured_queries)
+            self.assertEqual(Shipment.objects.filter(shipment_number__startswith=f'Q{size}-').count(), size)
+        self.assertEqual(counts[5], counts[20])
+
+
+class SyntheticDataAndBenchmarkTests(TestCase):
+    def test_synthetic_shipments_fill_every_dropdown(self):
+        out = StringIO()
+        call_command('generate_synthetic_data', '--shipments', '6', '--max-packages', '2', stdout=out)
+        self.assertIn('Created 6 synthetic shipments', out.getvalue())
+        shipments = list(Shipment.objects.all())
+        self.assertEqual(len(shipments), 6)
+        for shipment in shipments:
+            self.assertTrue(all(getattr(shipment, f'{name}_id') for name in (
+                'shipment_type', 'courier', 'mode', 'product', 'payment_mode',
+                'carrier', 'origin', 'destination', 'location', 'status')))
+            self.assertIn(classify_tracking_number(shipment.shipment_number)[1], (VALID, UNCHECKED))
+            self.assertEqual(shipment.packages_list.count(), shipment.packages)
+        self.assertEqual(ShipmentRollup.objects.filter(dimension='status').aggregate(total=Sum('count'))['total'], 6)
+
+    def test_run_benchmarks_writes_json(self):
+        call_command('generate_synthetic_data', '--shipments', '5', stdout=StringIO())
+        output = Path(tempfile.mkdtemp()) / 'bench.json'
+        self.addCleanup(output.unlink, missing_ok=True)
+        call_command('run_benchmarks', '--repeat', '2', '--import-rows', '3', '--export-rows', '2',
+                     '--output', str(output), stdout=StringIO())
+        report = json.loads(output.read_text())
+        self.assertEqual(report['shipments'], 5)
+        self.assertEqual(set(report['results']), {
+            'track_page', 'track_page_uncached', 'admin_changelist', 'admin_search',
+            'tracking_number', 'import', 'export',
+        })
+        self.assertEqual(report['results']['export']['runs'], 2)
+        # The import benchmark leaves nothing behind
+        self.assertEqual(Shipment.objects.count(), 5)
+
+        slower = {name: {**result, 'median_us': result['median_us'] / 10}
+                  for name, result in report['results'].items()}
+        output.write_text(json.dumps({'results': slower}))
+        with self.assertRaisesMessage(CommandError, 'Slower than the baseline'):
+            call_command('run_benchmarks', '--repeat', '1', '--only', 'tracking_number',
+                         '--compare', str(output), '--fail-above', '50', stdout=StringIO())
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        # The test connection was opened before sampling was on, so signals.request_metrics_connection skipped it
+        if metrics.record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(metrics.record_query)
+            self.addCleanup(connection.execute_wrappers.remove, metrics.record_query)
+        make_shipment('1Z999AA10123456784')
+
+    def test_track_page_is_measured(self):
+        self.client.get('/track/', {'tracking_number': '1Z999AA10123456784'})
+        histograms = metrics.registry.snapshot()['track_shipment']
+        self.assertEqual(histograms['duration_seconds'].count, 1)
+        self.assertGreaterEqual(histograms['db_queries'].sum, 1)
+        self.assertGreater(histograms['db_seconds'].sum, 0)
+        self.assertGreater(histograms['template_seconds'].sum, 0)
+        self.assertGreater(histograms['response_bytes'].sum, 1000)
+
+    async def test_async_requests_are_measured(self):
+        await self.async_client.post('/api/track/', {'tracking_numbers': ['1Z999AA10123456784']},
+                                     content_type='application/json')
+        histograms = metrics.registry.snapshot()['track_batch_api']
+        self.assertEqual(histograms['db_queries'].sum, 1)
+
+    def test_histogram_quantiles(self):
+        histogram = metrics.Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.quantile(0.5), 1.75)
+        self.assertEqual(histogram.quantile(0.99), 4)
+
+    def test_endpoints_are_restricted(self):
+        self.client.get('/track/', {'tracking_number': '1Z999AA10123456784'})
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/admin/metrics/').status_code, 302)
+
+        with self.settings(REQUEST_METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertContains(
+            response, 'tracking_request_duration_seconds_bucket{view="track_shipment",le="+Inf"} 1')
+        self.assertContains(response, '# TYPE tracking_request_db_queries histogram')
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.assertContains(self.client.get('/admin/metrics/'), '<td>track_shipment</td>')
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_sampling_off_removes_the_middleware(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            metrics.RequestMetricsMiddleware(lambda request: None)
+
+
+class WarmupTests(TestCase):
+    @override_settings(WARMUP_ON_STARTUP=True)
+    def test_warm_up_parses_templates_and_loads_reference_data(self):
+        carrier = Carrier.objects.create(name='UPS')
+        refdata.invalidate_all()
+        engine = engines.all()[0].engine
+        self.assertIn('track.html', template_names(engine))
+        self.assertIn('admin/change_list.html', template_names(engine))
+
+        with self.assertLogs('shipments.warmup', 'INFO') as logs:
+            timings = warm_up()
+        self.assertEqual(list(timings), ['templates', 'urls', 'static_manifests', 'reference_data'])
+        self.assertNotIn('WARNING', '\n'.join(logs.output))
+        cached = engine.template_loaders[0].get_template_cache
+        self.assertIn('track.html', cached)
+        self.assertIn('admin/change_list.html', cached)
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.reference_table(Carrier).id_for('ups'), carrier.pk)
+
+    @override_settings(WARMUP_ON_STARTUP=False)
+    def test_can_be_turned_off(self):
+        self.assertEqual(warm_up(), {})
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_sqlite_profile_sets_pragmas_on_every_connection(self):
+        config = database_config('db.sqlite3', environ={'DB_BUSY_TIMEOUT_MS': '250', 'DB_CONN_MAX_AGE': 'none'})
+        self.assertEqual(config['NAME'], 'db.sqlite3')
+        self.assertIsNone(config['CONN_MAX_AGE'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        pragmas = config['OPTIONS']['init_command'].split(';')
+        self.assertIn('PRAGMA journal_mode=WAL', pragmas)
+        self.assertIn('PRAGMA busy_timeout=250', pragmas)
+
+    def test_postgresql_pool_replaces_persistent_connections(self):
+        config = database_config('db.sqlite3', environ={'DB_PROFILE': 'postgresql', 'DB_NAME': 'tracking_test'})
+        self.assertEqual((config['NAME'], config['CONN_MAX_AGE'], config['OPTIONS']), ('tracking_test', 600, {}))
+        config = database_config('db.sqlite3', environ={'DB_PROFILE': 'postgresql', 'DB_POOL_MAX_SIZE': '8'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8, 'timeout': 10})
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_config('db.sqlite3', environ={'DB_PROFILE': 'oracle'})
+
+
+class ShipmentExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ups = Carrier.objects.create(name='UPS')
+        dhl = Carrier.objects.create(name='DHL')
+        for i in range(6):
+            make_shipment(f'EXP{i}', carrier=cls.ups if i % 2 else dhl, receiver_name=f'Receiver {i}')
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def export(self, **params):
+        response = self.client.get('/admin/shipments/shipment/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_honors_changelist_filters_and_search(self):
+        rows = list(csv.DictReader(StringIO(self.export(carrier__id__exact=self.ups.pk))))
+        self.assertEqual([row['shipment_number'] for row in rows], ['EXP1', 'EXP3', 'EXP5'])
+        self.assertEqual({row['carrier'] for row in rows}, {'UPS'})
+
+        rows = list(csv.DictReader(StringIO(self.export(q='Receiver 4'))))
+        self.assertEqual([row['shipment_number'] for row in rows], ['EXP4'])
+
+    def test_export_skips_the_changelist_page_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.export(carrier__id__exact=self.ups.pk)
+        shipment_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "shipments_shipment"' in q['sql']]
+        self.assertEqual(len(shipment_queries), 1, shipment_queries)
+        self.assertNotIn('COUNT(', shipment_queries[0])
+
+    def test_jsonl_export(self):
+        lines = self.export(format='jsonl').splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[0])['shipment_number'], 'EXP0')
+
+    def test_export_action_streams_selection(self):
+        selected = Shipment.objects.filter(shipment_number__in=['EXP0', 'EXP2'])
+        response = self.client.post('/admin/shipments/shipment/', {
+            'action': 'export_selected_csv',
+            '_selected_action': [shipment.pk for shipment in selected],
+        })
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(sorted(row['shipment_number'] for row in rows), ['EXP0', 'EXP2'])
+
+    def test_export_rows_reimport(self):
+        content = self.export(carrier__id__exact=self.ups.pk)
+        Shipment.objects.all().delete()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(Path(handle.name).unlink)
+        call_command('import_shipments', handle.name, stdout=StringIO())
+        self.assertEqual(Shipment.objects.filter(carrier=self.ups).count(), 3)
+
+
+class TrackingNumberFormatTests(TestCase):
+    PATTERNS = {
+        'USPS': r'^(94\d{2}( \d{4}){4} \d{2}|(EA|EC|CP|RA|RB|RC)\d{9}US)$',
+        'UPS': r'^1Z[A-Z0-9]{16}$',
+        'FedEx': r'^\d{4} \d{4} \d{4}( \d{3})?$',
+        'DHL Express': r'^\d{4} \d{4} \d{2}$',
+        'Amazon Logistics': r'^TBA[A-Z0-9]{12}$',
+        'Nile Cargo Lines': r'^NCL-\d{10}-[A-Z0-9]{6}$',
+    }
+
+    def test_bulk_numbers_match_carrier_formats(self):
+        for carrier, pattern in self.PATTERNS.items():
+            numbers = generate_tracking_numbers(carrier, 300)
+            self.assertEqual(len(numbers), 300)
+            for number in numbers:
+                self.assertRegex(number, pattern)
+
+    def test_all_variants_are_used(self):
+        numbers = generate_tracking_numbers('USPS', 200)
+        self.assertTrue(any(n.endswith('US') for n in numbers))
+        self.assertTrue(any(n.startswith('94') for n in numbers))
+
+    def test_single_number_helper(self):
+        self.assertEqual(generate_tracking_number(''), '')
+        self.assertRegex(generate_tracking_number('ups'), self.PATTERNS['UPS'])
+
+
+class TrackingNumberValidationTests(TestCase):
+    def test_generated_numbers_validate(self):
+        for carrier in TrackingNumberFormatTests.PATTERNS:
+            for number in generate_tracking_numbers(carrier, 200):
+                self.assertEqual(classify_tracking_number(number)[1], VALID, number)
+
+    def test_generated_numbers_validate_for_any_carrier_name(self):
+        for name, initials in (('Aramex (UAE)', 'AU'), ('Überall Express', 'BE'), ('3C Logistics', '3L'), ('— ü —', 'TRK')):
+            number = generate_tracking_number(name)
+            self.assertTrue(number.startswith(initials + '-'), number)
+            self.assertEqual(classify_tracking_number(number)[1:], (VALID, 'DEFAULT'), number)
+
+    def test_published_carrier_examples_validate(self):
+        self.assertEqual(classify_tracking_number('1Z999AA10123456784')[1:], (VALID, 'UPS'))
+        self.assertEqual(classify_tracking_number('9405 5118 9922 3197 4284 90')[1:], (VALID, 'USPS'))
+        self.assertEqual(classify_tracking_number('ec123456785us')[1:], (VALID, 'USPS'))
+
+    def test_single_typo_is_caught(self):
+        self.assertEqual(classify_tracking_number('1Z999AA10123456785')[1], BAD_CHECK_DIGIT)
+        self.assertEqual(classify_tracking_number('EC123456795US')[1], BAD_CHECK_DIGIT)
+        with self.assertRaises(ValidationError):
+            validate_tracking_number('1Z999AA10123456785')
+        with override_settings(TRACKING_NUMBER_CHECK_DIGITS=False):
+            validate_tracking_number('1Z999AA10123456785')
+
+    def test_junk_is_invalid_and_other_formats_unchecked(self):
+        for junk in ('', 'a', "1' OR '1'='1", '<script>', 'X' * 65):
+            self.assertEqual(classify_tracking_number(junk)[1], INVALID, junk)
+        self.assertEqual(classify_tracking_number('ARAMEX-7731')[1], UNCHECKED)
+
+    def test_suggests_the_corrected_number(self):
+        self.assertEqual(suggest_tracking_number('1z999aa1012345678 5'), '1Z999AA10123456784')
+        self.assertEqual(suggest_tracking_number('EC123456795US'), 'EC123456799US')
+        self.assertIsNone(suggest_tracking_number('1Z999AA10123456784'))
+        self.assertIsNone(suggest_tracking_number('ARAMEX-7731'))
+
+    def test_track_page_offers_the_corrected_number(self):
+        make_shipment('1Z999AA10123456784')
+        # The lookup, then whether the corrected number exists
+        with self.assertNumQueries(2):
+            response = self.client.get('/track/', {'tracking_number': '1Z999AA10123456785'})
+        self.assertContains(response, 'Shipment Not Found')
+        self.assertContains(response, 'Did you mean')
+        self.assertContains(response, '?tracking_number=1Z999AA10123456784')
+        with self.assertNumQueries(0):
+            self.client.get('/track/', {'tracking_number': '   '})
+            self.client.get('/track/', {'tracking_number': 'X' * 201})
+
+    def test_impossible_inputs_never_reach_the_database(self):
+        shipment = make_shipment('NCL-2503011230-AB12C7')
+        with self.assertNumQueries(0):
+            for junk in ("1' OR '1'='1", '<script>alert(1)</script>', 'wp-login.php?x=1', '%00'):
+                response = self.client.get('/track/', {'tracking_number': junk})
+                self.assertContains(response, 'Shipment Not Found')
+        self.assertTrue(is_plausible_tracking_number('ncl-2503011230-ab12c7'))
+        # The database holds stored keys to the same alphabet
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Shipment.objects.filter(pk=shipment.pk).update(tracking_key='AB<12>')
+
+    def test_legacy_numbers_are_still_found_and_saved(self):
+        # DHL's shape, issued before check digits (the check digit would be 1)
+        legacy = make_detailed_shipment('1234 5678 90', package_count=0)
+        self.assertEqual(classify_tracking_number(legacy.shipment_number)[1], BAD_CHECK_DIGIT)
+        response = self.client.get('/track/', {'tracking_number': '1234567890'})
+        self.assertEqual(response.context['shipment'], legacy)
+        legacy.full_clean()
+
+        data = model_to_dict(legacy)
+        self.assertTrue(ShipmentAdminForm(data, instance=legacy).is_valid())
+        data['shipment_number'] = '1234 5678 70'
+        form = ShipmentAdminForm(data, instance=legacy)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['shipment_number'][0].code, 'check_digit')
+
+
+class TrackingNumberReservationTests(TestCase):
+    def test_reserves_unique_numbers_in_constant_queries(self):
+        counts = {}
+        for n in (1, 200):
+            with CaptureQueriesContext(connection) as ctx:
+                numbers = reserve_tracking_numbers('UPS', n)
+            counts[n] = len(ctx.captured_queries)
+            self.assertEqual(len({normalize_tracking_number(number) for number in numbers}), n)
+            self.assertTrue(all(number.startswith('1Z') for number in numbers))
+        self.assertEqual(counts[1], counts[200])
+
+    def test_skips_numbers_used_by_shipments_or_other_reservations(self):
+        make_shipment('TAKEN-1')
+        TrackingNumberReservation.objects.create(tracking_key='TAKEN-2', batch='00000000-0000-0000-0000-000000000000')
+        candidates = itertools.chain(['TAKEN-1', 'TAKEN-2'], (f'FREE-{i}' for i in itertools.count(1)))
+        generate = lambda name, count: list(itertools.islice(candidates, count))
+        with mock.patch('shipments.reservations.generate_tracking_numbers', generate):
+            self.assertEqual(reserve_tracking_numbers('Acme', 1), ['FREE-1'])
+
+    def test_gives_up_after_bounded_rounds(self):
+        make_shipment('ALWAYS-SAME')
+        with mock.patch('shipments.reservations.generate_tracking_numbers', lambda name, count: ['ALWAYS-SAME'] * count):
+            with self.assertRaises(ReservationError):
+                reserve_tracking_numbers('Acme', 1)
+        self.assertFalse(TrackingNumberReservation.objects.exists())
+
+    def test_saving_a_shipment_releases_its_reservation(self):
+        number = reserve_tracking_numbers('DHL', 1)[0]
+        make_shipment(number)
+        self.assertFalse(TrackingNumberReservation.objects.exists())
+
+    def test_admin_generate_tracking_button(self):
+        carrier = Carrier.objects.create(name='FedEx')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get('/admin/shipments/shipment/generate-tracking/', {'carrier_id': carrier.pk})
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertTrue(TrackingNumberReservation.objects.filter(
+            tracking_key=normalize_tracking_number(data['tracking_number'])).exists())
+
+
+class TrackBatchApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shipment = make_detailed_shipment('1Z999AA10123456784', package_count=0)
+        make_shipment('EC123456785US')
+
+    def post(self, numbers, **headers):
+        return self.client.post('/api/track/', json.dumps({'tracking_numbers': numbers}),
+                                content_type='application/json', headers=headers)
+
+    def test_batch_lookup_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.post(['ec 1234 5678 5us', '1z999aa10123456784', 'TBA00000000000B', ' ', '1Z999AA10123456784'])
+        data = response.json()
+        self.assertEqual([record['tracking_number'] for record in data['shipments']],
+                         ['EC123456785US', '1Z999AA10123456784'])
+        self.assertEqual(data['shipments'][1]['status'], 'IN_TRANSIT')
+        self.assertEqual(data['shipments'][1]['location'], 'United States')
+        self.assertEqual(data['shipments'][1]['carrier'], 'UPS')
+        self.assertEqual(data['not_found'], ['TBA00000000000B'])
+        self.assertEqual(data['invalid'], [' '])
+
+    def test_unchanged_poll_is_not_modified(self):
+        numbers = ['1Z999AA10123456784', 'EC123456785US']
+        etag = self.post(numbers)['ETag']
+        with self.assertNumQueries(1):
+            response = self.post(numbers, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.shipment.remarks = 'Arrived at hub'
+        self.shipment.save()
+        response = self.post(numbers, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.post('/api/track/', 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self.post('1Z999AA10123456784').status_code, 400)
+        with override_settings(TRACKING_API_MAX_NUMBERS=2):
+            self.assertEqual(self.post(['A1A', 'B2B', 'C3C']).status_code, 400)
+        self.assertEqual(self.client.get('/api/track/').status_code, 405)
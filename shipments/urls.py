@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The event loop runs the native async variants under ASGI (settings.ASYNC_VIEWS);
+# WSGI workers serve the sync views without an event loop per request.
+if settings.ASYNC_VIEWS:
+    track_view, batch_view, generate_view = (
+        views.atrack_shipment, views.atrack_batch_api, views.agenerate_tracking_number_view)
+else:
+    track_view, batch_view, generate_view = (
+        views.track_shipment, views.track_batch_api, views.generate_tracking_number_view)
+
 urlpatterns = [
     path('', views.home_view, name='home'),
-    path('track/', views.track_shipment, name='track_shipment'),
-    path('admin/generate-tracking/', views.generate_tracking_number_view, name='generate_tracking'),
+    path('track/', track_view, name='track_shipment'),
+    path('track/live/', views.shipment_status_feed, name='shipment_status_feed'),
+    path('api/track/', batch_view, name='track_batch_api'),
+    path('admin/generate-tracking/', generate_view, name='generate_tracking'),
+    path('metrics/', views.prometheus_metrics, name='prometheus_metrics'),
     path('about/', views.about_page, name='about'),
     path('blog/', views.blog_page, name='blog'),
 ]
\ No newline at end of file
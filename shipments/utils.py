@@ -1,7 +1,251 @@
 # shipments/utils.py
-import random
+import re
+import secrets
 import string
 from datetime import datetime
+from functools import lru_cache
+
+from .checkdigits import (
+    dhl_check_digit, fedex_check_digit, mod10_check_digit, mod36_check_digit,
+    s10_check_digit, ups_check_digit,
+)
+
+
+def normalize_tracking_number(tracking_number):
+    """
+    Canonical form of a tracking number used for indexed lookups.
+
+    Whitespace is dropped and letters are upper-cased, so "1z 999..." and
+    "1Z999..." resolve to the same shipment.
+    """
+    if not tracking_number:
+        return ""
+    return ''.join(str(tracking_number).split()).upper()
+
+
+# Every stored tracking_key matches this (the shipment_tracking_key_characters
+# constraint), so a lookup for anything else can be refused without a query
+TRACKING_KEY_PATTERN = r'^[-A-Z0-9#+./:_]+$'
+
+
+# -----------------------------
+# TRACKING NUMBER FORMATS
+# -----------------------------
+DIGITS = string.digits
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+
+# Placeholders filled in per call for the default format
+INITIALS = '{initials}'
+TIMESTAMP = '{timestamp}'
+PLACEHOLDER_PATTERNS = {
+    INITIALS: '[A-Z0-9]{1,3}',
+    TIMESTAMP: '[0-9]{10}',
+}
+
+
+class UniformPicker:
+    """Unbiased random indices in range(n), drawn in bulk from the OS CSPRNG"""
+
+    def __init__(self, n):
+        # Bytes at or above `limit` are dropped so every index is equally likely
+        limit = 256 - 256 % n
+        self._table = bytes(b % n for b in range(256))
+        self._rejected = bytes(range(limit, 256))
+
+    def draw(self, count):
+        """`count` indices as a bytes object"""
+        picked = b''
+        while len(picked) < count:
+            raw = secrets.token_bytes(count - len(picked) + 16)
+            picked += raw.translate(self._table, self._rejected)
+        return picked[:count]
+
+
+class Random:
+    """`length` characters drawn uniformly from `alphabet`"""
+
+    def __init__(self, alphabet, length):
+        self.length = length
+        self._picker = UniformPicker(len(alphabet))
+        self._symbols = alphabet.encode('ascii').ljust(256, b'?')
+
+        self._pattern = f"[{re.escape(alphabet)}]{{{length}}}"
+
+    def generate(self, count):
+        needed = count * self.length
+        text = self._picker.draw(needed).translate(self._symbols).decode('ascii')
+        return [text[i:i + self.length] for i in range(0, needed, self.length)]
+
+    def pattern(self):
+        return self._pattern
+
+
+class Choice:
+    """One of a fixed set of strings, chosen uniformly"""
+
+    def __init__(self, options):
+        self.options = options
+        self._picker = UniformPicker(len(options))
+
+    def generate(self, count):
+        return [self.options[i] for i in self._picker.draw(count)]
+
+    def pattern(self):
+        return '(?:' + '|'.join(re.escape(option) for option in self.options) + ')'
+
+
+class Check:
+    """Check character computed from everything before it in the number"""
+
+    def __init__(self, function, alphabet=DIGITS):
+        self.function = function
+        self.alphabet = alphabet
+
+    def pattern(self):
+        return f"[{re.escape(self.alphabet)}]"
+
+
+class Variant:
+    """
+    One layout of a carrier's numbers: literal, random and check segments,
+    optionally printed in space-separated groups.
+    """
+
+    def __init__(self, *segments, group=None):
+        self.segments = segments
+        self.group = group
+        self.check = next((seg for seg in segments if isinstance(seg, Check)), None)
+        self.regex = self._compile()
+
+    def _compile(self):
+        """Regex over the normalized (ungrouped, upper-case) number"""
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, Check):
+                parts = ['(?P<body>' + ''.join(parts) + ')', '(?P<check>' + segment.pattern() + ')']
+            elif isinstance(segment, (Random, Choice)):
+                parts.append(segment.pattern())
+            else:
+                parts.append(PLACEHOLDER_PATTERNS.get(segment, re.escape(segment)))
+        return re.compile(''.join(parts))
+
+    def generate(self, count, literals=None):
+        columns = []
+        for segment in self.segments:
+            if isinstance(segment, Check):
+                bodies = [''.join(parts) for parts in zip(*columns)]
+                columns.append([segment.function(body) for body in bodies])
+            elif isinstance(segment, (Random, Choice)):
+                columns.append(segment.generate(count))
+            else:
+                value = (literals or {}).get(segment, segment)
+                columns.append([value] * count)
+        numbers = [''.join(parts) for parts in zip(*columns)]
+        if self.group:
+            step = self.group
+            numbers = [' '.join(n[i:i + step] for i in range(0, len(n), step)) for n in numbers]
+        return numbers
+
+    def verify(self, tracking_key):
+        """None if the normalized number has another shape, else whether its check digit holds"""
+        match = self.regex.fullmatch(tracking_key)
+        if match is None:
+            return None
+        if self.check is None:
+            return True
+        return self.check.function(match['body']) == match['check']
+
+    def corrected(self, tracking_key):
+        """The normalized number with its check character recomputed; None if it has another shape"""
+        match = self.regex.fullmatch(tracking_key)
+        if match is None or self.check is None:
+            return None
+        check = self.check.function(match['body'])
+        return tracking_key[:match.start('check')] + check + tracking_key[match.end('check'):]
+
+
+class CarrierFormat:
+    def __init__(self, name, keywords, variants):
+        self.name = name
+        self.keywords = keywords
+        self.variants = variants
+        self._picker = UniformPicker(len(variants))
+
+    def matches(self, carrier):
+        return any(keyword in carrier for keyword in self.keywords)
+
+    def generate(self, count, literals=None):
+        if len(self.variants) == 1:
+            return self.variants[0].generate(count, literals)
+        # Pick a variant per number, then build each variant's numbers in one pass
+        picks = self._picker.draw(count)
+        batches = [
+            iter(variant.generate(picks.count(i), literals))
+            for i, variant in enumerate(self.variants)
+        ]
+        return [next(batches[pick]) for pick in picks]
+
+
+
+CARRIER_FORMATS = (
+    # USPS: 9400 1000 0000 0000 0000 00 (IMpb) or EC123456785US (UPU S10)
+    CarrierFormat('USPS', ('USPS', 'UNITED STATES POSTAL SERVICE'), (
+        Variant('94', Random(DIGITS, 19), Check(mod10_check_digit), group=4),
+        Variant(Choice(('EA', 'EC', 'CP', 'RA', 'RB', 'RC')), Random(DIGITS, 8),
+                Check(s10_check_digit), 'US'),
+    )),
+    # UPS: 1Z9999W99999999999
+    CarrierFormat('UPS', ('UPS', 'UNITED PARCEL SERVICE'), (
+        Variant('1Z', Random(ALPHANUMERIC, 15), Check(ups_check_digit)),
+    )),
+    # FedEx: 9999 9999 9999 (Express) or 9999 9999 9999 999 (Ground)
+    CarrierFormat('FEDEX', ('FEDEX', 'FEDERAL EXPRESS'), (
+        Variant(Random(DIGITS, 11), Check(fedex_check_digit), group=4),
+        Variant(Random(DIGITS, 14), Check(mod10_check_digit), group=4),
+    )),
+    # DHL Express: 0000 0000 00
+    CarrierFormat('DHL', ('DHL',), (
+        Variant(Random(DIGITS, 9), Check(dhl_check_digit), group=4),
+    )),
+    # Amazon Logistics: TBA123456789000
+    CarrierFormat('AMAZON', ('AMAZON', 'AMZL'), (
+        Variant('TBA', Random(ALPHANUMERIC, 11), Check(mod36_check_digit, ALPHANUMERIC)),
+    )),
+)
+
+# Other carriers: initials + timestamp + random, e.g. NIL-2503011230-AB12CD
+DEFAULT_FORMAT = CarrierFormat('DEFAULT', (), (
+    Variant(INITIALS, '-', TIMESTAMP, '-', Random(ALPHANUMERIC, 5), Check(mod36_check_digit, ALPHANUMERIC)),
+))
+
+
+@lru_cache(maxsize=256)
+def carrier_format(carrier_name):
+    """The format registered for a carrier name, and its initials for the default format"""
+    carrier = str(carrier_name or '').upper().strip()
+    for fmt in CARRIER_FORMATS:
+        if fmt.matches(carrier):
+            return fmt, None
+    # The first ASCII letter or digit of each word, the alphabet PLACEHOLDER_PATTERNS[INITIALS] accepts
+    firsts = (re.search('[A-Z0-9]', word) for word in carrier.split())
+    initials = ''.join(match[0] for match in firsts if match)[:3]
+    return DEFAULT_FORMAT, initials or 'TRK'
+
+
+def generate_tracking_numbers(carrier_name, count):
+    """
+    `count` tracking numbers in the carrier's format.
+
+    Randomness comes from the OS CSPRNG (secrets.token_bytes), drawn in bulk
+    for the whole batch. Numbers are not checked for uniqueness; use
+    reservations.reserve_tracking_numbers() for that.
+    """
+    fmt, initials = carrier_format(carrier_name)
+    literals = None
+    if initials is not None:
+        literals = {INITIALS: initials, TIMESTAMP: datetime.now().strftime('%y%m%d%H%M')}
+    return fmt.generate(count, literals)
+
 
 def generate_tracking_number(carrier_name):
     """
@@ -9,55 +253,4 @@ def generate_tracking_number(carrier_name):
     """
     if not carrier_name:
         return ""
-    
-    carrier = str(carrier_name).upper().strip()
-    
-    # USPS (United States Postal Service)
-    if 'USPS' in carrier or 'UNITED STATES POSTAL SERVICE' in carrier:
-        if random.choice([True, False]):
-            # 22-digit format: 9400 1000 0000 0000 0000 00
-            number = '94' + ''.join([str(random.randint(0, 9)) for _ in range(20)])
-            formatted = ' '.join([number[i:i+4] for i in range(0, len(number), 4)])
-            return formatted
-        else:
-            # Letter format: EC123456789US
-            prefix = random.choice(['EA', 'EC', 'CP', 'RA', 'RB', 'RC'])
-            middle = ''.join([str(random.randint(0, 9)) for _ in range(9)])
-            return f'{prefix}{middle}US'
-    
-    # UPS (United Parcel Service)
-    elif 'UPS' in carrier or 'UNITED PARCEL SERVICE' in carrier:
-        # Format: 1Z9999W99999999999
-        middle = ''.join(random.choices(string.ascii_uppercase + string.digits, k=16))
-        return f'1Z{middle}'
-    
-    # FedEx (FDX)
-    elif 'FEDEX' in carrier or 'FEDERAL EXPRESS' in carrier:
-        # Format: 9999 9999 9999 or 9999 9999 9999 999
-        length = random.choice([12, 15])
-        number = ''.join([str(random.randint(0, 9)) for _ in range(length)])
-        formatted = ' '.join([number[i:i+4] for i in range(0, len(number), 4)])
-        return formatted
-    
-    # DHL Express
-    elif 'DHL' in carrier:
-        # Format: 0000 0000 0000
-        number = ''.join([str(random.randint(0, 9)) for _ in range(10)])
-        formatted = ' '.join([number[i:i+4] for i in range(0, len(number), 4)])
-        return formatted.rstrip()
-    
-    # AMZL (Amazon Logistics)
-    elif 'AMAZON' in carrier or 'AMZL' in carrier:
-        # Format: TBA123456789000
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
-        return f'TBA{suffix}'
-    
-    # Default for other carriers
-    else:
-        # Generate based on carrier initials + timestamp + random
-        initials = ''.join([word[0] for word in carrier.split() if word])[:3].upper()
-        if not initials:
-            initials = 'TRK'
-        timestamp = datetime.now().strftime('%y%m%d%H%M')
-        random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f'{initials}-{timestamp}-{random_part}'
\ No newline at end of file
+    return generate_tracking_numbers(carrier_name, 1)[0]
@@ -0,0 +1,104 @@
+# shipments/validators.py
+"""
+Tracking number validation, built from the same CARRIER_FORMATS registry
+that generate_tracking_numbers() uses.
+
+Inputs are normalized (whitespace dropped, upper-cased) and classified
+without touching the database:
+
+* INVALID: cannot be a tracking number at all (empty, wrong characters,
+  too short or too long).
+* BAD_CHECK_DIGIT: has the shape of a carrier format but its check digit
+  does not add up, i.e. almost certainly a typo.
+* VALID: matches a carrier format including its check digit.
+* UNCHECKED: a plausible number in no known format (manually entered
+  numbers from other carriers).
+
+Formats and check digits are only enforced on numbers staff enter or
+change (ShipmentAdminForm). Shipments saved before then carry numbers of
+the same shapes without check digits, so lookups accept anything the
+field can hold and only use a failed check digit to suggest a correction.
+What the field can hold is still narrower than any string: stored keys
+are limited to TRACKING_KEY_PATTERN, so lookups for other characters
+never reach the database.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .utils import CARRIER_FORMATS, DEFAULT_FORMAT, TRACKING_KEY_PATTERN, normalize_tracking_number
+
+VALID = 'valid'
+UNCHECKED = 'unchecked'
+BAD_CHECK_DIGIT = 'bad_check_digit'
+INVALID = 'invalid'
+
+# Shipment.shipment_number's max_length: no stored number is longer
+MAX_LENGTH = 200
+TRACKING_KEY = re.compile(TRACKING_KEY_PATTERN)
+
+# Anything we would issue or accept as a new number: letters and digits with - . / _ separators
+PLAUSIBLE_NUMBER = re.compile(r'[A-Z0-9][A-Z0-9./_-]{2,63}')
+
+VARIANTS = tuple(
+    (fmt.name, variant)
+    for fmt in (*CARRIER_FORMATS, DEFAULT_FORMAT)
+    for variant in fmt.variants
+)
+
+
+def classify_tracking_number(tracking_number):
+    """(normalized number, verdict, carrier format name or None)"""
+    tracking_key = normalize_tracking_number(tracking_number)
+    if not PLAUSIBLE_NUMBER.fullmatch(tracking_key):
+        return tracking_key, INVALID, None
+
+    bad_check = None
+    for carrier, variant in VARIANTS:
+        verified = variant.verify(tracking_key)
+        if verified:
+            return tracking_key, VALID, carrier
+        if verified is False and bad_check is None:
+            bad_check = carrier
+    if bad_check is not None:
+        return tracking_key, BAD_CHECK_DIGIT, bad_check
+    return tracking_key, UNCHECKED, None
+
+
+def is_plausible_tracking_number(tracking_number):
+    """Whether a lookup for this number could possibly find a shipment"""
+    tracking_key = normalize_tracking_number(tracking_number)
+    return len(tracking_key) <= MAX_LENGTH and TRACKING_KEY.match(tracking_key) is not None
+
+
+def suggest_tracking_number(tracking_number):
+    """The number with its check digit corrected, if it has a carrier format's shape but a bad check digit"""
+    tracking_key = normalize_tracking_number(tracking_number)
+    if not PLAUSIBLE_NUMBER.fullmatch(tracking_key):
+        return None
+    suggestion = None
+    for carrier, variant in VARIANTS:
+        verified = variant.verify(tracking_key)
+        if verified:
+            return None
+        if verified is False and suggestion is None:
+            suggestion = variant.corrected(tracking_key)
+    return suggestion
+
+
+def validate_tracking_number(value):
+    """Validator for new and changed tracking numbers; existing ones are never re-checked"""
+    tracking_key, verdict, carrier = classify_tracking_number(value)
+    if verdict == INVALID:
+        raise ValidationError(
+            "Enter a tracking number of 3 to 64 letters or digits "
+            "(spaces and the separators - . / _ are allowed).",
+            code='invalid',
+        )
+    if verdict == BAD_CHECK_DIGIT and settings.TRACKING_NUMBER_CHECK_DIGITS:
+        raise ValidationError(
+            "%(number)s looks like a %(carrier)s tracking number but its check digit is wrong.",
+            code='check_digit',
+            params={'number': value, 'carrier': carrier},
+        )
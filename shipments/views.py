@@ -1,104 +1,192 @@
+import logging
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import render, get_object_or_404
-from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils.crypto import constant_time_compare
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.views.generic import TemplateView
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_POST
 import json
-from .utils import generate_tracking_number
-from .models import Carrier, Shipment, Package
+from . import api, metrics
+from .live import live_status_available, status_stream
+from .cache import (
+    arender_track_result, patch_track_page_headers, render_static_page, render_track_result,
+    track_page_validators,
+)
+from .refdata import areference_data_version, reference_data_version
+from .reservations import areserve_tracking_numbers, reserve_tracking_numbers
+from .validators import is_plausible_tracking_number, suggest_tracking_number
+from .models import Carrier, Shipment
 
+logger = logging.getLogger(__name__)
 # Create your views here.
 def home_view(request):
     context = {
         'page_title': 'Package Tracker - Home',
     }
-    return render(request, 'home.html', context)
+    return render_static_page(request, 'home.html', context)
 
 
 # track page views logic
-def track_shipment(request):
-    shipment = None
-    packages = []
-    tracking_number = ""
-    
+def requested_tracking_number(request):
     # Check both GET and POST methods
     if request.method == 'POST':
-        tracking_number = request.POST.get('tracking_number', '').strip()
+        return request.POST.get('tracking_number', '').strip()
     elif request.method == 'GET':
         # Allow tracking number in URL parameter too
-        tracking_number = request.GET.get('tracking_number', '').strip()
-    
-    if tracking_number:
+        return request.GET.get('tracking_number', '').strip()
+    return ""
+
+
+def is_revalidation(request):
+    return request.method == 'GET' and ('If-None-Match' in request.headers or 'If-Modified-Since' in request.headers)
+
+
+def track_page_not_modified(request, updated_at, reference_version):
+    """304 response when the visitor's copy of the page is still current, else None"""
+    if updated_at is None:
+        return None
+    etag, last_modified = track_page_validators(request, updated_at, reference_version)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return patch_track_page_headers(not_modified, etag, last_modified)
+    return None
+
+
+def track_page_response(request, tracking_number, shipment, result_html, suggestion, reference_version=None):
+    response = render(request, 'track.html', {
+        'shipment': shipment,
+        'tracking_number': tracking_number,
+        'result_html': result_html,
+        'suggestion': suggestion,
+        'live_status': live_status_available(request),
+    })
+    if request.method == 'POST':
+        patch_cache_control(response, private=True, no_store=True)
+    elif shipment is not None:
+        patch_track_page_headers(response, *track_page_validators(request, shipment.updated_at, reference_version))
+    else:
+        patch_track_page_headers(response)
+    return response
+
+
+def track_shipment(request):
+    shipment = None
+    result_html = ""
+    suggestion = None
+    reference_version = None
+    tracking_number = requested_tracking_number(request)
+
+    # Numbers no shipment could have are rejected here, without a database query
+    if tracking_number and is_plausible_tracking_number(tracking_number):
+        reference_version = reference_data_version()
+        # Revalidation: answer 304 from updated_at alone, before loading or rendering anything
+        if is_revalidation(request):
+            not_modified = track_page_not_modified(request, Shipment.objects.for_tracking_number(
+                tracking_number).values_list('updated_at', flat=True).first(), reference_version)
+            if not_modified is not None:
+                return not_modified
         try:
-            # Case-sensitive search
-            shipment = Shipment.objects.get(shipment_number__exact=tracking_number)
-            packages = Package.objects.filter(shipment=shipment)
+            # Indexed lookup on the normalized tracking number
+            shipment = Shipment.objects.for_tracking_number(tracking_number).with_related().get()
+            result_html = render_track_result(shipment, reference_version)
         except Shipment.DoesNotExist:
             shipment = None
-        except Exception as e:
-            # Log the error for debugging
-            print(f"Error fetching shipment: {e}")
+            # A mistyped check digit: offer the number it was probably meant to be
+            suggestion = suggest_tracking_number(tracking_number)
+            if suggestion and not Shipment.objects.for_tracking_number(suggestion).exists():
+                suggestion = None
+        except Exception:
+            logger.exception("Error fetching shipment %r", tracking_number)
             shipment = None
-    
-    return render(request, 'track.html', {
-        'shipment': shipment,
-        'tracking_number': tracking_number,
-        'packages': packages
-    })
 
+    return track_page_response(request, tracking_number, shipment, result_html, suggestion, reference_version)
 
-def generate_tracking_view(self, request):
-    """Admin view to generate tracking number"""
-    import json
-    from django.http import JsonResponse
-    
-    # Try to get parameters from both GET and POST
-    if request.method == 'GET':
-        carrier_id = request.GET.get('carrier_id')
-        carrier_name = request.GET.get('carrier_name', '')
-    else:
+
+async def atrack_shipment(request):
+    """track_shipment for ASGI: the same page, with every query awaited on the event loop"""
+    shipment = None
+    result_html = ""
+    suggestion = None
+    reference_version = None
+    tracking_number = requested_tracking_number(request)
+
+    if tracking_number and is_plausible_tracking_number(tracking_number):
+        reference_version = await areference_data_version()
+        if is_revalidation(request):
+            not_modified = track_page_not_modified(request, await Shipment.objects.for_tracking_number(
+                tracking_number).values_list('updated_at', flat=True).afirst(), reference_version)
+            if not_modified is not None:
+                return not_modified
         try:
-            data = json.loads(request.body)
-            carrier_id = data.get('carrier_id')
-            carrier_name = data.get('carrier_name', '')
-        except:
-            carrier_id = None
-            carrier_name = ''
-    
-    print(f"DEBUG: Received carrier_id={carrier_id}, carrier_name={carrier_name}")
-    
-    if not carrier_id and not carrier_name:
-        return JsonResponse({'success': False, 'error': 'Carrier information is required'})
-    
-    # Generate tracking number
+            shipment = await Shipment.objects.for_tracking_number(tracking_number).with_related().aget()
+            result_html = await arender_track_result(shipment, reference_version)
+        except Shipment.DoesNotExist:
+            shipment = None
+            suggestion = suggest_tracking_number(tracking_number)
+            if suggestion and not await Shipment.objects.for_tracking_number(suggestion).aexists():
+                suggestion = None
+        except Exception:
+            logger.exception("Error fetching shipment %r", tracking_number)
+            shipment = None
+
+    return track_page_response(request, tracking_number, shipment, result_html, suggestion, reference_version)
+
+
+@require_GET
+async def shipment_status_feed(request):
+    """
+    Server-Sent Events stream of one shipment's status changes. Needs an
+    ASGI server (tracking/asgi.py); each open page holds a connection.
+    """
+    if not live_status_available(request):
+        return HttpResponse(status=204)
+    tracking_number = request.GET.get('tracking_number', '').strip()
+    if not is_plausible_tracking_number(tracking_number):
+        raise Http404("Shipment not found")
+    shipment = await Shipment.objects.for_tracking_number(tracking_number).values_list(
+        'pk', 'tracking_key').afirst()
+    if shipment is None:
+        raise Http404("Shipment not found")
+
+    response = StreamingHttpResponse(
+        status_stream(*shipment, keepalive=settings.LIVE_STATUS_KEEPALIVE),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_POST
+def generate_tracking_number_view(request):
+    """AJAX view to generate tracking number"""
     try:
+        data = json.loads(request.body)
+        carrier_id = data.get('carrier_id')
+        carrier_name = data.get('carrier_name', '')
+        
+        if not carrier_id and not carrier_name:
+            return JsonResponse({'success': False, 'error': 'Carrier information is required'})
+        
+        # If we have carrier_name, use it directly
         if carrier_name:
-            tracking_number = generate_tracking_number(carrier_name)
-        elif carrier_id:
+            tracking_number = reserve_tracking_numbers(carrier_name, 1)[0]
+        else:
+            # Try to get carrier name from ID
             try:
                 carrier = Carrier.objects.get(id=carrier_id)
-                tracking_number = generate_tracking_number(carrier.name)
+                tracking_number = reserve_tracking_numbers(carrier, 1)[0]
             except Carrier.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Carrier not found'})
-        else:
-            return JsonResponse({'success': False, 'error': 'No carrier information provided'})
-        
-        # Check for uniqueness
-        from .models import Shipment
-        # Limit retries to prevent infinite loop
-        max_retries = 5
-        retry_count = 0
-        
-        while Shipment.objects.filter(shipment_number=tracking_number).exists() and retry_count < max_retries:
-            if carrier_name:
-                tracking_number = generate_tracking_number(carrier_name)
-            elif carrier_id:
-                carrier = Carrier.objects.get(id=carrier_id)
-                tracking_number = generate_tracking_number(carrier.name)
-            retry_count += 1
-        
-        print(f"DEBUG: Generated tracking number: {tracking_number}")
         
         return JsonResponse({
             'success': True,
@@ -106,55 +194,122 @@ def generate_tracking_view(self, request):
         })
         
     except Exception as e:
-        print(f"DEBUG: Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)})
 
 
 @csrf_exempt
 @require_POST
-def generate_tracking_number_view(request):
-    """AJAX view to generate tracking number"""
+async def agenerate_tracking_number_view(request):
+    """generate_tracking_number_view for ASGI"""
     try:
         data = json.loads(request.body)
         carrier_id = data.get('carrier_id')
         carrier_name = data.get('carrier_name', '')
-        
+
         if not carrier_id and not carrier_name:
             return JsonResponse({'success': False, 'error': 'Carrier information is required'})
-        
-        # If we have carrier_name, use it directly
+
         if carrier_name:
-            tracking_number = generate_tracking_number(carrier_name)
+            tracking_number = (await areserve_tracking_numbers(carrier_name, 1))[0]
         else:
-            # Try to get carrier name from ID
-            from .models import Carrier
             try:
-                carrier = Carrier.objects.get(id=carrier_id)
-                tracking_number = generate_tracking_number(carrier.name)
+                carrier = await Carrier.objects.aget(id=carrier_id)
+                tracking_number = (await areserve_tracking_numbers(carrier, 1))[0]
             except Carrier.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Carrier not found'})
-        
-        # Check if it's unique (optional)
-        while Shipment.objects.filter(shipment_number=tracking_number).exists():
-            # Regenerate if duplicate (very rare but possible)
-            tracking_number = generate_tracking_number(carrier_name or (carrier.name if carrier else ''))
-        
+
         return JsonResponse({
             'success': True,
             'tracking_number': tracking_number
         })
-        
+
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
-    
+
+
+def requested_batch(request):
+    """(tracking numbers, None) from a batch API request body, or (None, 400 response)"""
+    try:
+        data = json.loads(request.body)
+        tracking_numbers = data['tracking_numbers']
+    except (ValueError, TypeError, KeyError):
+        return None, JsonResponse({'success': False, 'error': 'Expected {"tracking_numbers": [...]}'}, status=400)
+    if not isinstance(tracking_numbers, list):
+        return None, JsonResponse({'success': False, 'error': 'tracking_numbers must be a list'}, status=400)
+    if len(tracking_numbers) > settings.TRACKING_API_MAX_NUMBERS:
+        return None, JsonResponse({
+            'success': False,
+            'error': f'At most {settings.TRACKING_API_MAX_NUMBERS} tracking numbers per request',
+        }, status=400)
+    return tracking_numbers, None
+
+
+def batch_response(request, requested, invalid, found):
+    etag = api.batch_etag(requested, invalid, found)
+    if api.etag_matches(etag, request.headers.get('If-None-Match')):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'success': True, **api.batch_payload(requested, invalid, found)})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@csrf_exempt
+@require_POST
+def track_batch_api(request):
+    """
+    JSON batch lookup for partners: POST {"tracking_numbers": [...]}.
+
+    Answers 304 when If-None-Match carries the ETag of an unchanged result.
+    """
+    tracking_numbers, error = requested_batch(request)
+    if error:
+        return error
+    requested, invalid = api.requested_keys(tracking_numbers)
+    found = api.lookup_shipments(requested) if requested else {}
+    return batch_response(request, requested, invalid, found)
+
+
+@csrf_exempt
+@require_POST
+async def atrack_batch_api(request):
+    """track_batch_api for ASGI, iterating the lookup query on the event loop"""
+    tracking_numbers, error = requested_batch(request)
+    if error:
+        return error
+    requested, invalid = api.requested_keys(tracking_numbers)
+    found = await api.alookup_shipments(requested) if requested else {}
+    return batch_response(request, requested, invalid, found)
+
+
+def request_metrics(request):
+    """Admin-only page with the per-view request stats of this worker process"""
+    return TemplateResponse(request, 'admin/request_metrics.html', {
+        **admin.site.each_context(request),
+        'title': 'Request metrics',
+        'rows': metrics.summary_rows(metrics.registry.snapshot()),
+        'sample_rate': settings.REQUEST_METRICS_SAMPLE_RATE,
+    })
+
+
+@require_GET
+def prometheus_metrics(request):
+    """Request histograms for Prometheus; needs the bearer token or a staff session"""
+    token = settings.REQUEST_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.prometheus_text(metrics.registry.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
 
 
 def about_page(request):
     """About Us page"""
-    return render(request, 'about.html')
+    return render_static_page(request, 'about.html')
 
 def blog_page(request):
     """Blog page"""
-    return render(request, 'blog.html')
\ No newline at end of file
+    return render_static_page(request, 'blog.html')
\ No newline at end of file
@@ -0,0 +1,112 @@
+# shipments/warmup.py
+"""
+Work a fresh worker process would otherwise do during its first requests.
+
+tracking/wsgi.py (and asgi.py) call warm_up() once the application is
+loaded, so a recycled worker accepts traffic with:
+
+* every project, app and admin template parsed into the cached template
+  loader (the loader keeps them for the life of the process);
+* the URL resolver populated, which also imports every view module;
+* the static files manifests read;
+* the dropdown tables loaded into shipments.refdata.
+
+Database connections opened on the way are closed again, so a server that
+forks workers after loading the application never shares one between
+them. Set WARMUP_ON_STARTUP to False to skip all of it.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+
+from . import refdata
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def template_names(engine):
+    """Every template name the engine's loaders can find, each once"""
+    names = set()
+    for loader in engine.template_loaders:
+        # The cached loader wraps the loaders that know the directories
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                for root, _, files in os.walk(directory):
+                    for filename in files:
+                        if filename.endswith(TEMPLATE_EXTENSIONS):
+                            path = os.path.relpath(os.path.join(root, filename), directory)
+                            names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def precompile_templates():
+    """Parse every template into the cached loaders; returns (compiled, failed)"""
+    compiled = failed = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                # e.g. a third-party template for a tag library that is not installed
+                logger.debug("Skipped template %s: %s", name, exc)
+                failed += 1
+            else:
+                compiled += 1
+    return compiled, failed
+
+
+def load_url_resolver():
+    """Import every URLconf and view and build the reverse lookup tables"""
+    resolver = get_resolver()
+    return len(resolver.reverse_dict)
+
+
+def load_static_manifests():
+    return len(getattr(staticfiles_storage, 'hashed_files', ()))
+
+
+def load_reference_data():
+    try:
+        return sum(len(refdata.reference_table(model)) for model in refdata.REFERENCE_MODELS)
+    finally:
+        for connection in connections.all(initialized_only=True):
+            # Not one inside a transaction, e.g. when called from a test or a shell
+            if not connection.in_atomic_block:
+                connection.close()
+
+
+STEPS = {
+    'templates': precompile_templates,
+    'urls': load_url_resolver,
+    'static_manifests': load_static_manifests,
+    'reference_data': load_reference_data,
+}
+
+
+def warm_up():
+    """Run every step, logging what each did and took; returns {step: seconds}"""
+    if not getattr(settings, 'WARMUP_ON_STARTUP', True):
+        return {}
+    timings = {}
+    for name, step in STEPS.items():
+        started = time.perf_counter()
+        try:
+            result = step()
+        except DatabaseError as exc:
+            # A worker that cannot reach the database yet still starts
+            logger.warning("Warmup step %s failed: %s", name, exc)
+            result = None
+        timings[name] = time.perf_counter() - started
+        logger.info("Warmup %s: %s in %.0f ms", name, result, timings[name] * 1000)
+    return timings
@@ -0,0 +1,333 @@
+// Enhanced form submission handler with fancy effects for track page
+(function() {
+    // Initialize when DOM is ready
+    document.addEventListener('DOMContentLoaded', function() {
+        const trackingForm = document.getElementById('trackingForm');
+        const trackingInput = document.getElementById('tracking_number');
+        const trackButton = document.getElementById('trackButton');
+
+        if (!trackingForm || !trackingInput || !trackButton) return;
+
+        // Rendered by track.html when a shipment was found
+        const shipment = document.getElementById('track-shipment')?.dataset;
+
+        // 1. Fancy cursor effect on search bar
+        trackingInput.addEventListener('mouseenter', function() {
+            this.style.cursor = 'text';
+            this.style.boxShadow = '0 4px 20px rgba(0,0,0,0.2)';
+            this.style.transition = 'all 0.3s ease';
+        });
+
+        trackingInput.addEventListener('mouseleave', function() {
+            this.style.boxShadow = '0 4px 15px rgba(0,0,0,0.1)';
+        });
+
+        trackingInput.addEventListener('focus', function() {
+            this.style.cursor = 'text';
+            this.style.boxShadow = '0 4px 25px rgba(0,0,0,0.25)';
+            this.style.transform = 'scale(1.01)';
+        });
+
+        trackingInput.addEventListener('blur', function() {
+            this.style.transform = 'scale(1)';
+            this.style.boxShadow = '0 4px 15px rgba(0,0,0,0.1)';
+        });
+
+        // 2. Fancy button hover effects
+        trackButton.addEventListener('mouseenter', function() {
+            this.style.cursor = 'pointer';
+            this.style.transform = 'translateY(-2px)';
+            this.style.boxShadow = '0 6px 20px rgba(0,0,0,0.15)';
+            this.style.transition = 'all 0.3s ease';
+        });
+
+        trackButton.addEventListener('mouseleave', function() {
+            this.style.transform = 'translateY(0)';
+            this.style.boxShadow = '0 4px 15px rgba(0,0,0,0.1)';
+        });
+
+        // 3. Enhanced form submission with 2-second loader
+        trackingForm.addEventListener('submit', function(e) {
+            // Store original button content
+            const originalHTML = trackButton.innerHTML;
+            const originalWidth = trackButton.offsetWidth + 'px';
+            const trackingNumber = trackingInput.value.trim();
+
+            // Basic validation
+            if (!trackingNumber) {
+                e.preventDefault();
+
+                // Shake animation for empty input
+                trackingInput.style.animation = 'shake 0.5s';
+                trackingInput.focus();
+
+                setTimeout(() => {
+                    trackingInput.style.animation = '';
+                }, 500);
+
+                return;
+            }
+
+            // Prevent double submission
+            if (trackButton.disabled) {
+                e.preventDefault();
+                return;
+            }
+
+            e.preventDefault(); // Prevent immediate submission
+
+            // Show fancy loading state
+            trackButton.innerHTML = `
+                <span class="loading-spinner">
+                    <i class="fa fa-spinner fa-spin" style="margin-right: 8px;"></i>
+                    Tracking...
+                </span>
+            `;
+            trackButton.disabled = true;
+            trackButton.style.width = originalWidth;
+            trackButton.style.cursor = 'wait';
+            trackButton.style.opacity = '0.9';
+
+            // Add pulse animation to button
+            trackButton.style.animation = 'pulse 1s infinite';
+
+            // Add loading animation to input
+            trackingInput.disabled = true;
+            trackingInput.style.cursor = 'wait';
+            trackingInput.style.opacity = '0.7';
+            trackingInput.style.background = 'linear-gradient(90deg, #fff 0%, #f8f9fa 50%, #fff 100%)';
+            trackingInput.style.backgroundSize = '200% 100%';
+            trackingInput.style.animation = 'shimmer 2s infinite';
+
+            console.log('Starting 2-second delay before submission...');
+            console.log('Tracking number to submit:', trackingNumber);
+
+            // Create a hidden clone form to submit
+            setTimeout(() => {
+                console.log('Submitting form after 2-second delay...');
+
+                // Remove animations
+                trackButton.style.animation = '';
+                trackingInput.style.animation = '';
+
+                // Create a hidden form to submit
+                const hiddenForm = document.createElement('form');
+                hiddenForm.method = 'POST';
+                hiddenForm.action = trackingForm.action;
+                hiddenForm.style.display = 'none';
+
+                // Add CSRF token
+                const csrfToken = document.createElement('input');
+                csrfToken.type = 'hidden';
+                csrfToken.name = 'csrfmiddlewaretoken';
+                csrfToken.value = document.querySelector('[name=csrfmiddlewaretoken]').value;
+                hiddenForm.appendChild(csrfToken);
+
+                // Add tracking number
+                const trackingInputClone = document.createElement('input');
+                trackingInputClone.type = 'hidden';
+                trackingInputClone.name = 'tracking_number';
+                trackingInputClone.value = trackingNumber;
+                hiddenForm.appendChild(trackingInputClone);
+
+                // Append to body and submit
+                document.body.appendChild(hiddenForm);
+                hiddenForm.submit();
+
+            }, 2000);
+        });
+
+        // 4. Add keypress animation
+        trackingInput.addEventListener('keypress', function(e) {
+            // Add subtle scale effect on keypress
+            this.style.transform = 'scale(1.005)';
+            setTimeout(() => {
+                this.style.transform = 'scale(1.01)';
+            }, 50);
+        });
+
+        // Focus on input when page loads
+        trackingInput.focus();
+
+        // 5. Generate Barcode if shipment exists - RESPONSIVE
+        if (shipment) {
+            try {
+                // Calculate responsive width based on screen size
+                const screenWidth = window.innerWidth;
+                const isMobile = screenWidth <= 768;
+                const isTablet = screenWidth <= 1024 && screenWidth > 768;
+
+                // Adjust barcode width based on device
+                let barcodeWidth = 2; // default
+
+                if (isMobile) {
+                    barcodeWidth = 1.5; // thinner lines for mobile
+                } else if (isTablet) {
+                    barcodeWidth = 1.8;
+                }
+
+                // Generate barcode
+                JsBarcode("#barcode", shipment.trackingNumber, {
+                    format: "CODE128",
+                    width: barcodeWidth,
+                    height: isMobile ? 60 : 80, // shorter on mobile
+                    displayValue: false,
+                    background: "transparent",
+                    lineColor: "#000000",
+                    margin: isMobile ? 5 : 10 // smaller margins on mobile
+                });
+
+                // Add resize listener to regenerate barcode on screen size change
+                window.addEventListener('resize', function() {
+                    const currentScreenWidth = window.innerWidth;
+                    const currentIsMobile = currentScreenWidth <= 768;
+                    const currentIsTablet = currentScreenWidth <= 1024 && currentScreenWidth > 768;
+
+                    let newWidth = 2;
+                    let newHeight = 100;
+
+                    if (currentIsMobile) {
+                        newWidth = 1.5;
+                        newHeight = 60;
+                    } else if (currentIsTablet) {
+                        newWidth = 1.8;
+                        newHeight = 80;
+                    }
+
+                    // Regenerate barcode with new dimensions
+                    JsBarcode("#barcode", shipment.trackingNumber, {
+                        format: "CODE128",
+                        width: newWidth,
+                        height: newHeight,
+                        displayValue: false,
+                        background: "transparent",
+                        lineColor: "#000000",
+                        margin: currentIsMobile ? 5 : 10
+                    });
+                });
+
+            } catch (e) {
+                console.log("Barcode generation failed:", e);
+            }
+        }
+
+        // 6. Initialize Map if shipment exists
+        if (shipment) {
+            let map = L.map('map').setView([51.505, -0.09], 13);
+
+            // Map layers
+            const osmLayer = L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+                attribution: '© OpenStreetMap contributors'
+            });
+
+            const satelliteLayer = L.tileLayer('https://{s}.google.com/vt/lyrs=s&x={x}&y={y}&z={z}', {
+                maxZoom: 20,
+                subdomains: ['mt0', 'mt1', 'mt2', 'mt3'],
+                attribution: '© Google Maps'
+            });
+
+            // Add default layer
+            osmLayer.addTo(map);
+
+            // Map view controls
+            document.getElementById('mapView')?.addEventListener('click', function() {
+                map.removeLayer(satelliteLayer);
+                osmLayer.addTo(map);
+                this.classList.add('active');
+                document.getElementById('satelliteView')?.classList.remove('active');
+            });
+
+            document.getElementById('satelliteView')?.addEventListener('click', function() {
+                map.removeLayer(osmLayer);
+                satelliteLayer.addTo(map);
+                this.classList.add('active');
+                document.getElementById('mapView')?.classList.remove('active');
+            });
+
+            // Add a marker
+            L.marker([51.505, -0.09]).addTo(map)
+                .bindPopup(locationPopup(shipment.location))
+                .openPopup();
+
+            // Live status updates pushed by the server, instead of refreshing the page (ASGI only)
+            if (window.EventSource && shipment.feedUrl) {
+                const liveFeed = new EventSource(shipment.feedUrl);
+                liveFeed.addEventListener('status', function(e) {
+                    const update = JSON.parse(e.data);
+                    document.querySelectorAll('[data-live="status"]').forEach(el => el.textContent = update.status || 'Processing');
+                    document.querySelectorAll('[data-live="location"]').forEach(el => el.textContent = update.location || 'In transit');
+                });
+            }
+        }
+
+        // 7. Bootstrap tab functionality
+        if (typeof jQuery !== 'undefined') {
+            $('#trackingTabs a').on('click', function (e) {
+                e.preventDefault();
+                $(this).tab('show');
+            });
+
+            $('#trackingTabs a').on('shown.bs.tab', function (e) {
+                $('#trackingTabs a').removeClass('active');
+                $(e.target).addClass('active');
+            });
+        } else {
+            // Fallback for tabs without jQuery
+            const tabLinks = document.querySelectorAll('#trackingTabs a');
+            tabLinks.forEach(link => {
+                link.addEventListener('click', function(e) {
+                    e.preventDefault();
+                    const targetId = this.getAttribute('href');
+                    const targetTab = document.querySelector(targetId);
+
+                    // Hide all tab panes
+                    document.querySelectorAll('.tab-pane').forEach(pane => {
+                        pane.classList.remove('show', 'active');
+                    });
+
+                    // Show target tab
+                    if (targetTab) {
+                        targetTab.classList.add('show', 'active');
+                    }
+
+                    // Update active tab
+                    tabLinks.forEach(tab => tab.classList.remove('active'));
+                    this.classList.add('active');
+                });
+            });
+        }
+    });
+
+
+    // And update the responsive adjustment function:
+    function adjustButtonText() {
+        const width = window.innerWidth;
+        const buttons = document.querySelectorAll('.track-button');
+
+        buttons.forEach(button => {
+            if (width <= 400) {
+                button.innerHTML = '<i class="fa fa-search"></i>';
+                button.style.minWidth = '60px';
+            } else if (width <= 576) {
+                button.innerHTML = '<i class="fa fa-search" style="margin-right: 4px;"></i> Track';
+                button.style.minWidth = '90px';
+            } else {
+                button.innerHTML = '<i class="fa fa-search" style="margin-right: 6px;"></i> Track';
+                button.style.minWidth = '140px';
+            }
+        });
+    }
+
+    // Call on load and resize
+    window.addEventListener('load', adjustButtonText);
+    window.addEventListener('resize', adjustButtonText);
+
+    // Map popup naming the shipment's location, built as nodes so the name is never parsed as HTML
+    function locationPopup(location) {
+        const popup = document.createElement('div');
+        const name = document.createElement('strong');
+        name.textContent = location || 'In Transit';
+        popup.append('Current Shipment Location', document.createElement('br'), name);
+        return popup;
+    }
+})();
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tracking.settings')
+# Serve the async variants of the public views (see shipments/urls.py)
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Parse templates and fill caches now rather than during the first requests
+from shipments.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -0,0 +1,102 @@
+# tracking/databases.py
+"""
+Database profiles: the DATABASES['default'] entry for each supported
+backend, tuned for this app's mix of many small public reads and
+occasional staff writes, and picked by the DB_PROFILE environment variable.
+
+sqlite (the default)
+    Every connection gets WAL journaling, so readers never wait for a
+    writer, plus synchronous=NORMAL (safe with WAL, one fsync per
+    checkpoint instead of per commit), a memory-mapped file, a larger page
+    cache and a busy timeout. Transactions start IMMEDIATE, so two writers
+    queue on the busy timeout instead of one failing with "database is
+    locked" when it upgrades its read lock. Connections are kept between
+    requests (DB_CONN_MAX_AGE) so the pragmas run once per connection, not
+    once per request.
+
+postgresql
+    Persistent connections checked before reuse, or with DB_POOL_MAX_SIZE
+    set a psycopg connection pool per worker (needs psycopg[pool]).
+    Connection details come from DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and
+    DB_PORT.
+
+Add a profile by writing a function of the environment and listing it in
+PROFILES.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# name: value, applied with PRAGMA on every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative: in KiB, so 64 MiB
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite(environ, default_name):
+    pragmas = {
+        **SQLITE_PRAGMAS,
+        'busy_timeout': int(environ.get('DB_BUSY_TIMEOUT_MS', SQLITE_PRAGMAS['busy_timeout'])),
+    }
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': environ.get('DB_NAME', default_name),
+        'CONN_MAX_AGE': _conn_max_age(environ),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgresql(environ, default_name):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('DB_NAME', 'tracking'),
+        'USER': environ.get('DB_USER', ''),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', ''),
+        'PORT': environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': _conn_max_age(environ),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    max_size = int(environ.get('DB_POOL_MAX_SIZE', 0))
+    if max_size:
+        # The pool keeps the connections, so Django must not hold on to them as well
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': min(int(environ.get('DB_POOL_MIN_SIZE', 2)), max_size),
+            'max_size': max_size,
+            'timeout': int(environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    return config
+
+
+PROFILES = {
+    'sqlite': sqlite,
+    'postgresql': postgresql,
+}
+
+
+def _conn_max_age(environ):
+    # Seconds a connection is reused for; "none" keeps it for the worker's lifetime
+    value = environ.get('DB_CONN_MAX_AGE', '600')
+    return None if value.lower() == 'none' else int(value)
+
+
+def database_config(default_name, environ=os.environ):
+    """DATABASES['default'] for the DB_PROFILE profile"""
+    profile = environ.get('DB_PROFILE', 'sqlite')
+    try:
+        build = PROFILES[profile]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}") from None
+    return build(environ, default_name)
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from tracking.databases import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,6 +53,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'shipments.metrics.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,9 +66,9 @@ ROOT_URLCONF = 'tracking.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for the request metrics
+        'BACKEND': 'shipments.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -73,6 +76,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are parsed once per process and kept; shipments.warmup
+            # parses all of them at startup (see WARMUP_ON_STARTUP)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -83,13 +94,68 @@ WSGI_APPLICATION = 'tracking.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Tuned SQLite by default; DB_PROFILE=postgresql and the DB_* variables
+# switch backends (tracking/databases.py)
 DATABASES = {
+    'default': database_config(default_name=BASE_DIR / 'db.sqlite3'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory cache; switch to FileBasedCache (LOCATION pointing at a
+# writable directory) to share cached tracking pages between workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tracking',
     }
 }
 
+# Seconds a worker keeps its dropdown tables (shipments.refdata) before
+# reloading them; with a shared cache, admin edits reach every worker sooner.
+REFERENCE_DATA_MAX_AGE = 60
+
+# Seconds a rendered tracking result stays cached (signals invalidate it sooner)
+TRACK_RESULT_CACHE_TIMEOUT = 60 * 60
+
+# Rendered home, about and blog pages (shipments.cache.render_static_page).
+# Change the version on every deploy that edits their templates, e.g. to the
+# commit hash, when the cache is shared; a timeout of 0 turns caching off.
+PAGE_CACHE_VERSION = os.environ.get('PAGE_CACHE_VERSION', '1')
+PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+# Seconds browsers and proxies may keep the pages without a CSRF form
+PAGE_CACHE_MAX_AGE = 5 * 60
+
+# Seconds a generated-but-unsaved tracking number stays reserved
+TRACKING_RESERVATION_TTL = 60 * 60
+
+# Reject new or changed numbers shaped like a carrier format whose check
+# digit is wrong. Existing numbers are never re-checked and always looked up.
+TRACKING_NUMBER_CHECK_DIGITS = True
+
+# Most tracking numbers one batch API request may ask for
+TRACKING_API_MAX_NUMBERS = 500
+
+# Route the tracking page, batch API and number generation to their native
+# async views. tracking/asgi.py turns this on; WSGI workers keep the sync views.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+# Seconds between keepalive comments on the live status feed
+LIVE_STATUS_KEEPALIVE = 15
+
+# Fraction of requests measured by shipments.metrics; off (0) unless set,
+# e.g. REQUEST_METRICS_SAMPLE_RATE=0.01 for one request in a hundred.
+# Stats are at /admin/metrics/ and, for Prometheus, /metrics/ with
+# "Authorization: Bearer <REQUEST_METRICS_TOKEN>" or a staff session.
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '0'))
+REQUEST_METRICS_TOKEN = os.environ.get('REQUEST_METRICS_TOKEN', '')
+
+# Compile templates and load the URL resolver and dropdown tables when a
+# worker starts, before it takes requests (shipments.warmup, run by wsgi.py)
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', '1') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -129,7 +195,59 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Hashed, precompressed files plus resized WebP/AVIF images (shipments.storage)
+    'staticfiles': {
+        'BACKEND': 'shipments.storage.ResponsiveStaticFilesStorage',
+    },
+}
+# Stylesheets and scripts every page loads, joined by collectstatic into one
+# file each in the order listed (shipments.bundles)
+STATIC_BUNDLES = {
+    'bundles/site.css': [
+        'css/animate.css',
+        'css/owl.carousel.css',
+        'css/owl.theme.css',
+        'css/bootstrap.min.css',
+        'css/hover-min.css',
+        'css/flag-icon.min.css',
+        'css/style.css',
+        'css/elegant_icon.css',
+        'fonts/font-awesome/css/font-awesome.min.css',
+        'rslider/fonts/pe-icon-7-stroke/css/pe-icon-7-stroke.css',
+        'rslider/fonts/font-awesome/css/font-awesome.css',
+        'rslider/css/settings.css',
+    ],
+    'bundles/site.js': [
+        'js/nile-slider.js',
+        'js/jquery-3.2.1.min.js',
+        'rslider/js/jquery.themepunch.tools.min.js',
+        'rslider/js/jquery.themepunch.revolution.min.js',
+        'rslider/js/extensions/revolution.extension.actions.min.js',
+        'rslider/js/extensions/revolution.extension.carousel.min.js',
+        'rslider/js/extensions/revolution.extension.kenburn.min.js',
+        'rslider/js/extensions/revolution.extension.layeranimation.min.js',
+        'rslider/js/extensions/revolution.extension.migration.min.js',
+        'rslider/js/extensions/revolution.extension.navigation.min.js',
+        'rslider/js/extensions/revolution.extension.parallax.min.js',
+        'rslider/js/extensions/revolution.extension.slideanims.min.js',
+        'rslider/js/extensions/revolution.extension.video.min.js',
+        'js/YouTubePopUp.jquery.js',
+        'js/owl.carousel.min.js',
+        'js/imagesloaded.min.js',
+        'js/custom.js',
+        'js/popper.min.js',
+        'js/bootstrap.min.js',
+    ],
+}
+# Images given resized variants, and the widths made (up to the original's)
+RESPONSIVE_IMAGE_DIRS = ['img', 'rslider']
+RESPONSIVE_IMAGE_WIDTHS = [320, 640, 960, 1280, 1920]
+# Processes collectstatic compresses and resizes with; None for one per core
+STATIC_BUILD_WORKERS = None
 
 # Media files (user uploaded files)
 MEDIA_URL = '/media/'
@@ -20,6 +20,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.utils.translation import gettext_lazy as _
 
+from shipments.views import request_metrics
+
 # Customize admin site
 admin.site.site_header = "Nile Logistics Administration"
 admin.site.site_title = "Nile Logistics Admin Portal"
@@ -27,6 +29,8 @@ admin.site.index_title = "Welcome to Nile Logistics Administration"
 
 
 urlpatterns = [
+    # Ahead of the admin URLs, which would otherwise catch it
+    path('admin/metrics/', admin.site.admin_view(request_metrics), name='request_metrics'),
     path('admin/', admin.site.urls),
     path('', include('shipments.urls')),
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tracking.settings')
 
 application = get_wsgi_application()
+
+# Parse templates and fill caches now rather than during the first requests
+from shipments.warmup import warm_up  # noqa: E402
+
+warm_up()